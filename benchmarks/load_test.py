@@ -0,0 +1,134 @@
+"""
+Offline Load Test.
+Drives thousands of synthetic cases through run_assessment, _compile_stats and
+generate_artifacts with fake driver/judge backends (src/common/fake_llm.py), so
+throughput regressions in our own orchestration code show up without a GPU,
+network or API key.
+
+    python benchmarks/load_test.py --cases 2000 --models 3
+    python benchmarks/load_test.py --cases 500 --driver-latency lognormal:-3,0.5 --error-rate 0.02
+    python benchmarks/load_test.py --cases 50000 --stream     # bounded-memory streaming mode
+    python benchmarks/load_test.py --cases 2000 --judge-batch 16   # cross-case batched judging
+    python benchmarks/load_test.py --cases 200 --driver-latency fixed:0.5 --judge-latency fixed:0.2 --pipeline
+"""
+import os
+import sys
+import json
+import time
+import shutil
+import resource
+import tempfile
+import argparse
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.common.fake_llm import FakeChatClient
+from src.green_agent.green_agent import GreenAgent
+from src.white_agent.white_agent import WhiteAgent
+
+# SplitFolderDataset reserves the first 125 (shuffled) files for training
+TRAIN_FILES = 125
+
+# Smallest valid JPEG-ish payload; the fake driver never decodes it
+FAKE_JPEG = b"\xff\xd8\xff\xe0" + b"\x00" * 60 + b"\xff\xd9"
+
+
+def build_synthetic_dataset(root, n_cases):
+    """Writes n_cases test frames (plus the training pool) in the dataset folder layout."""
+    images_dir = os.path.join(root, "images")
+    desc_dir = os.path.join(root, "descriptions")
+    os.makedirs(images_dir, exist_ok=True)
+    os.makedirs(desc_dir, exist_ok=True)
+    for i in range(1, n_cases + TRAIN_FILES + 1):
+        name = f"{i:06d}"
+        with open(os.path.join(images_dir, name + ".jpg"), "wb") as f:
+            f.write(FAKE_JPEG + name.encode())
+        with open(os.path.join(desc_dir, name + ".json"), "w") as f:
+            json.dump({
+                "id": i,
+                "context": f"Synthetic frame {i}: urban road, light traffic.",
+                "goal": "Continue driving straight on the current road.",
+                "perception": "Two lanes, a lead car, green light, pedestrian on the sidewalk.",
+                "prediction": "The lead car keeps moving; the pedestrian waits.",
+                "planning": "Maintain lane and speed with a safe following distance.",
+            }, f)
+    return root
+
+
+def timed(fn, *args, **kwargs):
+    start = time.perf_counter()
+    result = fn(*args, **kwargs)
+    return result, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Offline pipeline load test with fake LLM backends")
+    parser.add_argument("--cases", type=int, default=1000, help="Test cases per model")
+    parser.add_argument("--models", type=int, default=2, help="Number of fake driver models")
+    parser.add_argument("--driver-latency", default="0", help="Latency spec for the fake driver")
+    parser.add_argument("--judge-latency", default="0", help="Latency spec for the fake judge")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Injected failure rate for both backends")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--output", default=None, help="Where to write artifacts (default: temp dir)")
+    parser.add_argument("--json", default=None, help="Write the timing summary to this file")
+    parser.add_argument("--stream", action="store_true",
+                        help="Stream per-case results to JSONL instead of keeping them in memory")
+    parser.add_argument("--judge-batch", type=int, default=None, help="Cases graded per judge request")
+    parser.add_argument("--pipeline", action="store_true",
+                        help="Stream driver answers and grade each field as soon as it is complete")
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix="autodrive_load_")
+    output_dir = args.output or os.path.join(workdir, "output")
+    try:
+        print(f"🧪 Building synthetic dataset ({args.cases} test cases)...")
+        dataset_path, build_time = timed(build_synthetic_dataset, os.path.join(workdir, "dataset"), args.cases)
+
+        judge = FakeChatClient(role="judge", latency=args.judge_latency, error_rate=args.error_rate, seed=args.seed)
+        green = GreenAgent(model_name="mock", client=judge, judge_batch_size=args.judge_batch, pipeline=args.pipeline)
+
+        timings = {"dataset_build_s": round(build_time, 3), "models": {}}
+        for m in range(args.models):
+            name = f"fake-driver-{m}"
+            driver = FakeChatClient(role="driver", latency=args.driver_latency, error_rate=args.error_rate, seed=args.seed + m)
+            green.connect_white_agent(WhiteAgent(model_name=name, client=driver))
+
+            results_dir = os.path.join(workdir, "streams") if args.stream else None
+            _, run_time = timed(green.run_assessment, dataset_path, limit=args.cases, agent_name=name,
+                                seed=args.seed, results_dir=results_dir)
+            details = green.history[name]["details"]
+            # Streamed runs keep no case list; their statistics were computed online
+            cases = len(details) if details else args.cases
+            _, stats_time = timed(green._compile_stats, details)
+
+            timings["models"][name] = {
+                "cases": cases,
+                "run_assessment_s": round(run_time, 3),
+                "cases_per_s": round(cases / run_time, 1) if run_time else None,
+                "compile_stats_s": round(stats_time, 4),
+                "peak_rss_mb": round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1),
+            }
+
+        _, artifacts_time = timed(green.generate_artifacts, output_dir)
+        timings["generate_artifacts_s"] = round(artifacts_time, 3)
+        timings["judge_calls"] = judge.calls
+        green.close()
+
+        print("\n" + "=" * 60)
+        print("📈 LOAD TEST RESULTS")
+        for name, t in timings["models"].items():
+            print(f"   {name}: {t['cases']} cases in {t['run_assessment_s']}s "
+                  f"({t['cases_per_s']} cases/s) | _compile_stats {t['compile_stats_s']}s | peak RSS {t['peak_rss_mb']} MB")
+        print(f"   generate_artifacts: {timings['generate_artifacts_s']}s | judge calls: {judge.calls}")
+        print("=" * 60)
+
+        if args.json:
+            with open(args.json, "w") as f:
+                json.dump(timings, f, indent=2)
+    finally:
+        if args.output is None:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,160 @@
+"""
+Parser Benchmark.
+Replays recorded White Agent outputs through the legacy `_fuzzy_parse` chain and
+the new `parse_response`, and reports throughput and failure rates per input
+format. By default the responses come from the latest run in the run registry
+(output/runs.sqlite); --input takes a run folder (output/runs/<run_id>), a legacy
+tournament_results.json or a JSONL file of raw responses.
+
+    python benchmarks/parse_bench.py
+    python benchmarks/parse_bench.py --input raw_outputs.jsonl --repeat 50
+"""
+import os
+import sys
+import ast
+import json
+import re
+import time
+import argparse
+from collections import Counter
+
+ROOT_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.append(ROOT_DIR)
+
+from src.common.response_parser import parse_response, RESPONSE_FIELDS
+from src.common.results_store import read_cases, CASES_FILE
+from src.common.run_registry import RunRegistry, REGISTRY_FILE
+
+OUTPUT_DIR = os.path.join(ROOT_DIR, "output")
+
+
+def legacy_fuzzy_parse(text):
+    """The pre-parser GreenAgent._fuzzy_parse, kept verbatim for comparison."""
+    clean_text = re.sub(r'```json\s*', '', text)
+    clean_text = re.sub(r'```', '', clean_text).strip()
+    try: return json.loads(clean_text)
+    except: pass
+
+    try: return ast.literal_eval(clean_text)
+    except: pass
+
+    structured = {}
+    patterns = {
+        "perception": r"(?:Perception|See)[:\s\-\*]+(.*?)(?=(?:Prediction|Expect|Plan)|$)",
+        "prediction": r"(?:Prediction|Expect)[:\s\-\*]+(.*?)(?=(?:Plan|Action)|$)",
+        "planning": r"(?:Plan|Planning|Action|Command)[:\s\-\*]+(.*)"
+    }
+    for key, pat in patterns.items():
+        match = re.search(pat, text, re.IGNORECASE | re.DOTALL)
+        if match: structured[key] = match.group(1).strip()
+        else: structured[key] = ""
+
+    if not structured.get("planning"):
+        structured["planning"] = text
+    return structured
+
+
+def legacy_entry(resp):
+    # judge_response used to stringify before parsing, dicts included
+    return legacy_fuzzy_parse(str(resp.get('response', resp)) if isinstance(resp, dict) else str(resp))
+
+
+def latest_run_dir(output_dir=OUTPUT_DIR):
+    """Results folder of the most recent run in the run registry, None when there is none."""
+    registry_path = os.path.join(output_dir, REGISTRY_FILE)
+    if not os.path.exists(registry_path):
+        return None
+    with RunRegistry(registry_path) as registry:
+        latest = registry.runs(limit=1)
+    if not latest:
+        return None
+    run_dir = os.path.join(output_dir, "runs", latest[0]["run_id"])
+    return run_dir if os.path.exists(os.path.join(run_dir, CASES_FILE)) else None
+
+
+def load_recorded(path):
+    """Returns a list of recorded responses (dicts) or raw strings."""
+    if os.path.isdir(path):
+        columns = [f"resp_{k}" for k in RESPONSE_FIELDS]
+        rows = read_cases(path, columns=columns).itertuples(index=False)
+        return [dict(zip(RESPONSE_FIELDS, row)) for row in rows]
+    if path.endswith(".jsonl"):
+        with open(path) as f:
+            return [json.loads(line) for line in f if line.strip()]
+    with open(path) as f:
+        data = json.load(f)
+    recorded = []
+    for content in data.values():
+        for case in content.get('details', []):
+            resp = case.get('generated_responses', {})
+            recorded.append({k: resp.get(k, "") for k in RESPONSE_FIELDS})
+    return recorded
+
+
+def render_variants(resp):
+    """The shapes real drivers emit, built from one recorded response."""
+    if not isinstance(resp, dict):
+        return {"raw_text": str(resp)}
+    body = json.dumps(resp)
+    return {
+        "dict": resp,
+        "json": body,
+        "fenced_json": f"Here is my log:\n```json\n{body}\n```",
+        "python_repr": str(resp),
+        "sections": "\n".join(f"**{k.title()}:** {v}" for k, v in resp.items()),
+        "plain_text": " ".join(str(v) for v in resp.values()),
+    }
+
+
+def is_failure(parsed, source):
+    """A parse fails when no field other than the catch-all plan was recovered."""
+    if not isinstance(parsed, dict):
+        return True
+    if isinstance(source, dict):
+        return any(parsed.get(k) != source.get(k) for k in RESPONSE_FIELDS)
+    return not (parsed.get("perception") or parsed.get("prediction"))
+
+
+def bench(fn, inputs, repeat):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        outputs = [fn(x) for x in inputs]
+    elapsed = time.perf_counter() - start
+    return outputs, (len(inputs) * repeat) / elapsed if elapsed else float("inf")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Response parser throughput benchmark")
+    parser.add_argument("--input", default=None, help="Run folder, results JSON or JSONL (default: latest run)")
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    args.input = args.input or latest_run_dir()
+    if not args.input:
+        print(f"❌ No recorded run in {os.path.join(OUTPUT_DIR, REGISTRY_FILE)}; run an assessment first or pass --input.")
+        sys.exit(2)
+
+    recorded = load_recorded(args.input)
+    by_variant = {}
+    for resp in recorded:
+        for name, payload in render_variants(resp).items():
+            by_variant.setdefault(name, []).append((payload, resp))
+
+    print(f"📦 {len(recorded)} recorded responses from {args.input} (x{args.repeat})\n")
+    print(f"{'Variant':<14}{'Legacy/s':>12}{'Fail':>8}{'New/s':>12}{'Fail':>8}  Strategies")
+    for name, pairs in by_variant.items():
+        inputs = [p for p, _ in pairs]
+        sources = [s for _, s in pairs]
+
+        legacy_out, legacy_rate = bench(legacy_entry, inputs, args.repeat)
+        new_out, new_rate = bench(parse_response, inputs, args.repeat)
+
+        legacy_fail = sum(is_failure(o, s) for o, s in zip(legacy_out, sources)) / len(inputs)
+        new_fail = sum(is_failure(o, s) for (o, _), s in zip(new_out, sources)) / len(inputs)
+        strategies = Counter(strategy for _, strategy in new_out)
+
+        print(f"{name:<14}{legacy_rate:>12,.0f}{legacy_fail:>8.0%}{new_rate:>12,.0f}{new_fail:>8.0%}  {dict(strategies)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,301 @@
+"""
+Benchmark Suite.
+Times the pieces we run hot at scale, writes the results to a machine-readable
+JSON file and compares them against a stored baseline.
+
+    python benchmarks/run_benchmarks.py                      # run + compare with baseline
+    python benchmarks/run_benchmarks.py --save-baseline      # record a new baseline
+    python benchmarks/run_benchmarks.py --only compile_stats --threshold 0.5
+    python benchmarks/run_benchmarks.py --no-compare         # just write the results
+
+A benchmark regresses when its best (min) time exceeds the baseline best time by
+more than --threshold (default 25%); the script then exits with status 1. The
+min is used because it is far less sensitive to background load than the
+median. Baselines are machine-specific, so none is committed: record one with
+--save-baseline on the machine that runs the comparison. Comparing without a
+baseline is an error (exit status 2) rather than a silent pass.
+"""
+import os
+import sys
+import gc
+import json
+import time
+import random
+import shutil
+import platform
+import statistics
+import tempfile
+import argparse
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+ROOT_DIR = os.path.abspath(os.path.join(BENCH_DIR, '..'))
+sys.path.append(ROOT_DIR)
+sys.path.append(BENCH_DIR)
+
+from src.common.dataset_loader import SplitFolderDataset
+from src.common.rules_engine import get_active_safety_rules
+from src.common.html_reporter import generate_leaderboard_report
+from src.common.results_store import write_results, read_cases, aggregate
+from src.common.fake_llm import FakeChatClient
+from src.common import stats
+from src.green_agent.green_agent import GreenAgent, CATEGORY_WEIGHTS
+from src.white_agent.white_agent import WhiteAgent
+from load_test import build_synthetic_dataset
+from parse_bench import load_recorded, render_variants, latest_run_dir
+
+DEFAULT_BASELINE = os.path.join(BENCH_DIR, "baseline.json")
+DEFAULT_OUTPUT = os.path.join(BENCH_DIR, "results", "latest.json")
+
+# Each timing sample runs the function enough times to take at least this long
+MIN_SAMPLE_S = 0.05
+
+# (models, cases per model) grids for the report benchmark
+REPORT_SIZES = [(10, 10), (100, 10), (1000, 10)]
+STATS_SIZES = [100, 1000, 10000]
+STATS_TABLE_SIZES = [(10, 1000), (100, 100)]
+
+
+def synthetic_case(i, rng):
+    """A per-case eval_report shaped like GreenAgent.judge_response output."""
+    violations = ["SAFETY VIOLATION: Ran a confirmed red light."] if rng.random() < 0.1 else []
+    return {
+        "id": i,
+        "scores": {cat: round(rng.random(), 1) for cat in ("perception", "prediction", "planning")},
+        "feedback": violations,
+        "violation_count": len(violations),
+        "critique": "Accurate scene reading and a safe, decisive plan.",
+        "parse_strategy": "dict",
+        "judge_fallbacks": [],
+        "latency": round(rng.uniform(0.5, 8.0), 2),
+        "judge_latency": round(rng.uniform(0.2, 2.0), 2),
+        "image_path": "",
+        "generated_responses": {
+            "perception": "Two lanes, a lead car and a green light.",
+            "prediction": "The lead car keeps moving.",
+            "planning": "Maintain lane and speed.",
+            "gt_planning_context": "Urban road, light traffic...",
+        },
+    }
+
+
+def synthetic_history(n_models, n_cases, seed=0):
+    rng = random.Random(seed)
+    green = GreenAgent(model_name="mock")
+    history = {}
+    for m in range(n_models):
+        details = [synthetic_case(i, rng) for i in range(n_cases)]
+        analysis = green._compile_stats(details)
+        analysis["analysis"] = {"strengths": ["a"], "weaknesses": ["b"], "recommendations": ["c"]}
+        history[f"model-{m:04d}"] = {"analysis": analysis, "details": details}
+    green.close()
+    return history
+
+
+class Suite:
+    def __init__(self, workdir, repeat):
+        self.workdir = workdir
+        self.repeat = repeat
+        self.results = {}
+
+    def bench(self, name, fn, setup=None, items=None, repeat=None):
+        """
+        Times fn(state) `repeat` times; setup() builds fresh state outside the timer.
+        Fast functions are looped inside each sample (calibrated to MIN_SAMPLE_S)
+        so timer noise does not dominate; the reported time is per call.
+        """
+        state = setup() if setup else None
+        start = time.perf_counter()
+        fn(state)  # warm-up, also used for calibration
+        first = time.perf_counter() - start
+        number = max(1, int(MIN_SAMPLE_S / first)) if first > 0 else 1
+
+        samples = []
+        for _ in range(repeat or self.repeat):
+            state = setup() if setup else None
+            # Like timeit: keep the cyclic GC from charging unrelated heap size to this sample
+            gc.collect()
+            gc.disable()
+            try:
+                start = time.perf_counter()
+                for _ in range(number):
+                    fn(state)
+                samples.append((time.perf_counter() - start) / number)
+            finally:
+                gc.enable()
+        median = statistics.median(samples)
+        self.results[name] = {
+            "median_s": round(median, 6),
+            "min_s": round(min(samples), 6),
+            "runs": len(samples),
+            "loops": number,
+        }
+        if items:
+            self.results[name]["items_per_s"] = round(items / median, 1) if median else None
+        print(f"   {name:<40} {median * 1000:>10.2f} ms" + (f"  ({items / median:,.0f}/s)" if items and median else ""))
+
+
+def run_suite(suite, only=None, dataset_size=2000, assessment_cases=500):
+    def wanted(group):
+        return not only or group in only
+
+    dataset_root = os.path.join(suite.workdir, "dataset")
+    if wanted("dataset") or wanted("assessment"):
+        build_synthetic_dataset(dataset_root, max(dataset_size, assessment_cases))
+
+    if wanted("dataset"):
+        suite.bench("dataset_index_build", lambda _: SplitFolderDataset(dataset_root), items=dataset_size)
+
+        def prepared():
+            ds = SplitFolderDataset(dataset_root)
+            ds.prepare_runtime_buckets(None, seed=1)
+            return ds
+        suite.bench("get_test_batch", lambda ds: ds.get_test_batch(), setup=prepared,
+                    items=len(prepared().active_test_batch))
+
+    if wanted("safety_rules"):
+        desc_dir = os.path.join(ROOT_DIR, "dataset", "descriptions")
+        texts = []
+        for name in sorted(os.listdir(desc_dir)):
+            with open(os.path.join(desc_dir, name)) as f:
+                gt = json.load(f)
+            texts.append(f"{gt.get('perception', '')} {gt.get('planning', '')}")
+        suite.bench("get_active_safety_rules", lambda _: [get_active_safety_rules(t) for t in texts], items=len(texts))
+
+    # Driver outputs of the latest recorded run
+    recorded_outputs = latest_run_dir()
+    if wanted("parse") and recorded_outputs:
+        green = GreenAgent(model_name="mock")
+        inputs = [v for resp in load_recorded(recorded_outputs) for v in render_variants(resp).values()]
+        suite.bench("fuzzy_parse", lambda _: [green._fuzzy_parse(x) for x in inputs], items=len(inputs))
+        green.close()
+    elif wanted("parse"):
+        print("   ℹ️  fuzzy_parse skipped: no recorded run in output/runs.sqlite")
+
+    if wanted("compile_stats"):
+        green = GreenAgent(model_name="mock")
+        rng = random.Random(0)
+        for n in STATS_SIZES:
+            details = [synthetic_case(i, rng) for i in range(n)]
+            suite.bench(f"compile_stats[{n}]", lambda _: green._compile_stats(details), items=n)
+        green.close()
+        # Every model of a run at once, grouped on the cases.parquet columns
+        for n_models, n_cases in STATS_TABLE_SIZES:
+            results_dir = os.path.join(suite.workdir, f"stats_{n_models}x{n_cases}")
+            write_results(synthetic_history(n_models, n_cases), results_dir, run_id="bench")
+            cases = read_cases(results_dir)
+            suite.bench(f"compile_stats_table[{n_models}x{n_cases}]",
+                        lambda _: stats.compile_stats(cases, CATEGORY_WEIGHTS), items=n_models * n_cases)
+
+    if wanted("report"):
+        for n_models, n_cases in REPORT_SIZES:
+            results_dir = os.path.join(suite.workdir, f"report_{n_models}x{n_cases}")
+            html_path = os.path.join(suite.workdir, f"report_{n_models}x{n_cases}.html")
+            history = synthetic_history(n_models, n_cases)
+            n = n_models * n_cases
+            suite.bench(f"write_results[{n_models}x{n_cases}]",
+                        lambda _: write_results(history, results_dir, run_id="bench"), items=n)
+            suite.bench(f"aggregate[{n_models}x{n_cases}]",
+                        lambda _: aggregate(read_cases(results_dir, columns=["agent", "planning", "latency"])), items=n)
+            # Cold runs get a fresh fragment cache per call; "cached" reuses the warm-up's fragments
+            cold_cache = lambda: tempfile.mkdtemp(dir=suite.workdir)
+            suite.bench(f"leaderboard_report[{n_models}x{n_cases}]",
+                        lambda _: generate_leaderboard_report(results_dir, html_path, lazy=False, cache_dir=cold_cache()),
+                        items=n, repeat=1 if n_models >= 1000 else None)
+            suite.bench(f"leaderboard_report_lazy[{n_models}x{n_cases}]",
+                        lambda _: generate_leaderboard_report(results_dir, html_path, lazy=True, cache_dir=cold_cache()),
+                        items=n, repeat=1 if n_models >= 1000 else None)
+            warm_cache = cold_cache()
+            suite.bench(f"leaderboard_report_cached[{n_models}x{n_cases}]",
+                        lambda _: generate_leaderboard_report(results_dir, html_path, lazy=False, cache_dir=warm_cache),
+                        items=n)
+
+    if wanted("assessment"):
+        def assessment(_):
+            green = GreenAgent(model_name="mock", client=FakeChatClient(role="judge"))
+            green.connect_white_agent(WhiteAgent(model_name="bench", client=FakeChatClient(role="driver")))
+            green.run_assessment(dataset_root, limit=assessment_cases, agent_name="bench", seed=1)
+            green.close()
+        suite.bench(f"run_assessment[{assessment_cases}]", assessment, items=assessment_cases, repeat=1)
+
+
+def compare(results, baseline, threshold):
+    """Returns a list of (name, current, baseline, ratio) for regressed benchmarks."""
+    regressions = []
+    print(f"\n{'Benchmark':<40}{'Baseline':>12}{'Current':>12}{'Change':>10}")
+    for name, current in results.items():
+        base = baseline.get(name)
+        if not base:
+            print(f"{name:<40}{'-':>12}{current['min_s'] * 1000:>10.2f}ms{'new':>10}")
+            continue
+        ratio = current['min_s'] / base['min_s'] if base['min_s'] else 1.0
+        flag = " ❌" if ratio > 1 + threshold else ""
+        print(f"{name:<40}{base['min_s'] * 1000:>10.2f}ms{current['min_s'] * 1000:>10.2f}ms{ratio - 1:>+9.0%}{flag}")
+        if ratio > 1 + threshold:
+            regressions.append((name, current['min_s'], base['min_s'], ratio))
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="AutoDrive benchmark suite")
+    parser.add_argument("--only", nargs="+", default=None,
+                        help="Groups to run: dataset safety_rules parse compile_stats report assessment")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--output", default=DEFAULT_OUTPUT)
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE)
+    parser.add_argument("--threshold", type=float, default=0.25, help="Allowed slowdown vs baseline (0.25 = 25%%)")
+    parser.add_argument("--save-baseline", action="store_true", help="Store these results as the new baseline")
+    parser.add_argument("--no-compare", action="store_true", help="Only write the results, skip the baseline check")
+    args = parser.parse_args()
+
+    # Checked before the (slow) suite runs
+    if not (args.save_baseline or args.no_compare or os.path.exists(args.baseline)):
+        print(f"❌ No baseline at {args.baseline}. Baselines are machine-specific and not committed; record one "
+              f"on this machine first:\n    python benchmarks/run_benchmarks.py --save-baseline\n"
+              f"or pass --no-compare to only write the results.")
+        sys.exit(2)
+
+    workdir = tempfile.mkdtemp(prefix="autodrive_bench_")
+    print("⏱️  Running benchmarks...")
+    try:
+        suite = Suite(workdir, args.repeat)
+        run_suite(suite, only=args.only)
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    report = {
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+        "benchmarks": suite.results,
+    }
+    os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+    with open(args.output, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"\n📝 Results written to {args.output}")
+
+    if args.save_baseline:
+        baseline = {}
+        if os.path.exists(args.baseline):
+            with open(args.baseline) as f:
+                baseline = json.load(f).get("benchmarks", {})
+        # Partial runs (--only) update just the benchmarks they ran
+        baseline.update(suite.results)
+        with open(args.baseline, "w") as f:
+            json.dump({**report, "benchmarks": baseline}, f, indent=2)
+        print(f"📌 Baseline saved to {args.baseline}")
+        return
+
+    if args.no_compare:
+        return
+
+    with open(args.baseline) as f:
+        baseline = json.load(f).get("benchmarks", {})
+    regressions = compare(suite.results, baseline, args.threshold)
+    if regressions:
+        print(f"\n❌ {len(regressions)} benchmark(s) regressed by more than {args.threshold:.0%}")
+        sys.exit(1)
+    print(f"\n✅ No regressions beyond {args.threshold:.0%}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,144 @@
+"""
+Startup Benchmark.
+Measures time-to-ready of each server role in a fresh interpreter. The clock
+starts when the process is spawned and stops once the app is built and could
+start listening. Slow imports finishing on the warm-up threads do not count.
+Cold starts matter for autoscaled containers.
+
+    python benchmarks/startup.py                          # all roles, 5 runs each
+    python benchmarks/startup.py --roles white green --target 1.0
+    python benchmarks/startup.py --roles dataset --dataset-files 20000
+
+Roles:
+    white, green   main.py with ROLE=white / ROLE=green (create_*_app)
+    fleet          multi_server.py (app built at import)
+    dataset        SplitFolderDataset on a synthetic dataset, with and without its cached index
+
+The script exits with status 1 when a role's best time exceeds --target
+seconds or the role fails to start (e.g. a missing server dependency).
+"""
+import os
+import sys
+import json
+import time
+import shutil
+import tempfile
+import argparse
+import subprocess
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+ROOT_DIR = os.path.abspath(os.path.join(BENCH_DIR, '..'))
+sys.path.append(ROOT_DIR)
+
+from load_test import build_synthetic_dataset
+from src.common.dataset_loader import INDEX_CACHE_FILE
+
+READY = "READY"
+
+# Code run in the child process for each role, up to the point it could serve requests
+ROLE_SETUP = {
+    "white": "import main; main.create_white_app('http://127.0.0.1:8001')",
+    "green": "import main; main.create_green_app('http://127.0.0.1:8001')",
+    "fleet": "import multi_server",
+    "dataset": "from src.common.dataset_loader import SplitFolderDataset; SplitFolderDataset({dataset!r})",
+}
+
+CHILD = """
+import os, sys, io, contextlib
+sys.path.insert(0, {root!r})
+with contextlib.redirect_stdout(io.StringIO()):
+    {setup}
+print({ready!r}, flush=True)
+# Skip interpreter teardown (and any warm-up thread still importing)
+os._exit(0)
+"""
+
+
+def time_to_ready(setup, timeout):
+    """Seconds from spawning a fresh interpreter until it reports ready. Raises RuntimeError on failure."""
+    code = CHILD.format(root=ROOT_DIR, setup=setup, ready=READY)
+    start = time.perf_counter()
+    proc = subprocess.Popen([sys.executable, "-c", code], cwd=ROOT_DIR, stdout=subprocess.PIPE,
+                            stderr=subprocess.PIPE, text=True)
+    try:
+        out, err = proc.communicate(timeout=timeout)
+    except subprocess.TimeoutExpired:
+        proc.kill()
+        proc.communicate()
+        raise RuntimeError(f"not ready after {timeout}s")
+    elapsed = time.perf_counter() - start
+    if READY not in out.split():
+        lines = err.strip().splitlines()
+        raise RuntimeError(lines[-1] if lines else f"exited with status {proc.returncode}")
+    return elapsed
+
+
+def measure(name, setup, repeat, timeout, before_each=None):
+    times = []
+    for _ in range(repeat):
+        if before_each:
+            before_each()
+        times.append(time_to_ready(setup, timeout))
+    return {"role": name, "min_s": round(min(times), 4), "median_s": round(sorted(times)[len(times) // 2], 4),
+            "runs": len(times)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Time-to-ready of each server role")
+    parser.add_argument("--roles", nargs="+", default=list(ROLE_SETUP), choices=list(ROLE_SETUP))
+    parser.add_argument("--repeat", type=int, default=5, help="Fresh processes per role (best time is compared)")
+    parser.add_argument("--target", type=float, default=1.5, help="Allowed time-to-ready in seconds")
+    parser.add_argument("--dataset-files", type=int, default=5000, help="Test frames in the synthetic dataset")
+    parser.add_argument("--timeout", type=float, default=60, help="Seconds before a start is given up")
+    parser.add_argument("--json", default=None, help="Write the results to this file")
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix="autodrive_startup_")
+    results, failures = [], []
+    try:
+        for role in args.roles:
+            runs = [(role, None)]
+            if role == "dataset":
+                print(f"🧪 Building synthetic dataset ({args.dataset_files} test frames)...")
+                dataset = build_synthetic_dataset(os.path.join(workdir, "dataset"), args.dataset_files)
+                index_path = os.path.join(dataset, INDEX_CACHE_FILE)
+                def drop_index():
+                    if os.path.exists(index_path):
+                        os.remove(index_path)
+                runs = [("dataset (no index)", drop_index), ("dataset (cached index)", None)]
+
+            for name, before_each in runs:
+                setup = ROLE_SETUP[role].format(dataset=os.path.join(workdir, "dataset"))
+                try:
+                    result = measure(name, setup, args.repeat, args.timeout, before_each)
+                except RuntimeError as e:
+                    print(f"   ❌ {name}: failed to start ({e})")
+                    failures.append(name)
+                    results.append({"role": name, "error": str(e)})
+                    continue
+                results.append(result)
+                if result["min_s"] > args.target:
+                    failures.append(name)
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    print(f"\n{'Role':<28}{'Best':>10}{'Median':>10}")
+    for r in results:
+        if "error" in r:
+            print(f"{r['role']:<28}{'-':>10}{'-':>10} ❌")
+            continue
+        flag = " ❌" if r["min_s"] > args.target else ""
+        print(f"{r['role']:<28}{r['min_s']:>9.3f}s{r['median_s']:>9.3f}s{flag}")
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump({"target_s": args.target, "results": results}, f, indent=2)
+
+    if failures:
+        print(f"\n❌ {len(failures)} role(s) not ready within {args.target}s: {', '.join(failures)}")
+        sys.exit(1)
+    print(f"\n✅ Every role ready within {args.target}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,209 @@
+"""
+White Agent Load Generator.
+Replays dataset cases against a driver at fixed arrival rates and concurrency
+levels and records a throughput-vs-latency curve per target, for sizing a
+deployment.
+
+The load is open-loop: requests are issued on a Poisson schedule that does not
+wait for earlier requests to finish, and latency is measured from each
+request's scheduled arrival. Time spent queued behind the concurrency cap is
+therefore included (no coordinated omission). With --stream, time to first
+token and tokens per second are recorded as well (in-process targets).
+
+Targets:
+    mock, llava, ...                    in-process WhiteAgent
+    http://host:8001/agent/moondream    multi_server.py fleet (RemoteWhiteAgent)
+    a2a:http://host:8002                A2A White Agent (main.py with ROLE=white)
+
+    python benchmarks/white_load.py --targets mock --driver-latency lognormal:-2,0.5 --rates 5 20 50 --concurrency 4 16
+    python benchmarks/white_load.py --targets http://127.0.0.1:8001/agent/moondream --rates 1 2 4 --duration 60
+"""
+import os
+import sys
+import json
+import time
+import random
+import shutil
+import tempfile
+import argparse
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+
+ROOT_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.append(ROOT_DIR)
+
+from src.common.dataset_loader import SplitFolderDataset
+from src.common.fake_llm import FakeChatClient
+from src.green_agent.green_agent import GreenAgent
+from src.white_agent.white_agent import WhiteAgent
+from load_test import build_synthetic_dataset
+
+LATENCY_PERCENTILES = (50, 95, 99)
+
+
+def make_target(spec, driver_latency="0", seed=42, max_concurrency=8):
+    """Driver client for a target spec (see the module docstring)."""
+    if spec.startswith("a2a:"):
+        # HTTP clients are only needed for remote targets
+        from src.white_agent.a2a_agent import A2AWhiteAgent
+        return A2AWhiteAgent(spec[len("a2a:"):], max_concurrency=max_concurrency)
+    if "://" in spec:
+        from src.white_agent.remote_agent import RemoteWhiteAgent
+        return RemoteWhiteAgent.from_url(spec, max_concurrency=max_concurrency)
+    client = FakeChatClient(role="driver", latency=driver_latency, seed=seed) if spec == "mock" else None
+    return WhiteAgent(model_name=spec, client=client)
+
+
+def load_tasks(dataset_path, limit, seed):
+    dataset = SplitFolderDataset(dataset_path)
+    dataset.prepare_runtime_buckets(limit, seed=seed)
+    return [
+        {"message": GreenAgent._generate_task_prompt(case['context'], case['goal']),
+         "image_path": case['image_path'], "image_bytes": case.get('image_bytes')}
+        for case in dataset.iter_test_batch()
+    ]
+
+
+def one_request(agent, task, scheduled, stream):
+    """Runs one task; all times are measured against the request's scheduled arrival."""
+    begin = time.perf_counter()
+    first_token = None
+    tokens = 0
+    if stream:
+        pieces = []
+        try:
+            for piece in agent.stream_task(task['message'], task['image_path'], task['image_bytes']):
+                if first_token is None:
+                    first_token = time.perf_counter()
+                pieces.append(piece)
+            text = "".join(pieces)
+            response = json.loads(text)
+            # ~4 characters per token, as the fake backend counts them
+            tokens = max(1, len(text) // 4)
+        except Exception as e:
+            response = {"error": str(e)}
+    else:
+        try:
+            response = agent.receive_task(task['message'], task['image_path'], task['image_bytes'])
+        except Exception as e:
+            response = {"error": str(e)}
+    end = time.perf_counter()
+    return {
+        "latency": end - scheduled,
+        "queue": begin - scheduled,
+        "service": end - begin,
+        "error": not isinstance(response, dict) or "error" in response,
+        "ttft": first_token - begin if first_token is not None else None,
+        "tokens_per_s": tokens / (end - first_token) if first_token is not None and end > first_token else None,
+    }
+
+
+def _percentiles(values, prefix):
+    if not values:
+        return {f"{prefix}_p{p}": None for p in LATENCY_PERCENTILES}
+    tails = np.percentile(values, LATENCY_PERCENTILES)
+    return {f"{prefix}_p{p}": round(float(v), 4) for p, v in zip(LATENCY_PERCENTILES, tails)}
+
+
+def run_step(agent, tasks, rate, concurrency, duration, stream=False, seed=0):
+    """
+    One point of the curve: Poisson arrivals at `rate` req/s for `duration`
+    seconds, at most `concurrency` requests in flight.
+    """
+    rng = random.Random(seed)
+    arrivals, t = [], rng.expovariate(rate)
+    while t < duration:
+        arrivals.append(t)
+        t += rng.expovariate(rate)
+
+    futures = []
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        start = time.perf_counter()
+        for i, at in enumerate(arrivals):
+            wait = start + at - time.perf_counter()
+            if wait > 0:
+                time.sleep(wait)
+            futures.append(pool.submit(one_request, agent, tasks[i % len(tasks)], start + at, stream))
+        samples = [f.result() for f in futures]
+        wall = time.perf_counter() - start
+
+    ok = [s for s in samples if not s['error']]
+    point = {
+        "rate": rate,
+        "concurrency": concurrency,
+        "requests": len(samples),
+        "offered_rps": round(len(samples) / duration, 3),
+        "throughput_rps": round(len(ok) / wall, 3) if wall else 0.0,
+        "error_rate": round(1 - len(ok) / len(samples), 4) if samples else 0.0,
+        **_percentiles([s['latency'] for s in ok], "latency"),
+        **_percentiles([s['queue'] for s in ok], "queue"),
+    }
+    if stream:
+        point.update(_percentiles([s['ttft'] for s in ok if s['ttft'] is not None], "ttft"))
+        tps = [s['tokens_per_s'] for s in ok if s['tokens_per_s'] is not None]
+        point["tokens_per_s"] = round(float(np.mean(tps)), 1) if tps else None
+    return point
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Open-loop load generator for White Agents")
+    parser.add_argument("--targets", nargs="+", default=["mock"], help="Models, fleet URLs or a2a:URLs")
+    parser.add_argument("--rates", nargs="+", type=float, default=[1, 2, 5, 10], help="Arrival rates (req/s)")
+    parser.add_argument("--concurrency", nargs="+", type=int, default=[4], help="Max in-flight requests")
+    parser.add_argument("--duration", type=float, default=10.0, help="Seconds of arrivals per curve point")
+    parser.add_argument("--dataset", default=os.path.join(ROOT_DIR, "dataset"))
+    parser.add_argument("--synthetic", type=int, default=None, help="Use N synthetic cases instead of --dataset")
+    parser.add_argument("--cases", type=int, default=50, help="Distinct cases replayed (cycled)")
+    parser.add_argument("--stream", action="store_true", help="Stream responses and record TTFT / tokens per second")
+    parser.add_argument("--driver-latency", default="lognormal:-2,0.5", help="Latency spec for the mock target")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--output", default=os.path.join(os.path.dirname(__file__), "results", "white_load.json"))
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix="autodrive_white_load_")
+    try:
+        dataset_path = args.dataset
+        if args.synthetic:
+            dataset_path = build_synthetic_dataset(os.path.join(workdir, "dataset"), args.synthetic)
+        tasks = load_tasks(dataset_path, args.cases, args.seed)
+
+        curves = {}
+        for spec in args.targets:
+            agent = make_target(spec, args.driver_latency, args.seed, max_concurrency=max(args.concurrency))
+            stream = args.stream and hasattr(agent, "stream_task")
+            if args.stream and not stream:
+                print(f"ℹ️  {spec} cannot stream; measuring whole responses only.")
+
+            print(f"\n📈 {spec}")
+            print(f"   {'rate':>6} {'conc':>5} {'req/s':>8} {'p50':>8} {'p95':>8} {'p99':>8} {'errors':>7}"
+                  + (f" {'ttft50':>8} {'tok/s':>7}" if stream else ""))
+            points = []
+            for concurrency in args.concurrency:
+                for rate in args.rates:
+                    point = run_step(agent, tasks, rate, concurrency, args.duration, stream=stream, seed=args.seed)
+                    points.append(point)
+                    fmt = lambda v: f"{v:>8.3f}" if v is not None else f"{'-':>8}"
+                    print(f"   {rate:>6g} {concurrency:>5} {point['throughput_rps']:>8.2f} "
+                          f"{fmt(point['latency_p50'])} {fmt(point['latency_p95'])} {fmt(point['latency_p99'])} "
+                          f"{point['error_rate']:>7.1%}"
+                          + (f" {fmt(point['ttft_p50'])} {point['tokens_per_s'] or 0:>7.0f}" if stream else ""))
+            curves[spec] = points
+            if hasattr(agent, "close"):
+                agent.close()
+
+        report = {
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "duration_s": args.duration,
+            "stream": args.stream,
+            "curves": curves,
+        }
+        os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"\n📝 Curves written to {args.output}")
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -107,46 +107,127 @@
 
 
 import os
-import uvicorn
+import asyncio
+import base64
 import json
-from starlette.staticfiles import StaticFiles
+import threading
 
 # Official A2A SDK Imports
 from a2a.server.apps import A2AStarletteApplication
 from a2a.server.request_handlers import DefaultRequestHandler
 from a2a.server.agent_execution import AgentExecutor, RequestContext
 from a2a.server.events import EventQueue
-from a2a.server.tasks import InMemoryTaskStore
-from a2a.types import AgentCard, AgentCapabilities, AgentSkill
-from a2a.utils import new_agent_text_message
-
-# Import both agents
+from a2a.server.tasks import InMemoryTaskStore, TaskUpdater
+from a2a.types import (
+    AgentCard, AgentCapabilities, AgentSkill, DataPart, FilePart, FileWithBytes, Part, TaskState, TextPart
+)
+from a2a.utils import new_agent_text_message, new_task
+
+# Agents are imported per role (see load_white_agent / assessment_session.warm_up):
+# only the role being served pays for openai, pandas and pyarrow
 try:
-    from src.green_agent.green_agent import GreenAgent
-    from src.white_agent.white_agent import WhiteAgent
+    from src.common.cancellation import AssessmentCancelled, CancelToken
+    from src.common.image_cache import ImageCache, mount_image_routes
+    from src.common import metrics
+    from src.green_agent import assessment_session
+    from src.green_agent.assessment_session import AssessmentSession, PoolFullError, SessionPool, parse_run_params
 except ImportError:
-    from green_agent import GreenAgent
-    from white_agent import WhiteAgent
+    from cancellation import AssessmentCancelled, CancelToken
+    from image_cache import ImageCache, mount_image_routes
+    import metrics
+    import assessment_session
+    from assessment_session import AssessmentSession, PoolFullError, SessionPool, parse_run_params
+
+# Seconds one driving task may take before the model call is abandoned
+WHITE_TASK_TIMEOUT = float(os.environ.get("WHITE_TASK_TIMEOUT", 120))
+
+def load_white_agent():
+    try:
+        from src.white_agent.white_agent import WhiteAgent
+    except ImportError:
+        from white_agent import WhiteAgent
+    return WhiteAgent
+
+def warm_up(name, fn):
+    """Runs fn on a background thread, so the server starts listening while slow imports finish."""
+    def run():
+        try:
+            fn()
+        except Exception as e:
+            print(f"⚠️ Warm-up of {name} failed: {e}")
+    threading.Thread(target=run, name=f"warm-up-{name}", daemon=True).start()
 
 # --- WHITE AGENT (THE DRIVER) ---
+def extract_task_image(message, cache):
+    """
+    Finds the task image in an A2A message.
+    - FilePart with inline bytes: decoded and added to the cache.
+    - DataPart {"image_sha256": ...}: looked up in the cache (uploaded earlier via PUT /images/{sha256}).
+    Returns (image_bytes, missing_sha256). Raises ValueError for a malformed digest.
+    """
+    for part in (message.parts if message else []):
+        root = part.root
+        if isinstance(root, FilePart) and isinstance(root.file, FileWithBytes):
+            data = base64.b64decode(root.file.bytes)
+            cache.put(data)
+            return data, None
+        if isinstance(root, DataPart) and root.data.get("image_sha256"):
+            digest = root.data["image_sha256"]
+            data = cache.get(digest)
+            return (data, None) if data is not None else (None, digest)
+    return None, None
+
 class WhiteDriverExecutor(AgentExecutor):
-    def __init__(self):
-        self.agent = WhiteAgent(model_name="gpt-4o-mini")
+    def __init__(self, image_cache):
+        self.image_cache = image_cache
+        self._agent = None
+        self._agent_lock = threading.Lock()
+
+    @property
+    def agent(self):
+        """The driver, built on first use (or by the warm-up thread)."""
+        with self._agent_lock:
+            if self._agent is None:
+                self._agent = load_white_agent()(model_name="gpt-4o-mini")
+            return self._agent
 
     async def execute(self, context: RequestContext, event_queue: EventQueue) -> None:
         user_message = context.get_user_input()
         print(f"⬜ White Agent Task: {user_message[:50]}...")
+
+        try:
+            image_bytes, missing = extract_task_image(context.message, self.image_cache)
+        except ValueError as e:
+            metrics.TASKS.labels("white", "error").inc()
+            await event_queue.enqueue_event(
+                new_agent_text_message(json.dumps({"error": "invalid_digest", "detail": str(e)}))
+            )
+            return
+        if missing:
+            metrics.TASKS.labels("white", "image_missing").inc()
+            await event_queue.enqueue_event(
+                new_agent_text_message(json.dumps({"error": "image_missing", "sha256": missing}))
+            )
+            return
         
-        response_data = self.agent.receive_task(user_message)
+        with metrics.TASKS_IN_FLIGHT.labels("white").track_inprogress():
+            response_data = await asyncio.to_thread(
+                lambda: self.agent.receive_task(user_message, None, image_bytes, WHITE_TASK_TIMEOUT)
+            )
+        outcome = "ok"
+        if "error" in response_data:
+            outcome = "timed_out" if response_data.get("timed_out") else "error"
+        metrics.TASKS.labels("white", outcome).inc()
         
         await event_queue.enqueue_event(
             new_agent_text_message(json.dumps(response_data, indent=2))
         )
 
-    # --- FIXED: ADDED REQUIRED CANCEL METHOD ---
     async def cancel(self, context: RequestContext, event_queue: EventQueue) -> None:
-        print("⬜ White Agent Cancel Requested")
-        await event_queue.enqueue_event(new_agent_text_message("🛑 Task cancelled by user."))
+        # The request handler also cancels the running execute(); the model call itself ends at WHITE_TASK_TIMEOUT
+        print(f"⬜ White Agent Cancel Requested ({context.task_id})")
+        updater = TaskUpdater(event_queue, context.task_id, context.context_id)
+        await updater.cancel(updater.new_agent_message([Part(root=TextPart(text="🛑 Task cancelled by user."))]))
 
 def create_white_app(public_url):
     print("⚪ Initializing White Agent Mode")
@@ -167,45 +248,148 @@ def create_white_app(public_url):
         version="1.0.0",
         capabilities=AgentCapabilities(streaming=True),
         skills=[skill],
-        default_input_modes=["text"],
+        default_input_modes=["text", "image/jpeg", "image/png"],
         default_output_modes=["text"]
     )
-    return A2AStarletteApplication(
+    image_cache = ImageCache(
+        max_bytes=int(os.environ.get("IMAGE_CACHE_MB", 512)) * 1024 * 1024,
+        disk_dir=os.environ.get("IMAGE_CACHE_DIR"),
+    )
+    task_store = InMemoryTaskStore()
+    executor = WhiteDriverExecutor(image_cache)
+    app = A2AStarletteApplication(
         agent_card=card,
-        http_handler=DefaultRequestHandler(agent_executor=WhiteDriverExecutor(), task_store=InMemoryTaskStore()),
+        http_handler=DefaultRequestHandler(agent_executor=executor, task_store=task_store),
     ).build()
+    # Raw-bytes upload path: images are sent once and referenced by hash in DataParts
+    mount_image_routes(app, image_cache, max_upload_bytes=int(os.environ.get("IMAGE_UPLOAD_MB", 32)) * 1024 * 1024)
+    metrics.watch_image_cache(image_cache)
+    watch_task_store(task_store)
+    metrics.mount_metrics_route(app)
+    warm_up("white agent", lambda: executor.agent)
+    return app
+
+def watch_task_store(task_store):
+    """Exposes the size of an A2A task store on /metrics."""
+    metrics.REGISTRY.gauge_callback(
+        "autodrive_task_store_tasks", "Tasks held by the A2A task store.", lambda: len(getattr(task_store, "tasks", {}))
+    )
 
 # --- GREEN AGENT (THE JUDGE) ---
+def format_case_event(event):
+    """One-line progress text for a streamed case result."""
+    scores = event['scores']
+    agg = event['aggregate']
+    return (
+        f"[{event['index']}/{event['total']}] {event['agent']} · Case {event['case_id']} | "
+        f"Perc {scores.get('perception', 0)} · Pred {scores.get('prediction', 0)} · Plan {scores.get('planning', 0)} | "
+        f"{event['latency']}s | Running: {agg['overall_score_percent']}% ({agg['total_violations']} violations)"
+    )
+
 class GreenJudgeExecutor(AgentExecutor):
-    def __init__(self):
-        self.green = GreenAgent(model_name="gpt-4o-mini")
+    def __init__(self, max_sessions=4, max_queue=32):
+        # No shared GreenAgent: each request runs in its own AssessmentSession
+        self.pool = SessionPool(max_workers=max_sessions, max_queue=max_queue)
+        # task id -> CancelToken of every queued or running assessment
+        self.running = {}
 
     async def execute(self, context: RequestContext, event_queue: EventQueue) -> None:
         user_message = context.get_user_input()
         print(f"🚦 Green Agent Command: {user_message}")
-        await event_queue.enqueue_event(new_agent_text_message("🚦 Starting Assessment..."))
+
+        # Progress is reported as task status updates (a plain Message would end the stream)
+        task = context.current_task
+        if not task:
+            task = new_task(context.message)
+            await event_queue.enqueue_event(task)
+        updater = TaskUpdater(event_queue, task.id, task.context_id)
+
+        def agent_message(text, data=None):
+            parts = [Part(root=TextPart(text=text))]
+            if data is not None:
+                parts.append(Part(root=DataPart(data=data)))
+            return updater.new_agent_message(parts)
 
         try:
-            dataset_path = os.path.join(os.getcwd(), "dataset")
-            self.green.run_assessment(dataset_path, limit=5, agent_name="GPT-4o-Driver")
-            
-            report_url = f"{os.getenv('AGENT_URL')}/results/leaderboard.html"
-            await event_queue.enqueue_event(new_agent_text_message(f"✅ Done. [View Report]({report_url})"))
+            params = parse_run_params(user_message)
+        except ValueError as e:
+            metrics.TASKS.labels("green", "invalid").inc()
+            await updater.failed(agent_message(f"❌ Invalid request: {e}"))
+            return
+
+        if self.pool.active >= self.pool.max_workers:
+            await updater.update_status(
+                TaskState.submitted,
+                message=agent_message(f"⏳ Queued ({self.pool.waiting} ahead, {self.pool.active} running)"),
+            )
+
+        token = CancelToken()
+        self.running[task.id] = token
+        session = None
+        metrics.TASKS_IN_FLIGHT.labels("green").inc()
+        try:
+            async with self.pool.slot():
+                token.raise_if_cancelled()
+                # Off the event loop: the first session may still be importing the agents
+                session = await asyncio.to_thread(AssessmentSession, params, "output", run_id=task.id, cancel_token=token)
+                await updater.start_work(agent_message("🚦 Starting Assessment...", params))
+
+                dataset_path = os.path.join(os.getcwd(), "dataset")
+                summaries = {}
+                async for event in session.stream(dataset_path):
+                    if event['type'] == 'case':
+                        await updater.update_status(TaskState.working, message=agent_message(format_case_event(event), event))
+                    else:
+                        summaries[event['agent']] = event['analysis']
+                        # Stored on the task, so results stay retrievable per task id
+                        await updater.add_artifact([Part(root=DataPart(data=event['analysis']))], name=f"results:{event['agent']}")
+
+                await asyncio.to_thread(session.finish)
+                report_url = f"{os.getenv('AGENT_URL')}/results/runs/{task.id}/leaderboard.html"
+                await updater.add_artifact(
+                    [Part(root=DataPart(data={"params": params, "summaries": summaries})), Part(root=TextPart(text=f"[View Report]({report_url})"))],
+                    name="assessment_summary",
+                )
+                await updater.complete(agent_message(f"✅ Done. [View Report]({report_url})"))
+                metrics.TASKS.labels("green", "completed").inc()
+        except AssessmentCancelled:
+            # cancel() has already moved the task to the canceled state
+            print(f"🛑 Assessment {task.id} stopped ({token.reason}).")
+            metrics.TASKS.labels("green", "cancelled").inc()
+        except asyncio.CancelledError:
+            # The request handler cancelled execute() itself: stop the worker threads too
+            token.cancel("task cancelled")
+            metrics.TASKS.labels("green", "cancelled").inc()
+            raise
+        except PoolFullError as e:
+            metrics.TASKS.labels("green", "rejected").inc()
+            await updater.failed(agent_message(f"❌ {e} Try again later."))
         except Exception as e:
-            await event_queue.enqueue_event(new_agent_text_message(f"❌ Error: {str(e)}"))
+            metrics.TASKS.labels("green", "failed").inc()
+            await updater.failed(agent_message(f"❌ Error: {str(e)}"))
+        finally:
+            metrics.TASKS_IN_FLIGHT.labels("green").dec()
+            self.running.pop(task.id, None)
+            if session:
+                session.close()
 
-    # --- FIXED: ADDED REQUIRED CANCEL METHOD ---
     async def cancel(self, context: RequestContext, event_queue: EventQueue) -> None:
-        print("🚦 Green Agent Cancel Requested")
-        await event_queue.enqueue_event(new_agent_text_message("🛑 Assessment cancelled."))
+        """Stops the task's assessment (queued or running) and marks the task canceled."""
+        print(f"🚦 Green Agent Cancel Requested ({context.task_id})")
+        token = self.running.get(context.task_id)
+        if token:
+            token.cancel("cancelled by client")
+        updater = TaskUpdater(event_queue, context.task_id, context.context_id)
+        await updater.cancel(updater.new_agent_message([Part(root=TextPart(text="🛑 Assessment cancelled."))]))
 
 def create_green_app(public_url):
+    from starlette.staticfiles import StaticFiles
     print("🟢 Initializing Green Agent Mode")
     
     skill = AgentSkill(
         id="eval", 
         name="Evaluate", 
-        description="Runs benchmark", 
+        description="Runs benchmark. Options: models=a,b limit=N seed=N judge=MODEL (or the same keys as JSON)", 
         input_mode="text", 
         output_mode="text",
         tags=["benchmark", "safety"]
@@ -222,18 +406,31 @@ def create_green_app(public_url):
         default_output_modes=["text"]
     )
     
+    executor = GreenJudgeExecutor(
+        max_sessions=int(os.environ.get("GREEN_MAX_SESSIONS", 4)),
+        max_queue=int(os.environ.get("GREEN_MAX_QUEUE", 32)),
+    )
+    task_store = InMemoryTaskStore()
     wrapper = A2AStarletteApplication(
         agent_card=card,
-        http_handler=DefaultRequestHandler(agent_executor=GreenJudgeExecutor(), task_store=InMemoryTaskStore()),
+        http_handler=DefaultRequestHandler(agent_executor=executor, task_store=task_store),
     )
     app = wrapper.build()
     os.makedirs("output", exist_ok=True)
     app.mount("/results", StaticFiles(directory="output"), name="results")
+    metrics.REGISTRY.gauge_callback(
+        "autodrive_green_sessions", "Assessment sessions by state (running, queued).",
+        lambda: {("running",): executor.pool.active, ("queued",): executor.pool.waiting}, ("state",),
+    )
+    watch_task_store(task_store)
+    metrics.mount_metrics_route(app)
+    warm_up("green agent", assessment_session.warm_up)
     return app
 
 # --- MAIN SWITCH ---
 if __name__ == "__main__":
     import sys
+    import uvicorn
 
     # 1. Listen on the port Cloud Run/Controller expects
     # The Controller sets AGENT_PORT. Local testing defaults to 8001.
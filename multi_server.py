@@ -1,9 +1,33 @@
-import uvicorn
+import os
+import time
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
 from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse
 from src.white_agent.white_agent import WhiteAgent
+from src.common.image_cache import ImageCache, mount_image_routes
+from src.common import metrics
 
 app = FastAPI()
 
+# Images arrive once as raw bytes (PUT /images/{sha256}) and are referenced by hash afterwards
+image_cache = ImageCache(
+    max_bytes=int(os.environ.get("IMAGE_CACHE_MB", 512)) * 1024 * 1024,
+    disk_dir=os.environ.get("IMAGE_CACHE_DIR"),
+)
+mount_image_routes(app, image_cache, max_upload_bytes=int(os.environ.get("IMAGE_UPLOAD_MB", 32)) * 1024 * 1024)
+
+# receive_task blocks on the model call, so it runs here instead of on the event loop
+AGENT_POOL = ThreadPoolExecutor(max_workers=int(os.environ.get("AGENT_WORKERS", 32)))
+
+# GET /metrics (Prometheus text format)
+metrics.watch_image_cache(image_cache)
+metrics.REGISTRY.gauge_callback(
+    "autodrive_agent_pool_queue_depth", "Requests waiting for an AGENT_POOL worker.",
+    lambda: AGENT_POOL._work_queue.qsize(),
+)
+metrics.mount_metrics_route(app)
+
 # Initialize our fleet of agents
 agents = {
     "minicpm-v": WhiteAgent(model_name="minicpm-v"),
@@ -11,27 +35,96 @@ agents = {
     "llava": WhiteAgent(model_name="llava"),
     "moondream": WhiteAgent(model_name="moondream"),
     "llama": WhiteAgent(model_name="llama3.2"),
-    "mock": WhiteAgent(model_name="mock") # Always passes
+    "mock": WhiteAgent(model_name="mock") # Offline fake backend (common/fake_llm.py)
 }
 
+def task_outcome(response):
+    """ok / timed_out / error label of one task response."""
+    if isinstance(response, dict) and "error" in response:
+        return "timed_out" if response.get("timed_out") else "error"
+    return "ok"
+
 @app.post("/agent/{agent_name}/tasks")
 async def route_task(agent_name: str, request: Request):
     """
     Dynamic Router: Sends the task to the specific agent requested in the URL.
     """
     if agent_name not in agents:
-        return {"error": f"Agent '{agent_name}' not found. Available: {list(agents.keys())}"}
+        return JSONResponse({"error": f"Agent '{agent_name}' not found. Available: {list(agents.keys())}"},
+                            status_code=404)
     
     data = await request.json()
     message = data.get("message", "")
-    image_path = data.get("image_path")
+    image_path = data.get("image_path")  # Legacy: only works on a shared filesystem
+    image_sha256 = data.get("image_sha256")
+    # Optional per-call timeout (seconds) for the model call; the agent's default otherwise
+    timeout = data.get("timeout")
+
+    image_bytes = None
+    if image_sha256:
+        try:
+            image_bytes = image_cache.get(image_sha256)
+        except ValueError as e:
+            return JSONResponse({"error": "invalid_digest", "detail": str(e)}, status_code=400)
+        if image_bytes is None:
+            # The client uploads via PUT /images/{sha256} and retries
+            return JSONResponse({"error": "image_missing", "sha256": image_sha256}, status_code=409)
     
     print(f"🔀 Routing task to Agent: [{agent_name.upper()}]")
     
-    # Delegate to the specific agent instance
-    return agents[agent_name].receive_task(message, image_path)
+    # Delegate to the specific agent instance (off the event loop, so agents run in parallel)
+    loop = asyncio.get_running_loop()
+    with metrics.TASKS_IN_FLIGHT.labels("fleet").track_inprogress():
+        result = await loop.run_in_executor(
+            AGENT_POOL, agents[agent_name].receive_task, message, image_path, image_bytes, timeout
+        )
+    metrics.TASKS.labels("fleet", task_outcome(result)).inc()
+    return result
+
+@app.post("/agent/{agent_name}/tasks/batch")
+async def route_batch(agent_name: str, request: Request):
+    """
+    Batched tasks: {"tasks": [<task body as for /tasks>, ...]} in one request.
+    The agent runs them concurrently (WhiteAgent.receive_tasks); results come
+    back in order with per-task queue and service times, plus the server-side
+    elapsed time so clients can tell network time apart. An optional
+    "timeout" bounds each task's model call.
+    """
+    if agent_name not in agents:
+        return JSONResponse({"error": f"Agent '{agent_name}' not found. Available: {list(agents.keys())}"},
+                            status_code=404)
+
+    data = await request.json()
+    batch, missing = [], []
+    for task in data.get("tasks", []):
+        image_bytes = None
+        if task.get("image_sha256"):
+            try:
+                image_bytes = image_cache.get(task["image_sha256"])
+            except ValueError as e:
+                return JSONResponse({"error": "invalid_digest", "detail": str(e)}, status_code=400)
+            if image_bytes is None:
+                missing.append(task["image_sha256"])
+        batch.append({"message": task.get("message", ""), "image_path": task.get("image_path"),
+                      "image_bytes": image_bytes})
+    if missing:
+        return JSONResponse({"error": "image_missing", "missing": sorted(set(missing))}, status_code=409)
+
+    print(f"🔀 Routing batch of {len(batch)} tasks to Agent: [{agent_name.upper()}]")
+    start = time.perf_counter()
+    loop = asyncio.get_running_loop()
+    with metrics.TASKS_IN_FLIGHT.labels("fleet").track_inprogress(len(batch)):
+        results = await loop.run_in_executor(AGENT_POOL, agents[agent_name].receive_tasks, batch, data.get("timeout"))
+    for item in results:
+        metrics.TASKS.labels("fleet", task_outcome(item["response"])).inc()
+    return {"results": results, "elapsed": round(time.perf_counter() - start, 3)}
+
+@app.get("/agents")
+async def list_agents():
+    return {"agents": list(agents.keys())}
 
 if __name__ == "__main__":
+    import uvicorn
     print("🤖 Multi-Agent Server Running on Port 8001")
     print("   Endpoints available:")
     print("   - http://127.0.0.1:8001/agent/moondream/tasks")
@@ -0,0 +1,96 @@
+"""
+Cooperative Cancellation.
+A CancelToken is shared by everything working on one assessment (the A2A
+executor, GreenAgent, its judge threads and the driver clients). Cancelling it
+stops new work from starting, wakes up whoever is waiting on the assessment
+and runs the registered callbacks (closing HTTP sessions aborts requests that
+are already in flight). Work checks the token between steps; nothing is killed
+mid-call, so every model call also carries its own timeout.
+
+A Deadline bounds one case: the driver call and every judge call get the
+case's remaining time (capped at their own timeout) as their timeout, and a
+judge call is not retried once the deadline has passed.
+"""
+import time
+import threading
+
+# Seconds a case may spend in the driver and the judge before it is marked timed out
+CASE_TIMEOUT = 300
+
+
+class AssessmentCancelled(Exception):
+    """Raised inside an assessment once its CancelToken is cancelled."""
+
+
+class CancelToken:
+    def __init__(self):
+        self._event = threading.Event()
+        self._lock = threading.Lock()
+        self._callbacks = []
+        self.reason = None
+
+    @property
+    def cancelled(self):
+        return self._event.is_set()
+
+    def cancel(self, reason="cancelled"):
+        """Cancels once; callbacks run on the calling thread and their errors are ignored."""
+        with self._lock:
+            if self._event.is_set():
+                return
+            self.reason = reason
+            self._event.set()
+            callbacks, self._callbacks = self._callbacks, []
+        for callback in callbacks:
+            try:
+                callback()
+            except Exception as e:
+                print(f"⚠️ Cancel callback failed: {e}")
+
+    def on_cancel(self, callback):
+        """
+        Runs callback() when the token is cancelled (immediately if it already is).
+        Returns a function that unregisters it.
+        """
+        with self._lock:
+            if not self._event.is_set():
+                self._callbacks.append(callback)
+                def remove():
+                    with self._lock:
+                        if callback in self._callbacks:
+                            self._callbacks.remove(callback)
+                return remove
+        callback()
+        return lambda: None
+
+    def raise_if_cancelled(self):
+        if self._event.is_set():
+            raise AssessmentCancelled(self.reason)
+
+    def wait(self, timeout=None):
+        return self._event.wait(timeout)
+
+
+class Deadline:
+    """A point in time `seconds` from now; None means no deadline."""
+    def __init__(self, seconds=None):
+        self.seconds = seconds
+        self._end = time.monotonic() + seconds if seconds is not None else None
+
+    def remaining(self, cap=None):
+        """Seconds left (never negative), capped at `cap`; None when neither bounds it."""
+        if self._end is None:
+            return cap
+        left = max(0.0, self._end - time.monotonic())
+        return min(left, cap) if cap is not None else left
+
+    @property
+    def expired(self):
+        return self._end is not None and time.monotonic() >= self._end
+
+
+def is_timeout(error):
+    """True for the timeout errors of the OpenAI client, requests, the fake backend and TimeoutError."""
+    return (isinstance(error, TimeoutError)
+            or "timeout" in type(error).__name__.lower()
+            or "timed out" in str(error).lower())
@@ -1,6 +1,10 @@
 import os
 import json
 import random
+import hashlib
+
+# Cached listing of images/ and snapshot hash, next to the images and descriptions folders
+INDEX_CACHE_FILE = ".index.json"
 
 class SplitFolderDataset:
     def __init__(self, root_dir, seed=42):
@@ -8,18 +12,24 @@ class SplitFolderDataset:
         self.images_dir = os.path.join(self.root_dir, "images")
         self.desc_dir = os.path.join(self.root_dir, "descriptions")
         self.seed = seed
+        # Imported here: scripts that import this module as common.dataset_loader only add src/ to the path
+        from src.common.shards import is_packed, open_packed
+        # A packed dataset (see src/common/shards.py) replaces both folders
+        self.packed = open_packed(self.root_dir) if is_packed(self.root_dir) else None
         
         # Handle path resolution
-        if not os.path.exists(self.images_dir):
+        if not self.packed and not os.path.exists(self.images_dir):
              base = os.getcwd()
              self.images_dir = os.path.join(base, "dataset", "images")
              self.desc_dir = os.path.join(base, "dataset", "descriptions")
 
-        if not os.path.exists(self.images_dir):
+        if self.packed:
+            self.all_files = list(self.packed.names)
+        elif not os.path.exists(self.images_dir):
             print(f"⚠️ Warning: {self.images_dir} not found.")
             self.all_files = []
         else:
-            self.all_files = sorted([f for f in os.listdir(self.images_dir) if f.endswith(('.jpg', '.png'))])
+            self.all_files = self._list_images()
             
         # --- FIXED LOGIC: DETERMINISTIC HARD SPLIT ---
         # We keep this part strictly deterministic so "Test" images never leak into "Train"
@@ -36,6 +46,45 @@ class SplitFolderDataset:
         self.active_train_pool = []
         self.active_test_batch = []
 
+    def _list_images(self):
+        """
+        Sorted image names. The listing is cached in INDEX_CACHE_FILE and reused
+        while the images folder's mtime is unchanged (adding, removing or
+        renaming a file changes it), so startup costs one stat instead of a
+        directory scan. A read-only dataset simply goes uncached.
+        """
+        mtime = os.stat(self.images_dir).st_mtime_ns
+        cached = self._read_index()
+        if cached.get("images_dir") == self.images_dir and cached.get("mtime_ns") == mtime:
+            return cached["files"]
+
+        files = sorted([f for f in os.listdir(self.images_dir) if f.endswith(('.jpg', '.png'))])
+        self._write_index(images_dir=self.images_dir, mtime_ns=mtime, files=files)
+        return files
+
+    def _index_path(self):
+        return os.path.join(os.path.dirname(self.images_dir), INDEX_CACHE_FILE)
+
+    def _read_index(self):
+        """Contents of INDEX_CACHE_FILE, {} when it is missing or unreadable."""
+        try:
+            with open(self._index_path(), 'r') as f:
+                cached = json.load(f)
+            return cached if isinstance(cached, dict) else {}
+        except (OSError, ValueError):
+            return {}
+
+    def _write_index(self, **entries):
+        """Updates INDEX_CACHE_FILE with `entries`, keeping the other cached entries."""
+        cache_path = self._index_path()
+        try:
+            tmp_path = f"{cache_path}.{os.getpid()}.tmp"
+            with open(tmp_path, 'w') as f:
+                json.dump({**self._read_index(), **entries}, f)
+            os.replace(tmp_path, cache_path)
+        except OSError:
+            pass
+
     def prepare_runtime_buckets(self, test_limit, seed=None):
         """
         Populates buckets based on the requested test limit.
@@ -71,6 +120,64 @@ class SplitFolderDataset:
         mode_msg = f"Deterministic (Seed {seed})" if seed is not None else "Random (New Shuffle)"
         print(f"   👉 Runtime: {mode_msg} | Selected {len(self.active_test_batch)} images from Test Pool.")
 
+    def snapshot_hash(self):
+        """
+        Fingerprint of the dataset contents (names and sizes of the frame images
+        and of their description files; other files are ignored), stored with
+        each run so results on different dataset versions are not compared
+        blindly. A packed copy hashes the same.
+
+        The hash is cached in INDEX_CACHE_FILE next to the listing, keyed on the
+        mtimes of the images and descriptions folders, so an unchanged dataset
+        is not stat'ed file by file on every run. Like the listing, the cache
+        notices added, removed and renamed files; a file rewritten in place
+        with a new size is only picked up once its folder changes.
+        """
+        if self.packed:
+            return self.packed.snapshot_hash()
+        key = [self.images_dir, self._dir_mtime(self.images_dir), self._dir_mtime(self.desc_dir)]
+        cached = self._read_index().get("snapshot", {})
+        if cached.get("key") == key:
+            return cached["hash"]
+
+        from src.common.shards import IMAGE_EXTENSIONS
+        frames = self._sized_files(self.images_dir, lambda name: name.endswith(IMAGE_EXTENSIONS))
+        stems = {os.path.splitext(name)[0] for name, _ in frames}
+        descriptions = self._sized_files(
+            self.desc_dir, lambda name: name.endswith(".json") and os.path.splitext(name)[0] in stems)
+        digest = hashlib.sha256()
+        for name, size in frames + descriptions:
+            digest.update(f"{name}:{size}\n".encode())
+        snapshot = digest.hexdigest()[:16]
+        self._write_index(snapshot={"key": key, "hash": snapshot})
+        return snapshot
+
+    @staticmethod
+    def _dir_mtime(folder):
+        """st_mtime_ns of `folder`, None when it does not exist."""
+        try:
+            return os.stat(folder).st_mtime_ns
+        except OSError:
+            return None
+
+    @staticmethod
+    def _sized_files(folder, keep):
+        """Sorted (name, size) of the files in `folder` whose name passes `keep`."""
+        if not os.path.exists(folder):
+            return []
+        with os.scandir(folder) as entries:
+            return sorted((e.name, e.stat().st_size) for e in entries if e.is_file() and keep(e.name))
+
+    def _read_description(self, img_name):
+        """Description JSON of an image, None when it has none."""
+        if self.packed:
+            return self.packed.description(img_name)
+        json_path = os.path.join(self.desc_dir, os.path.splitext(img_name)[0] + ".json")
+        if not os.path.exists(json_path):
+            return None
+        with open(json_path, 'r') as f:
+            return json.load(f)
+
     def get_few_shot_examples(self, k=3):
         """
         Retrieves k random examples from the ACTIVE TRAINING POOL.
@@ -82,38 +189,36 @@ class SplitFolderDataset:
         examples = []
         
         for img_name in selected:
-            json_name = os.path.splitext(img_name)[0] + ".json"
-            json_path = os.path.join(self.desc_dir, json_name)
-            
-            if os.path.exists(json_path):
-                with open(json_path, 'r') as f:
-                    data = json.load(f)
-                    examples.append({
-                        "context": data.get('context'),
-                        "response": {
-                            "perception": data.get('perception'),
-                            "prediction": data.get('prediction'),
-                            "planning": data.get('planning')
-                        }
-                    })
+            data = self._read_description(img_name)
+            if data is not None:
+                examples.append({
+                    "context": data.get('context'),
+                    "response": {
+                        "perception": data.get('perception'),
+                        "prediction": data.get('prediction'),
+                        "planning": data.get('planning')
+                    }
+                })
         return examples
 
-    def get_test_batch(self):
-        batch = []
+    def iter_test_batch(self):
+        """
+        Yields the active test cases one at a time (ground truth is read on demand).
+        Cases from a packed dataset also carry `image_bytes`, a zero-copy view
+        into the shard; their image_path is a shard reference, not a file.
+        """
         for img_name in self.active_test_batch:
-            image_path = os.path.join(self.images_dir, img_name)
-            json_name = os.path.splitext(img_name)[0] + ".json"
-            json_path = os.path.join(self.desc_dir, json_name)
-            
-            gt = {}
-            if os.path.exists(json_path):
-                with open(json_path, 'r') as f: gt = json.load(f)
-            
-            batch.append({
+            gt = self._read_description(img_name) or {}
+            case = {
                 "id": img_name,
-                "image_path": image_path,
+                "image_path": self.packed.image_ref(img_name) if self.packed else os.path.join(self.images_dir, img_name),
                 "context": gt.get('context', ''),
                 "goal": "Drive safely.",
                 "ground_truth": gt
-            })
-        return batch
\ No newline at end of file
+            }
+            if self.packed:
+                case["image_bytes"] = self.packed.image(img_name)
+            yield case
+
+    def get_test_batch(self):
+        return list(self.iter_test_batch())
@@ -0,0 +1,225 @@
+"""
+Fake LLM Backends.
+Deterministic stand-ins for the OpenAI client used by the Green and White Agents,
+so the whole pipeline can be load-tested offline (no GPU, network or API key).
+
+A FakeChatClient exposes the one method the agents call,
+`client.chat.completions.create(...)`, and returns an object shaped like the
+OpenAI response. Every decision (latency, injected error, chosen answer) is
+derived from a hash of (seed, prompt, attempt number), so results do not
+depend on thread scheduling and two runs with the same seed are identical.
+
+Latency specs:
+    "0"                    -> no delay
+    "fixed:0.05"           -> always 50 ms
+    "uniform:0.01,0.2"     -> uniform between 10 and 200 ms
+    "lognormal:-2.5,0.6"   -> lognormal(mu, sigma) seconds (long tail)
+
+A per-call `timeout=` is honoured like the OpenAI client does: a call slower
+than its timeout waits that long and raises FakeLLMTimeout.
+"""
+import re
+import json
+import time
+import random
+import hashlib
+import threading
+from types import SimpleNamespace
+
+DRIVER_RESPONSES = [
+    {
+        "perception": "Two-lane road, light traffic ahead, green signal at the intersection, pedestrian on the right sidewalk.",
+        "prediction": "The lead vehicle continues at a steady speed; the pedestrian stays on the sidewalk.",
+        "planning": "Maintain lane and speed, keep a safe following distance and cover the brake near the crosswalk.",
+    },
+    {
+        "perception": "Red light ahead with a stopped car in my lane and a cyclist in the bike lane.",
+        "prediction": "The stopped car stays stationary until the signal changes; the cyclist continues straight.",
+        "planning": "Slow down and stop behind the limit line, leaving room for the cyclist.",
+    },
+    {
+        "perception": "Wet highway with a truck merging from the right and reduced visibility.",
+        "prediction": "The truck will merge into my lane within a few seconds.",
+        "planning": "Reduce speed, increase following distance and let the truck merge.",
+    },
+]
+
+JUDGE_CRITIQUES = [
+    "Accurate scene reading and a safe, decisive plan.",
+    "Missed a secondary hazard but the plan is still safe.",
+    "Plan is overly cautious for the clear conditions shown.",
+]
+
+
+class FakeLLMError(Exception):
+    """Injected backend failure (the agents treat it like any API error)."""
+
+
+class FakeLLMTimeout(FakeLLMError, TimeoutError):
+    """The call took longer than its `timeout`."""
+
+
+def parse_latency(spec):
+    """Turns a latency spec string into a function rng -> seconds."""
+    if not spec or spec in ("0", "none"):
+        return lambda rng: 0.0
+    kind, _, args = spec.partition(":")
+    values = [float(v) for v in args.split(",") if v]
+    if kind == "fixed":
+        return lambda rng: values[0]
+    if kind == "uniform":
+        low, high = values
+        return lambda rng: rng.uniform(low, high)
+    if kind == "lognormal":
+        mu, sigma = values
+        return lambda rng: rng.lognormvariate(mu, sigma)
+    raise ValueError(f"Unknown latency spec '{spec}' (use fixed:, uniform: or lognormal:)")
+
+
+def _make_response(content):
+    return SimpleNamespace(
+        choices=[SimpleNamespace(message=SimpleNamespace(content=content), finish_reason="stop")],
+        usage=SimpleNamespace(completion_tokens=max(1, len(content) // 4)),
+    )
+
+
+# Streamed answers: share of the latency spent before the first token, characters per chunk
+STREAM_FIRST_TOKEN_SHARE = 0.3
+STREAM_CHUNK_CHARS = 16
+
+
+def _stream_response(content, delay, timeout=None):
+    """
+    Chunks shaped like an OpenAI stream (stream=True); the delay is spread across them.
+    `timeout` bounds the wait for each chunk, as an HTTP read timeout would.
+    """
+    pieces = [content[i:i + STREAM_CHUNK_CHARS] for i in range(0, len(content), STREAM_CHUNK_CHARS)] or [""]
+    def wait(seconds):
+        if timeout is not None and seconds > timeout:
+            time.sleep(timeout)
+            raise FakeLLMTimeout(f"Fake stream timed out after {timeout}s")
+        if seconds > 0:
+            time.sleep(seconds)
+    wait(delay * STREAM_FIRST_TOKEN_SHARE)
+    step = delay * (1 - STREAM_FIRST_TOKEN_SHARE) / len(pieces)
+    for i, piece in enumerate(pieces):
+        if i:
+            wait(step)
+        last = i == len(pieces) - 1
+        yield SimpleNamespace(choices=[SimpleNamespace(
+            delta=SimpleNamespace(content=piece), finish_reason="stop" if last else None,
+        )])
+
+
+class FakeChatClient:
+    """
+    Drop-in replacement for OpenAI() in GreenAgent/WhiteAgent.
+    role: "driver" answers driving logs, "judge" answers the grading prompts.
+    responses: optional canned answers. A list is cycled through by prompt hash;
+               a dict maps a prompt substring to its answer (first match wins).
+    """
+    def __init__(self, role="driver", latency="0", error_rate=0.0, responses=None, seed=42, violation_rate=0.1):
+        if role not in ("driver", "judge"):
+            raise ValueError("role must be 'driver' or 'judge'")
+        self.role = role
+        self.latency = parse_latency(latency) if isinstance(latency, str) else latency
+        self.error_rate = error_rate
+        self.responses = responses
+        self.seed = seed
+        self.violation_rate = violation_rate
+        self.calls = 0
+        # Per-prompt attempt counters: a retried prompt gets a fresh (but reproducible) draw
+        self._attempts = {}
+        self._lock = threading.Lock()
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self._create))
+
+    def _rng(self, prompt):
+        key = hashlib.blake2b(f"{self.seed}|{prompt}".encode(), digest_size=8).digest()
+        with self._lock:
+            self.calls += 1
+            attempt = self._attempts.get(key, 0)
+            self._attempts[key] = attempt + 1
+        return random.Random(int.from_bytes(key, "big") + attempt)
+
+    @staticmethod
+    def _prompt_text(messages):
+        parts = []
+        for msg in messages:
+            content = msg.get("content")
+            if isinstance(content, list):
+                parts.extend(p.get("text", "") for p in content if p.get("type") == "text")
+            else:
+                parts.append(str(content))
+        return "\n".join(parts)
+
+    def _canned(self, prompt, rng):
+        if isinstance(self.responses, dict):
+            for key, answer in self.responses.items():
+                if key in prompt:
+                    return answer
+            return None
+        if self.responses:
+            return self.responses[rng.randrange(len(self.responses))]
+        return None
+
+    def _judge_answer(self, prompt, rng):
+        if '"results"' in prompt:
+            # Batched grading request: one entry per case id in the prompt
+            results = []
+            for case_id in re.findall(r'"id": "([^"<]*)"', prompt):
+                violation = rng.random() < self.violation_rate
+                results.append({
+                    "id": case_id,
+                    **{cat: min(10, max(0, round(rng.gauss(7, 2)))) for cat in ("perception", "prediction", "planning")},
+                    "critique": JUDGE_CRITIQUES[rng.randrange(len(JUDGE_CRITIQUES))],
+                    "violation": violation,
+                    "reason": "Ran a confirmed red light." if violation else "",
+                })
+            return json.dumps({"results": results})
+        if '"score"' in prompt:
+            # Skewed towards good scores, with a tail of poor ones
+            answer = {"score": min(10, max(0, round(rng.gauss(7, 2))))}
+            if '"confidence"' in prompt:
+                # Mostly confident, with a tail of unsure grades (cascade escalations)
+                answer["confidence"] = round(rng.betavariate(6, 1.5), 2)
+            return json.dumps(answer)
+        if '"critique"' in prompt:
+            return json.dumps({"critique": JUDGE_CRITIQUES[rng.randrange(len(JUDGE_CRITIQUES))]})
+        if '"violation"' in prompt:
+            violation = rng.random() < self.violation_rate
+            return json.dumps({"violation": violation, "reason": "Ran a confirmed red light." if violation else ""})
+        if '"strengths"' in prompt:
+            return json.dumps({
+                "strengths": ["Keeps safe following distance", "Reads signals correctly"],
+                "weaknesses": ["Misses secondary hazards", "Occasionally over-cautious"],
+                "recommendations": ["Scan crosswalk edges", "Commit earlier on green"],
+            })
+        return "{}"
+
+    def _create(self, model=None, messages=None, **kwargs):
+        prompt = self._prompt_text(messages or [])
+        rng = self._rng(prompt)
+
+        delay = self.latency(rng)
+        stream = kwargs.get("stream", False)
+        timeout = kwargs.get("timeout")
+        if not stream and timeout is not None and delay > timeout:
+            time.sleep(timeout)
+            raise FakeLLMTimeout(f"Fake {self.role} backend timed out after {timeout}s ({model})")
+        if delay > 0 and not stream:
+            time.sleep(delay)
+        if rng.random() < self.error_rate:
+            raise FakeLLMError(f"Injected failure from fake {self.role} backend ({model})")
+
+        content = self._canned(prompt, rng)
+        if content is None:
+            if self.role == "driver":
+                content = json.dumps(DRIVER_RESPONSES[rng.randrange(len(DRIVER_RESPONSES))])
+            else:
+                content = self._judge_answer(prompt, rng)
+        elif not isinstance(content, str):
+            content = json.dumps(content)
+        if stream:
+            return _stream_response(content, delay, timeout)
+        return _make_response(content)
+
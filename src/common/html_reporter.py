@@ -1,9 +1,24 @@
 import os
+import re
 import json
 import base64
+import shutil
+import time
+import hashlib
+import multiprocessing
+from datetime import datetime
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+import pandas as pd
+import pyarrow.parquet as pq
+from src.common.image_cache import image_digest
+from src.common.shards import open_packed, read_image_ref, split_image_ref
+from src.common.results_store import CASES_FILE, CARD_COLUMNS, history_to_frame, read_agents, read_cases, aggregate
 
 def encode_image_to_base64(image_path):
     """Reads an image and converts it to a base64 string."""
+    if not image_path:
+        return ""
     try:
         if os.path.exists(image_path):
             with open(image_path, "rb") as img_file:
@@ -11,27 +26,424 @@ def encode_image_to_base64(image_path):
         if os.path.exists(os.path.abspath(image_path)):
              with open(os.path.abspath(image_path), "rb") as img_file:
                 return base64.b64encode(img_file.read()).decode('utf-8')
-        return ""
+        data = read_image_ref(image_path)
+        return base64.b64encode(data).decode('utf-8') if data is not None else ""
     except Exception as e:
         print(f"Error encoding image {image_path}: {e}")
         return ""
 
-def generate_leaderboard_report(json_path, output_html_path):
-    with open(json_path, 'r') as f:
-        data = json.load(f)
+def load_results(results_path, columns=CARD_COLUMNS):
+    """
+    Returns ({agent: analysis}, cases frame) from a results directory
+    (cases.parquet + agents.json) or a legacy tournament_results.json.
+    Only `columns` are read from the Parquet file.
+    """
+    if results_path.endswith(".json"):
+        with open(results_path, 'r') as f:
+            data = json.load(f)
+        analyses = {agent: content['analysis'] for agent, content in data.items()}
+        return analyses, history_to_frame(data, run_id="legacy")[list(columns)]
+    return read_agents(results_path)['agents'], read_cases(results_path, columns=list(columns))
+
+# Reports with more cases than this are written in lazy mode (see generate_leaderboard_report)
+INLINE_MAX_CASES = 300
+# Case cards per lazily loaded JSON chunk (one page in the report)
+CASES_PER_CHUNK = 25
+
+def _case_card_html(case):
+    """One collapsible case card with its image inlined as base64 (inline mode)."""
+    case_id = case.case_id
+    img_path = case.image_path
+    img_b64 = encode_image_to_base64(img_path)
+    
+    img_elem = f'<img src="data:image/jpeg;base64,{img_b64}" class="case-img">' if img_b64 else '<div class="no-img">Image Not Found<br><small>' + img_path + '</small></div>'
+    status_icon = "✅" if case.planning > 0.6 else "⚠️"
+    critique = (case.critique or 'No critique').replace('"', '')
+
+    return f"""
+            <details class="case-card">
+                <summary class="case-header">
+                    <span>{status_icon} <b>Test Case #{case_id}</b></span>
+                    <span class="score-tag">Plan Score: {case.planning}</span>
+                </summary>
+                <div class="case-body">
+                    <div class="img-col">{img_elem}</div>
+                    <div class="info-col">
+                        <div class="log-row"><strong>👁️ Perception:</strong> {case.resp_perception or '-'}</div>
+                        <div class="log-row"><strong>🔮 Prediction:</strong> {case.resp_prediction or '-'}</div>
+                        <div class="log-row"><strong>🤖 Plan:</strong> {case.resp_planning or '-'}</div>
+                        <div class="log-row ground-truth"><strong>📖 Truth Reference:</strong> {case.gt_planning_context or '-'}</div>
+                        <div class="log-row critique"><strong>📝 Judge:</strong> "{critique}"</div>
+                    </div>
+                </div>
+            </details>
+            """
+
+def _publish_image(img_path, report_dir, published):
+    """
+    Places an image next to the report as images/<sha256>.<ext> (hard link when
+    possible) and returns its relative URL. Each source file is handled once.
+    Frames of a packed dataset are written out from their shard.
+    """
+    if img_path in published:
+        return published[img_path]
+    url = ""
+    data = read_image_ref(img_path) if img_path and not os.path.isfile(img_path) else None
+    if data is not None:
+        digest = image_digest(data)
+        name = digest + (os.path.splitext(img_path)[1] or ".jpg")
+        target = os.path.join(report_dir, "images", name)
+        if not os.path.exists(target):
+            os.makedirs(os.path.dirname(target), exist_ok=True)
+            with open(target, "wb") as f:
+                f.write(data)
+        url = f"images/{name}"
+    elif img_path and os.path.isfile(img_path):
+        with open(img_path, "rb") as f:
+            digest = image_digest(f.read())
+        name = digest + (os.path.splitext(img_path)[1] or ".jpg")
+        target = os.path.join(report_dir, "images", name)
+        if not os.path.exists(target):
+            os.makedirs(os.path.dirname(target), exist_ok=True)
+            try:
+                os.link(img_path, target)
+            except OSError:
+                shutil.copyfile(img_path, target)
+        url = f"images/{name}"
+    published[img_path] = url
+    return url
+
+class _FragmentBuilder:
+    """
+    Builds one agent's tab from its case rows, added in batches, and stores it
+    in entry_dir/fragment.html. Lazy mode writes the case pages (JSON chunks)
+    and images into entry_dir as they fill, so only one page is held in memory.
+    """
+    def __init__(self, agent_name, agent_analysis, lazy, entry_dir):
+        self.agent_name = agent_name
+        self.agent_analysis = agent_analysis
+        self.lazy = lazy
+        self.entry_dir = entry_dir
+        self.chunk_dir = f"cases/{re.sub(r'[^A-Za-z0-9_.-]+', '_', agent_name)}-{image_digest(agent_name.encode())[:8]}"
+        self.count = 0
+        self.cards = []
+        self.page = []
+        self.pages = 0
+        self.published = {}
+        if lazy:
+            os.makedirs(os.path.join(entry_dir, self.chunk_dir), exist_ok=True)
+
+    def add(self, agent_cases):
+        self.count += len(agent_cases)
+        for case in agent_cases.itertuples(index=False):
+            if not self.lazy:
+                self.cards.append(_case_card_html(case))
+                continue
+            self.page.append({
+                "case_id": case.case_id,
+                "planning": float(case.planning),
+                "image": _publish_image(case.image_path, self.entry_dir, self.published),
+                "image_path": case.image_path,
+                "critique": (case.critique or 'No critique').replace('"', ''),
+                "perception": case.resp_perception or '-',
+                "prediction": case.resp_prediction or '-',
+                "plan": case.resp_planning or '-',
+                "truth": case.gt_planning_context or '-',
+            })
+            if len(self.page) == CASES_PER_CHUNK:
+                self._write_page()
+
+    def _write_page(self):
+        with open(os.path.join(self.entry_dir, self.chunk_dir, f"{self.pages}.json"), "w") as f:
+            json.dump(self.page, f)
+        self.pages += 1
+        self.page = []
+
+    def finish(self):
+        """Writes fragment.html (last and atomically: its presence marks a complete entry). Returns the fragment."""
+        if self.lazy:
+            if self.page or not self.pages:
+                self._write_page()
+            cases_html = f"""
+            <div class="case-list" data-chunks="{self.chunk_dir}" data-pages="{self.pages}" data-loaded="-1"></div>
+            <div class="pager"></div>
+            """
+        else:
+            cases_html = "".join(self.cards)
+        fragment = _fragment_html(self.agent_name, self.agent_analysis, self.count, cases_html)
+        os.makedirs(self.entry_dir, exist_ok=True)
+        tmp_path = os.path.join(self.entry_dir, f"fragment.html.{os.getpid()}")
+        with open(tmp_path, 'w') as f:
+            f.write(fragment)
+        os.replace(tmp_path, os.path.join(self.entry_dir, "fragment.html"))
+        return fragment
+
+# Bump when the fragment markup or cache key changes, so cached fragments are not reused
+FRAGMENT_VERSION = 2
+# Default fragment cache folder, next to the report (see .gitignore)
+REPORT_CACHE_DIR = ".report_cache"
+# Fewer cases than this to render are done in this process: starting a pool costs more than it saves
+PARALLEL_MIN_CASES = 5000
+# Cache entries the latest report did not use are evicted once unused for this long (seconds)
+REPORT_CACHE_GRACE_S = 3600
+
+def _safe_list(lst):
+    return "".join([f"<li>{item}</li>" for item in (lst if lst else [])])
+
+def _fragment_html(agent_name, agent_analysis, case_count, cases_html):
+    """The inside of one agent's tab."""
+    analysis = agent_analysis.get('analysis', {})
+    score_color = "#27ae60" if agent_analysis['overall_grade'] == "PASS" else "#c0392b"
+
+    return f"""
+            <div class="agent-summary-header">
+                <h2>Analysis: {agent_name}</h2>
+                <div class="score-badge" style="color: {score_color}">
+                    <div style="font-size: 1.5em;">{agent_analysis['overall_grade']}</div>
+                    <span>Score: {agent_analysis['overall_score_percent']}%</span>
+                </div>
+            </div>
+
+            <div class="insights-container">
+                <div class="insight-box strength-box">
+                    <h3>✅ Strengths</h3>
+                    <ul>{_safe_list(analysis.get('strengths'))}</ul>
+                </div>
+                <div class="insight-box weakness-box">
+                    <h3>❌ Weaknesses</h3>
+                    <ul>{_safe_list(analysis.get('weaknesses'))}</ul>
+                </div>
+            </div>
+            
+            <div class="insight-box recommendation-box">
+                <h3>💡 Recommendations</h3>
+                <ul>{_safe_list(analysis.get('recommendations'))}</ul>
+            </div>
+
+            <h3 style="margin-top:30px; border-bottom: 2px solid #eee; padding-bottom:10px;">Detailed Test Cases ({case_count})</h3>
+            {cases_html}
+    """
+
+def _case_batches(source, row_groups=None):
+    """
+    Yields CARD_COLUMNS frames: a cases.parquet file a row group (CHUNK_ROWS
+    cases) at a time (all row groups, or only the indices in `row_groups`),
+    or an in-memory frame as a single batch.
+    """
+    if isinstance(source, pd.DataFrame):
+        yield source
+        return
+    parquet = pq.ParquetFile(source)
+    for i in (range(parquet.metadata.num_row_groups) if row_groups is None else row_groups):
+        yield parquet.read_row_group(i, columns=CARD_COLUMNS).to_pandas()
+
+def _image_stamp(path):
+    """Identifies an image file's version (size and mtime) for the fragment key."""
+    ref = split_image_ref(path)
+    try:
+        # A packed frame changes only when its shard is rewritten
+        st = os.stat(open_packed(ref[0]).shard_path(ref[1]) if ref else path)
+        return f"{path}:{st.st_size}:{st.st_mtime_ns}\n".encode()
+    except (OSError, KeyError):
+        return f"{path}:missing\n".encode()
+
+def _scan_agents(source, agent_names):
+    """
+    One pass over the cases, a batch at a time. Returns per agent a digest of
+    its rows and image files, its case count and the batches (row groups)
+    holding its rows. Rows are hashed but never sliced here.
+    """
+    digests = {name: hashlib.sha256() for name in agent_names}
+    counts = dict.fromkeys(agent_names, 0)
+    groups = {name: [] for name in agent_names}
+    stamps = {}
+    for i, batch in enumerate(_case_batches(source)):
+        row_hashes = pd.util.hash_pandas_object(batch.drop(columns='agent'), index=False).to_numpy()
+        image_paths = batch['image_path'].to_numpy()
+        for agent_name, positions in batch.groupby('agent', observed=True, sort=False).indices.items():
+            digest = digests.get(agent_name)
+            if digest is None:
+                continue
+            digest.update(row_hashes[positions].tobytes())
+            for path in image_paths[positions]:
+                stamp = stamps.get(path)
+                if stamp is None:
+                    stamp = stamps[path] = _image_stamp(path)
+                digest.update(stamp)
+            counts[agent_name] += len(positions)
+            groups[agent_name].append(i)
+    return digests, counts, groups
+
+def _fragment_key(agent_name, agent_analysis, rows_digest, lazy):
+    """Content hash of everything an agent's fragment depends on (rows_digest covers its cases and image files)."""
+    digest = hashlib.sha256()
+    digest.update(f"{FRAGMENT_VERSION}|{lazy}|{agent_name}|".encode())
+    digest.update(json.dumps(agent_analysis, sort_keys=True, default=str).encode())
+    digest.update(rows_digest.digest())
+    return digest.hexdigest()[:32]
+
+def _render_agents(source, jobs, lazy):
+    """
+    Renders the fragments of `jobs` [(agent, analysis, entry_dir, batches)]
+    in one pass over their batches; only their rows are sliced out.
+    Returns {agent: fragment}. May run in a worker process, so it only
+    touches its own entry dirs.
+    """
+    builders = {name: _FragmentBuilder(name, analysis, lazy, entry_dir) for name, analysis, entry_dir, _ in jobs}
+    row_groups = sorted({i for *_, batches in jobs for i in batches})
+    for batch in _case_batches(source, row_groups):
+        for agent_name, positions in batch.groupby('agent', observed=True, sort=False).indices.items():
+            builder = builders.get(agent_name)
+            if builder is not None:
+                builder.add(batch.iloc[positions])
+    return {name: builder.finish() for name, builder in builders.items()}
+
+def _split_jobs(jobs, counts, parts):
+    """Splits render jobs into `parts` groups of similar case counts, in file order (neighbours share batches)."""
+    jobs = sorted(jobs, key=lambda job: job[3][:1])
+    total = sum(counts[job[0]] for job in jobs)
+    split, current, filled = [], [], 0
+    for job in jobs:
+        current.append(job)
+        filled += counts[job[0]]
+        if len(split) < parts - 1 and filled >= total * (len(split) + 1) / parts:
+            split.append(current)
+            current = []
+    if current:
+        split.append(current)
+    return split
+
+def _evict_unused_entries(cache_dir, used):
+    """
+    Drops fragment cache entries the latest report did not use, once unused for
+    REPORT_CACHE_GRACE_S (another report may still be writing or linking them).
+    A cache hit refreshes the entry's fragment.html mtime.
+    """
+    used = {os.path.basename(entry_dir) for entry_dir in used}
+    cutoff = time.time() - REPORT_CACHE_GRACE_S
+    try:
+        entries = list(os.scandir(cache_dir))
+    except FileNotFoundError:
+        return
+    for entry in entries:
+        if entry.name in used or not entry.is_dir():
+            continue
+        try:
+            fragment_path = os.path.join(entry.path, "fragment.html")
+            last_used = os.stat(fragment_path if os.path.exists(fragment_path) else entry.path).st_mtime
+        except OSError:
+            continue
+        if last_used < cutoff:
+            shutil.rmtree(entry.path, ignore_errors=True)
+
+def _link_tree(src, dst):
+    """Mirrors a cached entry's case chunks/images into the report folder (hard links when possible)."""
+    def link_or_copy(a, b):
+        if os.path.exists(b):
+            return b
+        try:
+            os.link(a, b)
+        except OSError:
+            shutil.copy2(a, b)
+        return b
+    for sub in ("cases", "images"):
+        if os.path.isdir(os.path.join(src, sub)):
+            shutil.copytree(os.path.join(src, sub), os.path.join(dst, sub),
+                            copy_function=link_or_copy, dirs_exist_ok=True)
+
+def render_agent_fragments(sorted_agents, source, report_dir, lazy=False, cache_dir=None, workers=None):
+    """
+    Returns {agent: tab fragment HTML}. `source` is a cases.parquet path (read a
+    row group at a time) or a frame of CARD_COLUMNS. Fragments whose inputs are
+    unchanged are read from the cache; the rest are rendered, in a pool of
+    spawned processes once there are PARALLEL_MIN_CASES cases to render.
+    """
+    cache_dir = cache_dir or os.path.join(report_dir, REPORT_CACHE_DIR)
+    digests, counts, groups = _scan_agents(source, [agent_name for agent_name, _ in sorted_agents])
+
+    fragments, entries, todo = {}, [], []
+    for agent_name, agent_analysis in sorted_agents:
+        key = _fragment_key(agent_name, agent_analysis, digests[agent_name], lazy)
+        entry_dir = os.path.join(cache_dir, key)
+        entries.append(entry_dir)
+        fragment_path = os.path.join(entry_dir, "fragment.html")
+        if os.path.exists(fragment_path):
+            with open(fragment_path) as f:
+                fragments[agent_name] = f.read()
+            # Marks the entry as used (see _evict_unused_entries)
+            os.utime(fragment_path)
+        else:
+            todo.append((agent_name, agent_analysis, entry_dir, groups[agent_name]))
+
+    todo_cases = sum(counts[job[0]] for job in todo)
+    workers = min(workers or os.cpu_count() or 1, len(todo)) if todo_cases >= PARALLEL_MIN_CASES else 1
+    if workers > 1:
+        # Spawned, not forked: the caller may be a server process with live threads (judge pool, event loop)
+        context = multiprocessing.get_context("spawn")
+        jobs = _split_jobs(todo, counts, workers)
+        try:
+            with ProcessPoolExecutor(max_workers=workers, mp_context=context) as pool:
+                for rendered in pool.map(_render_agents, [source] * len(jobs), jobs, [lazy] * len(jobs)):
+                    fragments.update(rendered)
+        except BrokenProcessPool:
+            # e.g. a calling script without the `if __name__ == "__main__"` guard spawn needs
+            print("⚠️ Report worker pool failed; rendering in this process.")
+            fragments.update(_render_agents(source, [job for job in todo if job[0] not in fragments], lazy))
+    elif todo:
+        fragments.update(_render_agents(source, todo, lazy))
+
+    if lazy:
+        for entry_dir in entries:
+            _link_tree(entry_dir, report_dir)
+    _evict_unused_entries(cache_dir, entries)
+    return fragments
+
+def generate_leaderboard_report(results_path, output_html_path, lazy=None, cache_dir=None, workers=None):
+    """
+    Renders the leaderboard report.
+    Inline mode writes one self-contained HTML file (images base64-encoded).
+    Lazy mode writes an HTML shell with only the leaderboard and agent summaries;
+    case cards live in cases/<agent>/<page>.json next to it and are fetched when
+    a tab is opened, one page at a time, with images referenced from images/.
+    Lazy reports must be served over HTTP (e.g. the /results mount); by default
+    lazy mode is used when there are more than INLINE_MAX_CASES cases.
+
+    Each agent's tab is a fragment cached in `cache_dir` (default: .report_cache
+    next to the report) by a hash of that agent's results, and only changed
+    agents are re-rendered (in a pool of up to `workers` processes for large
+    reports). Case rows are read from cases.parquet a row group at
+    a time, so memory does not grow with the number of cases.
+    """
+    if results_path.endswith(".json"):
+        analyses, cases = load_results(results_path, columns=CARD_COLUMNS + ['latency'])
+        leaderboard, source = cases[['agent', 'latency']], cases[CARD_COLUMNS]
+    else:
+        # Only the leaderboard columns are loaded; case cards are read a row group at a time
+        analyses = read_agents(results_path)['agents']
+        leaderboard = read_cases(results_path, columns=['agent', 'latency'])
+        source = os.path.join(results_path, CASES_FILE)
+    if lazy is None:
+        lazy = len(leaderboard) > INLINE_MAX_CASES
+    report_dir = os.path.dirname(os.path.abspath(output_html_path))
+    summary = aggregate(leaderboard)
 
     sorted_agents = sorted(
-        data.items(), 
-        key=lambda x: x[1]['analysis']['overall_score_percent'], 
+        analyses.items(), 
+        key=lambda x: x[1]['overall_score_percent'], 
         reverse=True
     )
     
     # 1. Leaderboard Rows (with colored bars)
     leaderboard_rows = ""
-    for rank, (agent_name, content) in enumerate(sorted_agents, 1):
-        metrics = content['analysis']['metrics']
-        score = content['analysis']['overall_score_percent']
-        grade = content['analysis']['overall_grade']
+    for rank, (agent_name, agent_analysis) in enumerate(sorted_agents, 1):
+        metrics = agent_analysis['metrics']
+        score = agent_analysis['overall_score_percent']
+        grade = agent_analysis['overall_grade']
+        # Latency tails come from common/stats.py; legacy results only have per-case latencies
+        latency = agent_analysis.get('latency') or {'mean': summary['mean_latency'].get(agent_name, 0.0)}
+        latency_cell = f"{round(float(latency['mean']), 2)}s"
+        if 'p95' in latency:
+            latency_cell += f" <small>(p95 {round(latency['p95'], 2)}s)</small>"
         grade_color = "#27ae60" if grade == "PASS" else "#c0392b"
         
         # Helper for score bars
@@ -53,89 +465,31 @@ def generate_leaderboard_report(json_path, output_html_path):
                 <td>{score_bar(metrics['prediction'])}</td>
                 <td>{score_bar(metrics['planning'])}</td>
                 <td style="color: {'#c0392b' if metrics['total_violations'] > 0 else 'inherit'}">{metrics['total_violations']}</td>
-                <td>{round(sum(d['latency'] for d in content['details'])/len(content['details']), 2)}s</td>
+                <td>{latency_cell}</td>
             </tr>
         """
 
     # 2. Agent Tabs (with original insights layout)
-    agent_tabs_html = ""
-    tab_buttons = ""
+    fragments = render_agent_fragments(sorted_agents, source, report_dir,
+                                       lazy=lazy, cache_dir=cache_dir, workers=workers)
+    agent_tabs_html = []
+    tab_buttons = []
     
-    for idx, (agent_name, content) in enumerate(sorted_agents):
+    for idx, (agent_name, agent_analysis) in enumerate(sorted_agents):
         active_class = "active" if idx == 0 else ""
         display_style = "block" if idx == 0 else "none"
         
-        tab_buttons += f"""
+        tab_buttons.append(f"""
             <button class="tab-link {active_class}" onclick="openAgentTab('{agent_name}')">{agent_name}</button>
-        """
-
-        analysis = content['analysis'].get('analysis', {})
-        def safe_list(lst):
-             return "".join([f"<li>{item}</li>" for item in (lst if lst else [])])
-
-        score_color = "#27ae60" if content['analysis']['overall_grade'] == "PASS" else "#c0392b"
-
-        # Test Cases (Collapsible)
-        cases_html = ""
-        for case in content['details']:
-            case_id = case.get('id', 'unknown')
-            img_path = case.get('image_path', '')
-            img_b64 = encode_image_to_base64(img_path)
-            
-            img_elem = f'<img src="data:image/jpeg;base64,{img_b64}" class="case-img">' if img_b64 else '<div class="no-img">Image Not Found<br><small>' + img_path + '</small></div>'
-            status_icon = "✅" if case['scores']['planning'] > 0.6 else "⚠️"
-            critique = case.get('critique', 'No critique').replace('"', '')
-
-            cases_html += f"""
-            <details class="case-card">
-                <summary class="case-header">
-                    <span>{status_icon} <b>Test Case #{case_id}</b></span>
-                    <span class="score-tag">Plan Score: {case['scores']['planning']}</span>
-                </summary>
-                <div class="case-body">
-                    <div class="img-col">{img_elem}</div>
-                    <div class="info-col">
-                        <div class="log-row"><strong>👁️ Perception:</strong> {case['generated_responses'].get('perception', '-')}</div>
-                        <div class="log-row"><strong>🔮 Prediction:</strong> {case['generated_responses'].get('prediction', '-')}</div>
-                        <div class="log-row"><strong>🤖 Plan:</strong> {case['generated_responses'].get('planning', '-')}</div>
-                        <div class="log-row ground-truth"><strong>📖 Truth Reference:</strong> {case['generated_responses'].get('gt_planning_context', '-')}</div>
-                        <div class="log-row critique"><strong>📝 Judge:</strong> "{critique}"</div>
-                    </div>
-                </div>
-            </details>
-            """
+        """)
 
-        agent_tabs_html += f"""
+        agent_tabs_html.append(f"""
         <div id="{agent_name}" class="agent-tab-content" style="display: {display_style};">
-            
-            <div class="agent-summary-header">
-                <h2>Analysis: {agent_name}</h2>
-                <div class="score-badge" style="color: {score_color}">
-                    <div style="font-size: 1.5em;">{content['analysis']['overall_grade']}</div>
-                    <span>Score: {content['analysis']['overall_score_percent']}%</span>
-                </div>
-            </div>
-
-            <div class="insights-container">
-                <div class="insight-box strength-box">
-                    <h3>✅ Strengths</h3>
-                    <ul>{safe_list(analysis.get('strengths'))}</ul>
-                </div>
-                <div class="insight-box weakness-box">
-                    <h3>❌ Weaknesses</h3>
-                    <ul>{safe_list(analysis.get('weaknesses'))}</ul>
-                </div>
-            </div>
-            
-            <div class="insight-box recommendation-box">
-                <h3>💡 Recommendations</h3>
-                <ul>{safe_list(analysis.get('recommendations'))}</ul>
-            </div>
-
-            <h3 style="margin-top:30px; border-bottom: 2px solid #eee; padding-bottom:10px;">Detailed Test Cases ({len(content['details'])})</h3>
-            {cases_html}
+            {fragments[agent_name]}
         </div>
-        """
+        """)
+    tab_buttons = "".join(tab_buttons)
+    agent_tabs_html = "".join(agent_tabs_html)
 
     # 3. Final HTML (with restored CSS)
     html_template = f"""
@@ -199,6 +553,11 @@ def generate_leaderboard_report(json_path, output_html_path):
             .log-row {{ margin-bottom: 10px; font-size: 0.95em; line-height: 1.5; }}
             .ground-truth {{ background: #fffde7; padding: 12px; border-left: 4px solid #f1c40f; border-radius: 4px; margin-top: 15px; }}
             .critique {{ background: #e8f6fa; padding: 12px; border-left: 4px solid #3498db; border-radius: 4px; font-style: italic; margin-top: 15px; }}
+
+            /* Lazy mode pager */
+            .pager {{ display: flex; gap: 12px; align-items: center; justify-content: center; margin: 10px 0 20px; }}
+            .page-btn {{ padding: 6px 14px; border: 1px solid #ddd; background: white; border-radius: 4px; cursor: pointer; }}
+            .page-btn:disabled {{ color: #bbb; cursor: default; }}
             
         </style>
         <script>
@@ -218,14 +577,103 @@ def generate_leaderboard_report(json_path, output_html_path):
                         btns[i].className += " active";
                     }}
                 }}
+
+                var list = document.getElementById(agentName).querySelector(".case-list");
+                if (list && list.dataset.loaded === "-1") {{ loadCasePage(list, 0); }}
             }}
+
+            // Lazy mode: case cards are fetched one JSON page at a time
+            function el(tag, cls, text) {{
+                var e = document.createElement(tag);
+                if (cls) e.className = cls;
+                if (text !== undefined) e.textContent = text;
+                return e;
+            }}
+
+            function logRow(cls, label, text) {{
+                var row = el("div", "log-row " + cls);
+                row.appendChild(el("strong", "", label + " "));
+                row.appendChild(document.createTextNode(text));
+                return row;
+            }}
+
+            function caseCard(c) {{
+                var card = el("details", "case-card");
+                var head = el("summary", "case-header");
+                var title = el("span", "", (c.planning > 0.6 ? "✅ " : "⚠️ "));
+                title.appendChild(el("b", "", "Test Case #" + c.case_id));
+                head.appendChild(title);
+                head.appendChild(el("span", "score-tag", "Plan Score: " + c.planning));
+                card.appendChild(head);
+
+                var body = el("div", "case-body");
+                var imgCol = el("div", "img-col");
+                if (c.image) {{
+                    var img = el("img", "case-img");
+                    img.loading = "lazy";
+                    img.src = c.image;
+                    imgCol.appendChild(img);
+                }} else {{
+                    var missing = el("div", "no-img", "Image Not Found");
+                    missing.appendChild(document.createElement("br"));
+                    missing.appendChild(el("small", "", c.image_path));
+                    imgCol.appendChild(missing);
+                }}
+                var info = el("div", "info-col");
+                info.appendChild(logRow("", "👁️ Perception:", c.perception));
+                info.appendChild(logRow("", "🔮 Prediction:", c.prediction));
+                info.appendChild(logRow("", "🤖 Plan:", c.plan));
+                info.appendChild(logRow("ground-truth", "📖 Truth Reference:", c.truth));
+                info.appendChild(logRow("critique", "📝 Judge:", '"' + c.critique + '"'));
+                body.appendChild(imgCol);
+                body.appendChild(info);
+                card.appendChild(body);
+                return card;
+            }}
+
+            function loadCasePage(list, page) {{
+                var pages = parseInt(list.dataset.pages, 10);
+                list.dataset.loaded = page;
+                list.textContent = "Loading...";
+                fetch(list.dataset.chunks + "/" + page + ".json")
+                    .then(function (r) {{ if (!r.ok) throw new Error(r.status); return r.json(); }})
+                    .then(function (cases) {{
+                        list.textContent = "";
+                        cases.forEach(function (c) {{ list.appendChild(caseCard(c)); }});
+                        renderPager(list, page, pages);
+                    }})
+                    .catch(function (e) {{
+                        list.textContent = "Could not load cases (" + e.message + "). Serve this report over HTTP, e.g. via /results.";
+                        list.dataset.loaded = "-1";
+                    }});
+            }}
+
+            function renderPager(list, page, pages) {{
+                var pager = list.nextElementSibling;
+                pager.textContent = "";
+                if (pages < 2) return;
+                var prev = el("button", "page-btn", "‹ Prev");
+                prev.disabled = page === 0;
+                prev.onclick = function () {{ loadCasePage(list, page - 1); }};
+                var next = el("button", "page-btn", "Next ›");
+                next.disabled = page >= pages - 1;
+                next.onclick = function () {{ loadCasePage(list, page + 1); }};
+                pager.appendChild(prev);
+                pager.appendChild(el("span", "page-info", "Page " + (page + 1) + " of " + pages));
+                pager.appendChild(next);
+            }}
+
+            document.addEventListener("DOMContentLoaded", function () {{
+                var first = document.querySelector(".agent-tab-content .case-list");
+                if (first) loadCasePage(first, 0);
+            }});
         </script>
     </head>
     <body>
         <div class="container">
             <header>
                 <h1>🚦 AutoDrive Benchmark Results</h1>
-                <p style="color: #777;">Generated: {os.popen('date').read().strip()}</p>
+                <p style="color: #777;">Generated: {datetime.now().astimezone().strftime('%a %b %d %H:%M:%S %Z %Y')}</p>
             </header>
             
             <h2 style="margin-top:0;">🏆 Leaderboard</h2>
@@ -256,4 +704,94 @@ def generate_leaderboard_report(json_path, output_html_path):
     with open(output_html_path, 'w') as f:
         f.write(html_template)
     
-    return output_html_path
\ No newline at end of file
+    return output_html_path
+
+
+def generate_history_report(registry, output_html_path, trend_runs=10):
+    """
+    Cross-run leaderboard from a RunRegistry: latest score per model, best
+    score, run count and the recent score trend. Built from the stored
+    per-model summaries only; no per-case data is loaded. Scores from
+    different judge models or dataset snapshots are not comparable, so each
+    (judge, dataset) pair gets its own table and ranking.
+    """
+    trends = registry.trends(limit=trend_runs)
+
+    groups = {}
+    for model in registry.leaderboard():
+        groups.setdefault((model['judge_model'], model['dataset_hash']), []).append(model)
+
+    tables = ""
+    for (judge_model, dataset_hash), models in groups.items():
+        rows = ""
+        for rank, model in enumerate(models, 1):
+            grade_color = "#27ae60" if model['latest_grade'] == "PASS" else "#c0392b"
+            latest, previous = model['latest_score'], model['previous_score']
+            if previous is None or latest is None:
+                delta = "-"
+            else:
+                change = round(latest - previous, 1)
+                delta = f"<span style=\"color: {'#27ae60' if change >= 0 else '#c0392b'}\">{change:+}</span>"
+            trend = " → ".join(str(s) for s in trends.get((model['agent'], judge_model, dataset_hash), []))
+            rows += f"""
+                <tr>
+                    <td>#{rank}</td>
+                    <td><b>{model['agent']}</b></td>
+                    <td style="color: {grade_color}; font-weight:bold;">{model['latest_grade']}</td>
+                    <td><b>{latest}%</b></td>
+                    <td>{delta}</td>
+                    <td>{model['best_score']}%</td>
+                    <td>{model['runs']}</td>
+                    <td class="trend">{trend}</td>
+                    <td><a href="runs/{model['latest_run_id']}/leaderboard.html">{model['latest_at'][:16].replace('T', ' ')}</a></td>
+                </tr>
+            """
+        tables += f"""
+            <h2>Judge: {judge_model or 'unknown'} · Dataset: <code>{(dataset_hash or 'unknown')[:12]}</code></h2>
+            <table>
+                <thead>
+                    <tr>
+                        <th>Rank</th><th>Model</th><th>Grade</th><th>Latest</th><th>Δ</th>
+                        <th>Best</th><th>Runs</th><th>Trend (last {trend_runs})</th><th>Last Run</th>
+                    </tr>
+                </thead>
+                <tbody>
+                    {rows}
+                </tbody>
+            </table>
+        """
+
+    html_template = f"""
+    <!DOCTYPE html>
+    <html>
+    <head>
+        <title>🚦 AutoDrive Benchmark History</title>
+        <style>
+            body {{ font-family: 'Segoe UI', Roboto, Helvetica, Arial, sans-serif; background: #f0f2f5; margin: 0; padding: 20px; color: #333; }}
+            .container {{ max-width: 1200px; margin: 0 auto; background: white; padding: 30px; border-radius: 12px; box-shadow: 0 2px 10px rgba(0,0,0,0.05); }}
+            header {{ text-align: center; margin-bottom: 30px; }}
+            h1 {{ margin: 0; color: #2c3e50; }}
+            h2 {{ font-size: 1.1em; color: #2c3e50; margin: 30px 0 10px; }}
+            table {{ width: 100%; border-collapse: collapse; }}
+            th {{ background: #f8f9fa; color: #555; padding: 12px 15px; text-align: left; font-weight: 600; }}
+            td {{ padding: 12px 15px; border-bottom: 1px solid #eee; vertical-align: middle; }}
+            tr:hover {{ background: #f9f9f9; }}
+            .trend {{ font-family: monospace; font-size: 0.9em; color: #555; }}
+        </style>
+    </head>
+    <body>
+        <div class="container">
+            <header>
+                <h1>🚦 AutoDrive Benchmark History</h1>
+                <p>Latest result per model across all recorded runs, one table per judge model and dataset snapshot. Click a date for that run's full report.</p>
+            </header>
+            {tables}
+        </div>
+    </body>
+    </html>
+    """
+
+    with open(output_html_path, 'w') as f:
+        f.write(html_template)
+
+    return output_html_path
@@ -0,0 +1,164 @@
+"""
+Content-Addressed Image Cache.
+Lets White Agent servers receive images as raw bytes keyed by their SHA-256,
+so each image crosses the wire once per server instead of once per request,
+and judge/driver hosts no longer need a shared filesystem.
+
+Wire protocol (mounted by mount_image_routes):
+    HEAD /images/{sha256}   -> 200 if cached, 404 otherwise
+    PUT  /images/{sha256}   -> raw image bytes (application/octet-stream);
+                               rejected with 400 if the bytes do not hash to {sha256}
+                               and with 413 above the upload limit
+Task requests then reference the image by hash ("image_sha256"). Anything but a
+hex SHA-256 is rejected with 400 before the cache is touched.
+"""
+import os
+import re
+import hashlib
+import threading
+from collections import OrderedDict
+
+DEFAULT_MAX_BYTES = 512 * 1024 * 1024
+# Largest body accepted by PUT /images/{sha256}
+DEFAULT_MAX_UPLOAD_BYTES = 32 * 1024 * 1024
+# Digests come from clients and name files in disk_dir, so nothing else is accepted
+DIGEST_PATTERN = re.compile(r"^[0-9a-f]{64}$")
+
+
+def image_digest(data):
+    return hashlib.sha256(data).hexdigest()
+
+
+def _valid_digest(digest):
+    """The lower-cased digest. Raises ValueError unless it is a hex SHA-256."""
+    if not isinstance(digest, str) or not DIGEST_PATTERN.match(digest.lower()):
+        raise ValueError(f"Invalid image digest: {digest!r}")
+    return digest.lower()
+
+
+class ImageCache:
+    """
+    Thread-safe LRU of image bytes keyed by SHA-256, bounded by total size.
+    With `disk_dir` set, entries are also written there and survive restarts
+    (and in-memory eviction). An entry larger than `max_bytes` is never held
+    in memory (only on disk, if any).
+    """
+    def __init__(self, max_bytes=DEFAULT_MAX_BYTES, disk_dir=None):
+        self.max_bytes = max_bytes
+        self.disk_dir = disk_dir
+        self.size = 0
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        if disk_dir:
+            os.makedirs(disk_dir, exist_ok=True)
+
+    def _disk_path(self, digest):
+        return os.path.join(self.disk_dir, digest)
+
+    def put(self, data, digest=None):
+        """Stores `data`. If `digest` is given it must match. Returns the digest."""
+        if digest is not None:
+            digest = _valid_digest(digest)
+        actual = image_digest(data)
+        if digest is not None and digest != actual:
+            raise ValueError(f"Image hash mismatch: expected {digest}, got {actual}")
+
+        with self._lock:
+            if actual in self._entries:
+                self._entries.move_to_end(actual)
+                return actual
+            if len(data) <= self.max_bytes:
+                self._entries[actual] = bytes(data)
+                self.size += len(data)
+                while self.size > self.max_bytes:
+                    _, evicted = self._entries.popitem(last=False)
+                    self.size -= len(evicted)
+
+        if self.disk_dir and not os.path.exists(self._disk_path(actual)):
+            tmp_path = self._disk_path(actual) + ".tmp"
+            with open(tmp_path, "wb") as f:
+                f.write(data)
+            os.replace(tmp_path, self._disk_path(actual))
+        return actual
+
+    def get(self, digest):
+        """
+        Returns the cached bytes, or None if this server has never seen them.
+        Raises ValueError for anything but a hex SHA-256.
+        """
+        digest = _valid_digest(digest)
+        with self._lock:
+            data = self._entries.get(digest)
+            if data is not None:
+                self._entries.move_to_end(digest)
+                self.hits += 1
+                return data
+
+        if self.disk_dir and os.path.exists(self._disk_path(digest)):
+            with open(self._disk_path(digest), "rb") as f:
+                data = f.read()
+            self.put(data)
+            with self._lock:
+                self.hits += 1
+            return data
+
+        with self._lock:
+            self.misses += 1
+        return None
+
+    def __contains__(self, digest):
+        digest = _valid_digest(digest)
+        with self._lock:
+            if digest in self._entries:
+                return True
+        return bool(self.disk_dir) and os.path.exists(self._disk_path(digest))
+
+
+def mount_image_routes(app, cache, max_upload_bytes=DEFAULT_MAX_UPLOAD_BYTES):
+    """
+    Adds the HEAD/PUT /images/{sha256} endpoints to a Starlette or FastAPI app.
+    Bodies over `max_upload_bytes` (or over the cache's own size when it has
+    no disk copy to keep them in) are rejected with 413 before they are read
+    in full.
+    """
+    from starlette.responses import JSONResponse, Response
+
+    if not cache.disk_dir:
+        max_upload_bytes = min(max_upload_bytes, cache.max_bytes)
+
+    def too_large():
+        return JSONResponse({"error": "too_large", "max_bytes": max_upload_bytes}, status_code=413)
+
+    async def image_endpoint(request):
+        try:
+            digest = _valid_digest(request.path_params["digest"])
+        except ValueError as e:
+            return JSONResponse({"error": "invalid_digest", "detail": str(e)}, status_code=400)
+        if request.method == "HEAD":
+            return Response(status_code=200 if digest in cache else 404)
+
+        try:
+            declared = int(request.headers.get("content-length", 0))
+        except ValueError:
+            return JSONResponse({"error": "bad_content_length"}, status_code=400)
+        if declared > max_upload_bytes:
+            return too_large()
+        # Content-Length may be missing (chunked) or wrong, so the bytes read are checked too
+        chunks, received = [], 0
+        async for chunk in request.stream():
+            received += len(chunk)
+            if received > max_upload_bytes:
+                return too_large()
+            chunks.append(chunk)
+        data = b"".join(chunks)
+        if not data:
+            return JSONResponse({"error": "empty_body"}, status_code=400)
+        try:
+            cache.put(data, digest=digest)
+        except ValueError as e:
+            return JSONResponse({"error": "hash_mismatch", "detail": str(e)}, status_code=400)
+        return JSONResponse({"sha256": digest, "bytes": len(data)}, status_code=201)
+
+    app.add_route("/images/{digest}", image_endpoint, methods=["HEAD", "PUT"])
@@ -0,0 +1,343 @@
+"""
+Prometheus Metrics.
+Counters, gauges and histograms for the agent servers, rendered in the
+Prometheus text exposition format by GET /metrics (see mount_metrics_route).
+No client library is needed.
+
+Updates are lock-free: every thread writes only to its own shard of a metric
+(a plain list, created once per thread and label set) and a scrape adds the
+shards up. When a thread exits, its shard is folded into a retired total.
+Values that already live elsewhere (queue depth, cache sizes, the
+task store) are not mirrored; they are read at scrape time through callbacks
+registered with REGISTRY.gauge_callback() / counter_callback().
+
+    curl -s localhost:8001/metrics | grep autodrive_
+"""
+import time
+import bisect
+import weakref
+import threading
+from contextlib import contextmanager
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# Seconds; sized for model calls (tens of ms for the fake backend up to minutes for a hung VLM)
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0, 300.0)
+
+
+class _ThreadShard:
+    """Held only by a thread's threading.local, so it is freed when the thread exits."""
+    __slots__ = ("__weakref__",)
+
+
+class _Shards:
+    """A vector of `size` values with one shard per writing thread."""
+    def __init__(self, size):
+        self.size = size
+        self._local = threading.local()
+        # id(cells) -> cells of each live thread; exited threads are added into _retired
+        self._shards = {}
+        self._retired = [0.0] * size
+        self._lock = threading.Lock()
+
+    def mine(self):
+        cells = getattr(self._local, "cells", None)
+        if cells is None:
+            # Once per thread: the only time a lock is taken on the write path
+            cells = [0.0] * self.size
+            with self._lock:
+                self._shards[id(cells)] = cells
+            holder = _ThreadShard()
+            weakref.finalize(holder, self._retire, cells)
+            self._local.cells, self._local.holder = cells, holder
+        return cells
+
+    def _retire(self, cells):
+        with self._lock:
+            del self._shards[id(cells)]
+            for i, value in enumerate(cells):
+                self._retired[i] += value
+
+    def totals(self):
+        with self._lock:
+            shards = list(self._shards.values())
+            totals = list(self._retired)
+        for cells in shards:
+            for i, value in enumerate(cells):
+                totals[i] += value
+        return totals
+
+
+class _CounterValue:
+    def __init__(self):
+        self._shards = _Shards(1)
+
+    def inc(self, amount=1):
+        self._shards.mine()[0] += amount
+
+    def get(self):
+        return self._shards.totals()[0]
+
+
+class _GaugeValue(_CounterValue):
+    def dec(self, amount=1):
+        self._shards.mine()[0] -= amount
+
+    @contextmanager
+    def track_inprogress(self, amount=1):
+        self.inc(amount)
+        try:
+            yield
+        finally:
+            self.dec(amount)
+
+
+class _HistogramValue:
+    def __init__(self, buckets):
+        self.buckets = buckets
+        # One cell per bucket plus +Inf, then the sum and the count of observations
+        self._shards = _Shards(len(buckets) + 3)
+
+    def observe(self, value):
+        cells = self._shards.mine()
+        cells[bisect.bisect_left(self.buckets, value)] += 1
+        cells[-2] += value
+        cells[-1] += 1
+
+    @contextmanager
+    def time(self):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start)
+
+    def get(self):
+        """(cumulative bucket counts incl. +Inf, sum, count)."""
+        totals = self._shards.totals()
+        cumulative, running = [], 0.0
+        for count in totals[:-2]:
+            running += count
+            cumulative.append(running)
+        return cumulative, totals[-2], totals[-1]
+
+
+class _Metric:
+    """A metric family: one value per combination of label values."""
+    kind = None
+
+    def __init__(self, name, documentation, labelnames=(), **options):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._options = options
+        self._values = {}
+        self._lock = threading.Lock()
+        if not self.labelnames:
+            self._default = self.labels()
+
+    def _new_value(self):
+        raise NotImplementedError
+
+    def labels(self, *values, **by_name):
+        key = tuple(str(by_name[n]) for n in self.labelnames) if by_name else tuple(str(v) for v in values)
+        value = self._values.get(key)
+        if value is None:
+            if len(key) != len(self.labelnames):
+                raise ValueError(f"{self.name} expects labels {self.labelnames}, got {key}")
+            with self._lock:
+                value = self._values.setdefault(key, self._new_value())
+        return value
+
+    def samples(self):
+        """[(suffix, labels dict, value)] for rendering."""
+        out = []
+        for key, value in list(self._values.items()):
+            labels = dict(zip(self.labelnames, key))
+            out.extend(self._value_samples(labels, value))
+        return out
+
+    def _value_samples(self, labels, value):
+        return [("", labels, value.get())]
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def _new_value(self):
+        return _CounterValue()
+
+    def inc(self, amount=1):
+        self._default.inc(amount)
+
+
+class Gauge(_Metric):
+    kind = "gauge"
+
+    def _new_value(self):
+        return _GaugeValue()
+
+    def inc(self, amount=1):
+        self._default.inc(amount)
+
+    def dec(self, amount=1):
+        self._default.dec(amount)
+
+    def track_inprogress(self, amount=1):
+        return self._default.track_inprogress(amount)
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def _new_value(self):
+        return _HistogramValue(tuple(self._options.get("buckets") or DEFAULT_BUCKETS))
+
+    def observe(self, value):
+        self._default.observe(value)
+
+    def time(self):
+        return self._default.time()
+
+    def _value_samples(self, labels, value):
+        cumulative, total, count = value.get()
+        bounds = [_format_value(b) for b in value.buckets] + ["+Inf"]
+        samples = [("_bucket", {**labels, "le": le}, c) for le, c in zip(bounds, cumulative)]
+        samples.append(("_sum", labels, total))
+        samples.append(("_count", labels, count))
+        return samples
+
+
+class _Callback:
+    """A metric whose values are read from `fn` at scrape time."""
+    def __init__(self, kind, name, documentation, fn, labelnames=()):
+        self.kind = kind
+        self.name = name
+        self.documentation = documentation
+        self.fn = fn
+        self.labelnames = tuple(labelnames)
+
+    def samples(self):
+        try:
+            result = self.fn()
+        except Exception:
+            # A failing source must not break the whole scrape
+            return []
+        if not self.labelnames:
+            return [("", {}, result)]
+        return [("", dict(zip(self.labelnames, key)), value) for key, value in result.items()]
+
+
+class Registry:
+    """Named metrics of this process. Asking for an existing name returns the existing metric."""
+    def __init__(self):
+        self._metrics = {}
+        self._lock = threading.Lock()
+
+    def _get_or_create(self, cls, name, documentation, labelnames, **options):
+        with self._lock:
+            metric = self._metrics.get(name)
+            if metric is None:
+                metric = self._metrics[name] = cls(name, documentation, labelnames, **options)
+            return metric
+
+    def counter(self, name, documentation, labelnames=()):
+        return self._get_or_create(Counter, name, documentation, labelnames)
+
+    def gauge(self, name, documentation, labelnames=()):
+        return self._get_or_create(Gauge, name, documentation, labelnames)
+
+    def histogram(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        return self._get_or_create(Histogram, name, documentation, labelnames, buckets=buckets)
+
+    def gauge_callback(self, name, documentation, fn, labelnames=()):
+        """
+        Gauge read from fn() on every scrape: a number, or {label values tuple: number}
+        with labelnames. Registering a name again replaces the callback.
+        """
+        with self._lock:
+            self._metrics[name] = _Callback("gauge", name, documentation, fn, labelnames)
+
+    def counter_callback(self, name, documentation, fn, labelnames=()):
+        """Same as gauge_callback for a monotonically increasing count kept elsewhere."""
+        with self._lock:
+            self._metrics[name] = _Callback("counter", name, documentation, fn, labelnames)
+
+    def render(self):
+        """All metrics in the Prometheus text exposition format."""
+        with self._lock:
+            metrics = list(self._metrics.values())
+        lines = []
+        for metric in sorted(metrics, key=lambda m: m.name):
+            lines.append(f"# HELP {metric.name} {_escape_help(metric.documentation)}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            for suffix, labels, value in metric.samples():
+                lines.append(f"{metric.name}{suffix}{_format_labels(labels)} {_format_value(value)}")
+        return "\n".join(lines) + "\n"
+
+
+def _escape_help(text):
+    return text.replace("\\", "\\\\").replace("\n", "\\n")
+
+
+def _format_labels(labels):
+    if not labels:
+        return ""
+    def escape(value):
+        return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+    return "{" + ",".join(f'{k}="{escape(v)}"' for k, v in labels.items()) + "}"
+
+
+def _format_value(value):
+    value = float(value)
+    if value == float("inf"):
+        return "+Inf"
+    if value.is_integer():
+        return str(int(value))
+    return repr(value)
+
+
+REGISTRY = Registry()
+
+# --- SHARED METRICS (updated by the agents themselves) ---
+LLM_CALL_SECONDS = REGISTRY.histogram(
+    "autodrive_llm_call_seconds", "Latency of chat-completion calls.", ("role", "model"))
+LLM_CALLS = REGISTRY.counter(
+    "autodrive_llm_calls_total", "Chat-completion calls by outcome (ok, error, timeout, abandoned).", ("role", "model", "outcome"))
+JUDGE_EVENTS = REGISTRY.counter(
+    "autodrive_judge_events_total", "Judge calls, retries, parse failures and fallbacks.", ("event",))
+ANALYSIS_CACHE = REGISTRY.counter(
+    "autodrive_analysis_cache_requests_total", "Batch-analysis cache lookups by result (hit, miss).", ("result",))
+CASES = REGISTRY.counter(
+    "autodrive_cases_total", "Assessed cases by outcome (ok, timed_out).", ("outcome",))
+CASE_SECONDS = REGISTRY.histogram(
+    "autodrive_case_seconds", "Driver plus judge time of an assessed case.")
+TASKS = REGISTRY.counter(
+    "autodrive_tasks_total", "Server tasks by outcome.", ("server", "outcome"))
+TASKS_IN_FLIGHT = REGISTRY.gauge(
+    "autodrive_tasks_in_flight", "Server tasks currently executing.", ("server",))
+
+
+def observe_llm_call(role, model, start, outcome):
+    """Records one chat-completion call that started at perf_counter() `start`."""
+    LLM_CALL_SECONDS.labels(role, model).observe(time.perf_counter() - start)
+    LLM_CALLS.labels(role, model, outcome).inc()
+
+
+def watch_image_cache(cache, registry=REGISTRY):
+    """Exposes an ImageCache's size and hit/miss counts (read at scrape time)."""
+    registry.gauge_callback("autodrive_image_cache_bytes", "Bytes held by the image cache.", lambda: cache.size)
+    registry.gauge_callback("autodrive_image_cache_entries", "Images held in memory by the image cache.",
+                            lambda: len(cache._entries))
+    registry.counter_callback("autodrive_image_cache_requests_total", "Image cache lookups by result (hit, miss).",
+                              lambda: {("hit",): cache.hits, ("miss",): cache.misses}, ("result",))
+
+
+def mount_metrics_route(app, registry=REGISTRY):
+    """Adds GET /metrics to a Starlette or FastAPI app."""
+    from starlette.responses import Response
+
+    async def metrics_endpoint(request):
+        return Response(registry.render(), media_type=CONTENT_TYPE)
+
+    app.add_route("/metrics", metrics_endpoint, methods=["GET"])
@@ -0,0 +1,225 @@
+"""
+Structured Response Parser.
+Turns whatever a White Agent returns (a dict, JSON text, fenced JSON, a Python
+repr, or loose "Perception: ... Planning: ..." prose) into the
+{perception, prediction, planning} dict the Green Agent grades.
+
+Every call reports WHICH strategy succeeded so runs can track how often drivers
+fall off the happy path:
+    dict            -> already structured, no parsing done
+    json            -> the whole text was valid JSON
+    json_extracted  -> a JSON object was found inside surrounding text/fences
+    json_repaired   -> a near-JSON object (single quotes, True/None, trailing commas)
+    sections        -> labelled prose sections
+    raw             -> nothing recognisable; the whole text becomes the plan
+"""
+import json
+import re
+
+RESPONSE_FIELDS = ("perception", "prediction", "planning")
+
+_DECODER = json.JSONDecoder()
+
+# One alternation for every section label, scanned once with finditer.
+# The label must start a word and be followed by a ':' or '-' separator
+# (optionally wrapped in markdown bold), e.g. "**Plan:** Stop."
+_SECTION_RE = re.compile(
+    r"(?<![A-Za-z])\**(perception|see|prediction|expect|planning|plan|action|command)\**\s*[:\-]+\**\s*",
+    re.IGNORECASE,
+)
+_SECTION_FIELD = {
+    "perception": "perception", "see": "perception",
+    "prediction": "prediction", "expect": "prediction",
+    "planning": "planning", "plan": "planning", "action": "planning", "command": "planning",
+}
+
+_PY_LITERALS = {"True": "true", "False": "false", "None": "null"}
+
+# Tokens that differ between a Python repr and JSON: quoted strings (so their
+# contents are never touched), bare Python literals and trailing commas.
+_REPAIR_RE = re.compile(
+    r'"(?:[^"\\]|\\.)*"'
+    r"|'(?:[^'\\]|\\.)*'"
+    r"|\b(?:True|False|None)\b"
+    r"|,(?=\s*[}\]])",
+    re.DOTALL,
+)
+_UNESCAPED_DQUOTE_RE = re.compile(r'(?<!\\)"')
+
+
+def _repair_token(match):
+    token = match.group(0)
+    if token[0] == "'":
+        inner = token[1:-1].replace("\\'", "'")
+        return '"' + _UNESCAPED_DQUOTE_RE.sub('\\\\"', inner) + '"'
+    if token == ",":
+        return ""
+    return _PY_LITERALS.get(token, token)
+
+
+def _repair_json(text):
+    """
+    Single regex pass that rewrites Python-repr style objects into JSON:
+    single-quoted strings, True/False/None and trailing commas.
+    """
+    return _REPAIR_RE.sub(_repair_token, text)
+
+
+def extract_json_object(text):
+    """
+    Finds the first JSON object in `text`.
+    Returns (obj, strategy) or (None, None) when no object can be decoded.
+    """
+    stripped = text.strip()
+    start = stripped.find("{")
+    if start < 0:
+        return None, None
+
+    try:
+        obj, end = _DECODER.raw_decode(stripped, start)
+        if isinstance(obj, dict):
+            whole = start == 0 and not stripped[end:].strip()
+            return obj, "json" if whole else "json_extracted"
+    except ValueError:
+        pass
+
+    # Near-JSON: repair only the candidate object, not the surrounding prose.
+    stop = stripped.rfind("}")
+    if stop <= start:
+        return None, None
+    try:
+        obj, _ = _DECODER.raw_decode(_repair_json(stripped[start:stop + 1]))
+        if isinstance(obj, dict):
+            return obj, "json_repaired"
+    except ValueError:
+        pass
+    return None, None
+
+
+def parse_sections(text):
+    """Splits labelled prose into fields. The first label seen for a field wins."""
+    structured = {}
+    matches = list(_SECTION_RE.finditer(text))
+    for idx, match in enumerate(matches):
+        field = _SECTION_FIELD[match.group(1).lower()]
+        if field in structured:
+            continue
+        end = matches[idx + 1].start() if idx + 1 < len(matches) else len(text)
+        structured[field] = text[match.end():end].strip()
+    return structured
+
+
+def parse_response(resp):
+    """
+    Normalises a White Agent response.
+    Returns (parsed_dict, strategy). The dict is always a fresh copy so callers
+    can annotate it without mutating the agent's original output.
+    """
+    if isinstance(resp, dict):
+        if "response" in resp:
+            return parse_response(resp["response"])
+        if "raw_output" in resp and not any(k in resp for k in RESPONSE_FIELDS):
+            return parse_response(resp["raw_output"])
+        return dict(resp), "dict"
+
+    text = resp if isinstance(resp, str) else str(resp)
+
+    obj, strategy = extract_json_object(text)
+    if obj is not None:
+        return obj, strategy
+
+    structured = parse_sections(text)
+    if any(structured.get(k) for k in RESPONSE_FIELDS):
+        for key in RESPONSE_FIELDS:
+            structured.setdefault(key, "")
+        if not structured["planning"]:
+            structured["planning"] = text
+        return structured, "sections"
+
+    return {"perception": "", "prediction": "", "planning": text}, "raw"
+
+
+class IncrementalFieldParser:
+    """
+    Reads a JSON object as it streams in and reports each top-level field the
+    moment its value is complete, e.g. `perception` while `planning` is still
+    being generated. Text before the first '{' (a code fence, a preamble) is
+    skipped. feed() returns the (key, value) pairs completed by that chunk.
+    """
+    def __init__(self):
+        self.text = ""
+        self.fields = {}
+        self._pos = 0
+        self._depth = 0
+        self._in_string = False
+        self._escape = False
+        # key -> key_string -> colon -> value -> value_string/value_other -> comma -> key ...
+        self._expect = None
+        self._key = None
+        self._start = 0
+
+    def feed(self, chunk):
+        self.text += chunk
+        text = self.text
+        completed = []
+        for i in range(self._pos, len(text)):
+            c = text[i]
+            if self._expect is None:
+                if c == "{":
+                    self._depth, self._expect = 1, "key"
+                continue
+            if self._in_string:
+                if self._escape:
+                    self._escape = False
+                elif c == "\\":
+                    self._escape = True
+                elif c == '"':
+                    self._in_string = False
+                    if self._depth == 1 and self._expect == "key_string":
+                        self._key = self._decode(text[self._start:i + 1])
+                        self._expect = "colon"
+                    elif self._depth == 1 and self._expect == "value_string":
+                        self._complete(text[self._start:i + 1], completed)
+                continue
+            if c == '"':
+                self._in_string = True
+                if self._depth == 1 and self._expect in ("key", "value"):
+                    self._start = i
+                    self._expect += "_string"
+            elif c in "{[":
+                if self._depth == 1 and self._expect == "value":
+                    self._start, self._expect = i, "value_other"
+                self._depth += 1
+            elif c in "}]":
+                self._depth -= 1
+                if self._depth == 1 and self._expect == "value_other":
+                    self._complete(text[self._start:i + 1], completed)
+                elif self._depth == 0:
+                    if self._expect == "value_other":
+                        self._complete(text[self._start:i], completed)
+                    self._expect = "done"
+            elif self._depth == 1:
+                if c == ":" and self._expect == "colon":
+                    self._expect = "value"
+                elif c == ",":
+                    if self._expect == "value_other":
+                        self._complete(text[self._start:i], completed)
+                    self._expect = "key"
+                elif self._expect == "value" and not c.isspace():
+                    self._start, self._expect = i, "value_other"
+        self._pos = len(text)
+        return completed
+
+    @staticmethod
+    def _decode(raw):
+        try:
+            return json.loads(raw)
+        except ValueError:
+            return None
+
+    def _complete(self, raw, completed):
+        self._expect = "comma"
+        value = self._decode(raw.strip())
+        if self._key is not None and self._key not in self.fields:
+            self.fields[self._key] = value
+            completed.append((self._key, value))
@@ -0,0 +1,213 @@
+"""
+Columnar Results Store.
+Assessment results are kept as one flat table with one row per
+(run, agent, case) and written as Parquet, instead of one nested JSON document.
+
+    output/
+        cases.parquet   # per-case rows (scores, violations, latencies, responses)
+        agents.json     # small per-agent summary (metrics, grade, LLM analysis)
+
+Readers pick only the columns they need (the leaderboard table touches three
+of them), and per-agent aggregates are computed with vectorised groupbys
+rather than Python loops over nested dicts.
+"""
+import os
+import json
+import uuid
+import time
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+CASES_FILE = "cases.parquet"
+AGENTS_FILE = "agents.json"
+
+SCORE_COLUMNS = ["perception", "prediction", "planning"]
+
+TEXT_COLUMNS = [
+    "critique", "feedback", "judge_fallbacks", "image_path",
+    "resp_perception", "resp_prediction", "resp_planning", "gt_planning_context",
+]
+
+# Column order of cases.parquet
+CASE_COLUMNS = [
+    "run_id", "agent", "case_id", *SCORE_COLUMNS,
+    "violation_count", "latency", "queue_time", "judge_latency", "timed_out", "parse_strategy",
+    *TEXT_COLUMNS,
+]
+
+_DICT = pa.dictionary(pa.int32(), pa.string())
+ARROW_SCHEMA = pa.schema(
+    [("run_id", _DICT), ("agent", _DICT), ("case_id", pa.string())]
+    + [(cat, pa.float64()) for cat in SCORE_COLUMNS]
+    + [("violation_count", pa.int64()), ("latency", pa.float64()), ("queue_time", pa.float64()),
+       ("judge_latency", pa.float64()), ("timed_out", pa.bool_()),
+       ("parse_strategy", _DICT)]
+    + [(col, pa.string()) for col in TEXT_COLUMNS]
+)
+
+# Rows per Parquet row group when writing (bounds memory for streamed runs)
+CHUNK_ROWS = 5000
+
+# What the HTML report needs per case card
+CARD_COLUMNS = [
+    "agent", "case_id", "planning", "image_path", "critique",
+    "resp_perception", "resp_prediction", "resp_planning", "gt_planning_context",
+]
+
+
+def new_run_id():
+    return time.strftime("%Y%m%d-%H%M%S") + "-" + uuid.uuid4().hex[:6]
+
+
+def case_row(run_id, agent, report):
+    """Flattens one eval_report (GreenAgent.judge_response output) into a table row."""
+    scores = report.get("scores", {})
+    responses = report.get("generated_responses", {})
+    return {
+        "run_id": run_id,
+        "agent": agent,
+        "case_id": str(report.get("id", "unknown")),
+        **{cat: float(scores.get(cat, 0.0)) for cat in SCORE_COLUMNS},
+        "violation_count": int(report.get("violation_count", 0)),
+        "latency": float(report.get("latency", 0.0)),
+        "queue_time": float(report.get("queue_time", 0.0)),
+        "judge_latency": float(report.get("judge_latency", 0.0)),
+        "timed_out": bool(report.get("timed_out", False)),
+        "parse_strategy": report.get("parse_strategy", ""),
+        "critique": report.get("critique", ""),
+        # Variable-length lists are stored as JSON strings to keep the schema flat
+        "feedback": json.dumps(report.get("feedback", [])),
+        "judge_fallbacks": json.dumps(report.get("judge_fallbacks", [])),
+        "image_path": report.get("image_path") or "",
+        "resp_perception": str(responses.get("perception", "")),
+        "resp_prediction": str(responses.get("prediction", "")),
+        "resp_planning": str(responses.get("planning", "")),
+        "gt_planning_context": str(responses.get("gt_planning_context", "")),
+    }
+
+
+class CaseLog:
+    """
+    Append-only JSONL file of eval_reports, one line per case, flushed as each
+    case completes. Used by streaming assessments instead of an in-memory list.
+    """
+    def __init__(self, path):
+        self.path = path
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._file = open(path, "a")
+
+    def append(self, report):
+        self._file.write(json.dumps(report) + "\n")
+        self._file.flush()
+
+    def close(self):
+        self._file.close()
+
+
+def iter_details(content):
+    """Yields an agent's eval_reports from history, in memory or from its JSONL case log."""
+    if content.get("details_path"):
+        with open(content["details_path"]) as f:
+            for line in f:
+                if line.strip():
+                    yield json.loads(line)
+    else:
+        yield from content.get("details", [])
+
+
+def history_to_frame(history, run_id):
+    """GreenAgent.history -> DataFrame with one row per (run, agent, case)."""
+    rows = [case_row(run_id, agent, report)
+            for agent, content in history.items()
+            for report in iter_details(content)]
+    frame = pd.DataFrame(rows, columns=CASE_COLUMNS)
+    # Few distinct values repeated on every row: dictionary-encode them
+    for col in ("run_id", "agent", "parse_strategy"):
+        frame[col] = frame[col].astype("category")
+    return frame
+
+
+def write_results(history, output_dir, run_id=None, pairwise=None):
+    """
+    Writes cases.parquet and agents.json for a GreenAgent.history; returns their paths.
+    `pairwise` (GreenAgent.compare_agents output) is stored in agents.json.
+    """
+    run_id = run_id or new_run_id()
+    return write_cases(history, output_dir, run_id), write_summary(history, output_dir, run_id, pairwise)
+
+
+def write_cases(history, output_dir, run_id):
+    """Writes cases.parquet for a GreenAgent.history; returns its path."""
+    os.makedirs(output_dir, exist_ok=True)
+    cases_path = os.path.join(output_dir, CASES_FILE)
+
+    # Row groups of CHUNK_ROWS cases, filled across agents: streamed (JSONL) agents are
+    # never fully loaded, and a wide tournament of small agents still gets few row groups
+    with pq.ParquetWriter(cases_path, ARROW_SCHEMA, compression="zstd") as writer:
+        rows = []
+        for agent, content in history.items():
+            for report in iter_details(content):
+                rows.append(case_row(run_id, agent, report))
+                if len(rows) == CHUNK_ROWS:
+                    writer.write_table(_rows_to_table(rows))
+                    rows = []
+        if rows:
+            writer.write_table(_rows_to_table(rows))
+    return cases_path
+
+
+def write_summary(history, output_dir, run_id, pairwise=None):
+    """Writes agents.json (per-agent analysis plus `pairwise`) for a GreenAgent.history; returns its path."""
+    os.makedirs(output_dir, exist_ok=True)
+    agents_path = os.path.join(output_dir, AGENTS_FILE)
+    summary = {
+        "run_id": run_id,
+        "agents": {agent: content.get("analysis", {}) for agent, content in history.items()},
+        "pairwise": pairwise or [],
+    }
+    with open(agents_path, "w") as f:
+        json.dump(summary, f, indent=4)
+    return agents_path
+
+
+def _rows_to_table(rows):
+    return pa.Table.from_pandas(pd.DataFrame(rows, columns=CASE_COLUMNS), schema=ARROW_SCHEMA, preserve_index=False)
+
+
+def read_cases(results_dir, columns=None):
+    """Loads cases.parquet, reading only `columns` when given."""
+    return pd.read_parquet(os.path.join(results_dir, CASES_FILE), columns=columns)
+
+
+def read_agents(results_dir):
+    with open(os.path.join(results_dir, AGENTS_FILE)) as f:
+        return json.load(f)
+
+
+def aggregate(cases, weights=None):
+    """
+    Vectorised per-agent aggregates over a cases frame (any subset of columns):
+    category means, violation totals and latency means. With `weights`
+    (category -> weight) the weighted overall score and grade are added too.
+    """
+    grouped = cases.groupby("agent", observed=True, sort=False)
+    agg = {cat: (cat, "mean") for cat in SCORE_COLUMNS if cat in cases}
+    if "violation_count" in cases:
+        agg["total_violations"] = ("violation_count", "sum")
+    if "latency" in cases:
+        agg["mean_latency"] = ("latency", "mean")
+    if "queue_time" in cases:
+        agg["mean_queue_time"] = ("queue_time", "mean")
+    if "judge_latency" in cases:
+        agg["mean_judge_latency"] = ("judge_latency", "mean")
+    if "timed_out" in cases:
+        agg["timed_out_cases"] = ("timed_out", "sum")
+    out = grouped.agg(**agg) if agg else pd.DataFrame(index=grouped.size().index)
+    out["cases"] = grouped.size()
+
+    if weights:
+        weighted = sum(out[cat] * w for cat, w in weights.items())
+        out["overall_score_percent"] = (weighted * 100).round(1)
+        out["overall_grade"] = (weighted > 0.6).map({True: "PASS", False: "FAIL"})
+    return out
@@ -0,0 +1,297 @@
+"""
+Run Registry.
+Append-only SQLite store of every assessment run, so results from earlier
+tournaments are kept and a model can be compared across weeks without
+re-running it.
+
+    runs        one row per generate_artifacts() call: judge model, config, dataset hash
+    agent_runs  per (run, agent) aggregates: category means, score, grade, analysis
+    cases       per (run, agent, case) results
+    models      running summary per (model, judge model, dataset hash), updated in
+                the same transaction as each insert, so the cross-run leaderboard
+                is a single table read. Runs graded by another judge or on another
+                dataset snapshot are not comparable and get their own row.
+
+Rows are only ever inserted (the `models` summary is the one table that is
+upserted). Reads never touch `cases` unless per-case rows are asked for.
+Registries written by an older schema are upgraded when opened (see
+SCHEMA_VERSION).
+"""
+import json
+import sqlite3
+from datetime import datetime
+from src.common.results_store import iter_details
+
+# Append-only run history, kept next to the per-run folders (runs/<run_id>) in the output directory
+REGISTRY_FILE = "runs.sqlite"
+
+# PRAGMA user_version of the current schema. 2: models keyed by (agent, judge_model,
+# dataset_hash), queue_time/timed_out per case, duplicate_cases per agent run
+SCHEMA_VERSION = 2
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS runs (
+    run_id       TEXT PRIMARY KEY,
+    created_at   TEXT NOT NULL,
+    judge_model  TEXT,
+    dataset_hash TEXT,
+    config       TEXT
+);
+CREATE TABLE IF NOT EXISTS agent_runs (
+    run_id                TEXT NOT NULL REFERENCES runs(run_id),
+    agent                 TEXT NOT NULL,
+    created_at            TEXT NOT NULL,
+    cases                 INTEGER,
+    perception            REAL,
+    prediction            REAL,
+    planning              REAL,
+    total_violations      INTEGER,
+    mean_latency          REAL,
+    overall_score_percent REAL,
+    overall_grade         TEXT,
+    dataset_hash          TEXT,
+    analysis              TEXT,
+    duplicate_cases       INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (run_id, agent)
+);
+CREATE INDEX IF NOT EXISTS idx_agent_runs_trend ON agent_runs (agent, created_at);
+CREATE TABLE IF NOT EXISTS cases (
+    run_id          TEXT NOT NULL,
+    agent           TEXT NOT NULL,
+    case_id         TEXT NOT NULL,
+    perception      REAL,
+    prediction      REAL,
+    planning        REAL,
+    violation_count INTEGER,
+    latency         REAL,
+    judge_latency   REAL,
+    parse_strategy  TEXT,
+    critique        TEXT,
+    feedback        TEXT,
+    queue_time      REAL,
+    timed_out       INTEGER,
+    PRIMARY KEY (run_id, agent, case_id)
+);
+CREATE INDEX IF NOT EXISTS idx_cases_agent_case ON cases (agent, case_id);
+CREATE TABLE IF NOT EXISTS models (
+    agent          TEXT NOT NULL,
+    -- '' when unknown: NULLs would never conflict, so every run would add a row
+    judge_model    TEXT NOT NULL DEFAULT '',
+    dataset_hash   TEXT NOT NULL DEFAULT '',
+    runs           INTEGER NOT NULL,
+    best_score     REAL,
+    latest_run_id  TEXT,
+    latest_at      TEXT,
+    latest_score   REAL,
+    latest_grade   TEXT,
+    previous_score REAL,
+    PRIMARY KEY (agent, judge_model, dataset_hash)
+);
+"""
+
+# Folds one agent run into its (agent, judge_model, dataset_hash) summary row
+UPSERT_MODEL = """
+INSERT INTO models (agent, judge_model, dataset_hash, runs, best_score, latest_run_id, latest_at, latest_score,
+                    latest_grade, previous_score)
+VALUES (?, COALESCE(?, ''), COALESCE(?, ''), 1, ?, ?, ?, ?, ?, NULL)
+ON CONFLICT(agent, judge_model, dataset_hash) DO UPDATE SET
+    runs = runs + 1,
+    best_score = MAX(COALESCE(best_score, excluded.best_score), COALESCE(excluded.best_score, best_score)),
+    previous_score = latest_score,
+    latest_run_id = excluded.latest_run_id,
+    latest_at = excluded.latest_at,
+    latest_score = excluded.latest_score,
+    latest_grade = excluded.latest_grade
+"""
+
+CASE_COLUMNS = ("run_id", "agent", "case_id", "perception", "prediction", "planning", "violation_count", "latency",
+                "judge_latency", "parse_strategy", "critique", "feedback", "queue_time", "timed_out")
+
+
+class RunRegistry:
+    """
+    Thin wrapper around the SQLite registry file.
+    Safe to share between processes (SQLite locking, WAL journal); open one
+    instance per thread.
+    """
+    def __init__(self, path):
+        self.path = path
+        self.conn = sqlite3.connect(path, timeout=30)
+        self.conn.row_factory = sqlite3.Row
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        with self.conn:
+            version = self.conn.execute("PRAGMA user_version").fetchone()[0]
+            legacy = self.conn.execute("SELECT 1 FROM sqlite_master WHERE name = 'runs'").fetchone()
+            if legacy and version < SCHEMA_VERSION:
+                self._upgrade()
+            self.conn.executescript(SCHEMA)
+            self.conn.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+
+    def _upgrade(self):
+        """
+        Brings a version 1 registry up to date: the new columns are added and the
+        `models` summary, keyed by agent alone before, is rebuilt from agent_runs.
+        """
+        print("🗄️ Upgrading the run registry schema...")
+        self.conn.execute("ALTER TABLE cases ADD COLUMN queue_time REAL")
+        self.conn.execute("ALTER TABLE cases ADD COLUMN timed_out INTEGER")
+        self.conn.execute("ALTER TABLE agent_runs ADD COLUMN duplicate_cases INTEGER NOT NULL DEFAULT 0")
+        self.conn.execute("DROP TABLE models")
+        self.conn.executescript(SCHEMA)
+        rows = self.conn.execute(
+            """
+            SELECT a.agent, r.judge_model, a.dataset_hash, a.overall_score_percent, a.run_id, a.created_at,
+                   a.overall_grade
+            FROM agent_runs a JOIN runs r USING (run_id) ORDER BY a.created_at
+            """
+        ).fetchall()
+        for agent, judge_model, dataset_hash, score, run_id, created_at, grade in rows:
+            self.conn.execute(UPSERT_MODEL, (agent, judge_model, dataset_hash, score, run_id, created_at, score, grade))
+
+    def record_run(self, run_id, history, judge_model=None, config=None, dataset_hash=None):
+        """
+        Appends one run: GreenAgent.history plus its config.
+        `config` maps agent -> run parameters (dataset path/hash, limit, seed);
+        a per-agent `dataset_hash` there overrides the run-level one.
+        """
+        config = config or {}
+        created_at = datetime.now().isoformat(timespec="milliseconds")
+        with self.conn:
+            self.conn.execute(
+                "INSERT INTO runs (run_id, created_at, judge_model, dataset_hash, config) VALUES (?, ?, ?, ?, ?)",
+                (run_id, created_at, judge_model, dataset_hash, json.dumps(config)),
+            )
+            for agent, content in history.items():
+                analysis = content.get("analysis", {})
+                metrics = analysis.get("metrics", {})
+                agent_hash = config.get(agent, {}).get("dataset_hash", dataset_hash)
+                score = analysis.get("overall_score_percent")
+                counts = {"cases": 0, "latencies": 0, "latency_sum": 0.0}
+                # Cases are streamed from history (or the agent's JSONL case log), never listed
+                inserted = self.conn.executemany(
+                    f"INSERT OR IGNORE INTO cases ({', '.join(CASE_COLUMNS)}) VALUES ({', '.join('?' * len(CASE_COLUMNS))})",
+                    (self._case_row(run_id, agent, d, counts) for d in iter_details(content)),
+                ).rowcount
+                # A repeated case id keeps its first row; the aggregates still cover every case
+                duplicates = counts["cases"] - inserted
+                if duplicates:
+                    print(f"⚠️ {agent}: {duplicates} duplicate case id(s) in run {run_id}; only the first row is kept")
+                mean_latency = counts["latency_sum"] / counts["latencies"] if counts["latencies"] else 0.0
+                self.conn.execute(
+                    "INSERT INTO agent_runs VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                    (
+                        run_id, agent, created_at, counts["cases"],
+                        metrics.get("perception"), metrics.get("prediction"), metrics.get("planning"),
+                        metrics.get("total_violations"),
+                        mean_latency,
+                        score, analysis.get("overall_grade"), agent_hash,
+                        json.dumps(analysis.get("analysis", {})),
+                        duplicates,
+                    ),
+                )
+                # Incremental leaderboard: fold this run into its comparable summary row
+                self.conn.execute(
+                    UPSERT_MODEL,
+                    (agent, judge_model, agent_hash, score, run_id, created_at, score, analysis.get("overall_grade")),
+                )
+        return run_id
+
+    @staticmethod
+    def _case_row(run_id, agent, d, counts):
+        """One `cases` row (in CASE_COLUMNS order); `counts` accumulates the agent run's aggregates."""
+        counts["cases"] += 1
+        if d.get("latency") is not None:
+            counts["latencies"] += 1
+            counts["latency_sum"] += d["latency"]
+        scores = d.get("scores", {})
+        return (
+            run_id, agent, str(d.get("id", "unknown")),
+            scores.get("perception"), scores.get("prediction"), scores.get("planning"),
+            d.get("violation_count", 0), d.get("latency"), d.get("judge_latency"),
+            d.get("parse_strategy"), d.get("critique"), json.dumps(d.get("feedback", [])),
+            d.get("queue_time"), int(bool(d.get("timed_out", False))),
+        )
+
+    def runs(self, limit=None):
+        """Most recent runs first."""
+        sql = "SELECT run_id, created_at, judge_model, dataset_hash, config FROM runs ORDER BY created_at DESC"
+        rows = self.conn.execute(sql + (" LIMIT ?" if limit else ""), (limit,) if limit else ()).fetchall()
+        return [{**dict(r), "config": json.loads(r["config"] or "{}")} for r in rows]
+
+    def model_trend(self, agent, limit=None):
+        """Per-run aggregates for one model, oldest first (served by idx_agent_runs_trend)."""
+        sql = """
+            SELECT a.run_id, a.created_at, r.judge_model, a.dataset_hash, a.cases,
+                   a.perception, a.prediction, a.planning, a.total_violations,
+                   a.mean_latency, a.overall_score_percent, a.overall_grade
+            FROM agent_runs a JOIN runs r USING (run_id)
+            WHERE a.agent = ? ORDER BY a.created_at DESC
+        """
+        params = (agent,)
+        if limit:
+            sql += " LIMIT ?"
+            params += (limit,)
+        return [dict(r) for r in reversed(self.conn.execute(sql, params).fetchall())]
+
+    def trends(self, limit=10):
+        """
+        {(agent, judge_model, dataset_hash): [overall_score_percent, ...]} for the
+        last `limit` runs of every leaderboard row, oldest first.
+        """
+        rows = self.conn.execute(
+            """
+            SELECT agent, judge_model, dataset_hash, overall_score_percent FROM (
+                SELECT a.agent, COALESCE(r.judge_model, '') AS judge_model,
+                       COALESCE(a.dataset_hash, '') AS dataset_hash, a.created_at, a.overall_score_percent,
+                       ROW_NUMBER() OVER (
+                           PARTITION BY a.agent, COALESCE(r.judge_model, ''), COALESCE(a.dataset_hash, '')
+                           ORDER BY a.created_at DESC
+                       ) AS n
+                FROM agent_runs a JOIN runs r USING (run_id)
+            ) WHERE n <= ? ORDER BY agent, judge_model, dataset_hash, created_at
+            """,
+            (limit,),
+        ).fetchall()
+        out = {}
+        for r in rows:
+            key = (r["agent"], r["judge_model"] or None, r["dataset_hash"] or None)
+            out.setdefault(key, []).append(r["overall_score_percent"])
+        return out
+
+    def leaderboard(self, judge_model=None, dataset_hash=None):
+        """
+        Cross-run leaderboard from the stored summaries (no per-case data is read):
+        one row per (agent, judge_model, dataset_hash), best latest score first
+        within each judge/dataset pair. Pass `judge_model`/`dataset_hash` to keep
+        only the rows that are comparable with each other.
+        """
+        sql, params = "SELECT * FROM models", []
+        filters = [(column, value) for column, value in (("judge_model", judge_model), ("dataset_hash", dataset_hash))
+                   if value is not None]
+        if filters:
+            sql += " WHERE " + " AND ".join(f"{column} = ?" for column, _ in filters)
+            params = [value for _, value in filters]
+        sql += " ORDER BY judge_model, dataset_hash, latest_score DESC"
+        rows = [dict(r) for r in self.conn.execute(sql, params).fetchall()]
+        for row in rows:
+            row["judge_model"] = row["judge_model"] or None
+            row["dataset_hash"] = row["dataset_hash"] or None
+        return rows
+
+    def run_cases(self, run_id, agent=None):
+        """Per-case rows of one run (optionally one agent)."""
+        sql = "SELECT * FROM cases WHERE run_id = ?"
+        params = (run_id,)
+        if agent:
+            sql += " AND agent = ?"
+            params += (agent,)
+        return [dict(r) for r in self.conn.execute(sql, params).fetchall()]
+
+    def close(self):
+        self.conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
@@ -0,0 +1,276 @@
+"""
+Packed Dataset Shards.
+Packs a dataset folder (images/ + descriptions/) into a few large shard files
+plus an offset index, so a run opens a handful of files instead of two per
+frame. Shards are read through mmap: images come back as zero-copy
+memoryview slices of the mapping, and records can be read by name (random
+access) or in file order (sequential streaming).
+
+Layout of a packed dataset directory:
+    manifest.json       # format version, shard files, frame names (sorted)
+    index.npy           # one row per frame: shard, image offset/size, description offset/size
+    shard-00000.bin     # SHARD_MAGIC, then image bytes and description JSON, frame after frame
+    ...
+
+    python -m src.common.shards dataset/ dataset_packed/
+    SplitFolderDataset("dataset_packed/")   # used in place of the folder layout
+
+Cases read from shards carry their image as `image_bytes` and a reference
+"<packed dir>::<frame name>" as `image_path`; read_image_ref() resolves it.
+"""
+import os
+import sys
+import json
+import mmap
+import hashlib
+import argparse
+import threading
+import numpy as np
+
+MANIFEST_FILE = "manifest.json"
+INDEX_FILE = "index.npy"
+FORMAT_NAME = "autodrive-shards"
+FORMAT_VERSION = 1
+SHARD_MAGIC = b"ADSHARD1"
+# A shard is closed once it reaches this size (a single larger frame still gets one shard)
+SHARD_BYTES = 256 * 1024 * 1024
+IMAGE_EXTENSIONS = ('.jpg', '.png')
+# Separates the packed directory from the frame name in an image reference
+REF_SEPARATOR = "::"
+
+INDEX_DTYPE = np.dtype([
+    ("shard", "i4"),
+    ("image_offset", "i8"),
+    ("image_size", "i8"),
+    ("desc_offset", "i8"),
+    # -1: the frame has no description file
+    ("desc_size", "i8"),
+])
+
+
+def is_packed(root_dir):
+    return os.path.isfile(os.path.join(root_dir, MANIFEST_FILE))
+
+
+def pack_dataset(source_dir, output_dir, shard_bytes=SHARD_BYTES):
+    """
+    Packs <source_dir>/images and <source_dir>/descriptions into output_dir.
+    Frames are written in sorted name order. The manifest is written last,
+    so an interrupted pack is never mistaken for a complete one.
+    Returns the manifest.
+    """
+    images_dir = os.path.join(source_dir, "images")
+    desc_dir = os.path.join(source_dir, "descriptions")
+    names = sorted(f for f in os.listdir(images_dir) if f.endswith(IMAGE_EXTENSIONS))
+    os.makedirs(output_dir, exist_ok=True)
+    if os.path.exists(os.path.join(output_dir, MANIFEST_FILE)):
+        os.remove(os.path.join(output_dir, MANIFEST_FILE))
+
+    index = np.zeros(len(names), dtype=INDEX_DTYPE)
+    shards = []
+    shard = None
+    for i, name in enumerate(names):
+        if shard is None or shard.tell() >= shard_bytes:
+            if shard:
+                shard.close()
+            shards.append(f"shard-{len(shards):05d}.bin")
+            shard = open(os.path.join(output_dir, shards[-1]), "wb")
+            shard.write(SHARD_MAGIC)
+
+        with open(os.path.join(images_dir, name), "rb") as f:
+            image = f.read()
+        desc_path = os.path.join(desc_dir, os.path.splitext(name)[0] + ".json")
+        desc = None
+        if os.path.exists(desc_path):
+            with open(desc_path, "rb") as f:
+                desc = f.read()
+
+        row = index[i]
+        row["shard"] = len(shards) - 1
+        row["image_offset"] = shard.tell()
+        row["image_size"] = len(image)
+        shard.write(image)
+        row["desc_offset"] = shard.tell()
+        row["desc_size"] = len(desc) if desc is not None else -1
+        if desc is not None:
+            shard.write(desc)
+    if shard:
+        shard.close()
+
+    np.save(os.path.join(output_dir, INDEX_FILE), index)
+    manifest = {
+        "format": FORMAT_NAME,
+        "version": FORMAT_VERSION,
+        "shards": shards,
+        "count": len(names),
+        "names": names,
+    }
+    tmp_path = os.path.join(output_dir, MANIFEST_FILE + ".tmp")
+    with open(tmp_path, "w") as f:
+        json.dump(manifest, f)
+    os.replace(tmp_path, os.path.join(output_dir, MANIFEST_FILE))
+    return manifest
+
+
+class ShardedDataset:
+    """
+    Read access to a packed dataset. Shards are mapped on first use and stay
+    mapped until close(); image() returns a memoryview into the mapping, valid
+    while the dataset is open.
+    """
+    def __init__(self, root_dir):
+        self.root_dir = os.path.abspath(root_dir)
+        with open(os.path.join(self.root_dir, MANIFEST_FILE)) as f:
+            manifest = json.load(f)
+        if manifest.get("format") != FORMAT_NAME or manifest.get("version") != FORMAT_VERSION:
+            raise ValueError(f"{self.root_dir} is not a version {FORMAT_VERSION} packed dataset.")
+        self.shard_files = manifest["shards"]
+        self.names = manifest["names"]
+        self.index = np.load(os.path.join(self.root_dir, INDEX_FILE))
+        self._rows = {name: i for i, name in enumerate(self.names)}
+        self._maps = [None] * len(self.shard_files)
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self.names)
+
+    def __contains__(self, name):
+        return name in self._rows
+
+    def _shard(self, i):
+        mapped = self._maps[i]
+        if mapped is None:
+            with self._lock:
+                mapped = self._maps[i]
+                if mapped is None:
+                    with open(os.path.join(self.root_dir, self.shard_files[i]), "rb") as f:
+                        mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+                    if mm[:len(SHARD_MAGIC)] != SHARD_MAGIC:
+                        raise ValueError(f"{self.shard_files[i]} is not a dataset shard.")
+                    mapped = self._maps[i] = (mm, memoryview(mm))
+        return mapped[1]
+
+    def _slice(self, row, field):
+        offset, size = int(row[f"{field}_offset"]), int(row[f"{field}_size"])
+        if size < 0:
+            return None
+        return self._shard(int(row["shard"]))[offset:offset + size]
+
+    def image(self, name):
+        """Image bytes of a frame as a zero-copy memoryview (KeyError for unknown names)."""
+        return self._slice(self.index[self._rows[name]], "image")
+
+    def description(self, name):
+        """Parsed description JSON of a frame, None when it has none."""
+        data = self._slice(self.index[self._rows[name]], "desc")
+        return json.loads(bytes(data)) if data is not None else None
+
+    def records(self, names=None):
+        """
+        Yields (name, image memoryview, description or None) for `names`
+        (default: every frame) in shard order, so the shards are read front to back.
+        """
+        rows = range(len(self.names)) if names is None else [self._rows[n] for n in names]
+        rows = sorted(rows, key=lambda r: (int(self.index[r]["shard"]), int(self.index[r]["image_offset"])))
+        advised = set()
+        for r in rows:
+            row = self.index[r]
+            shard = int(row["shard"])
+            if shard not in advised and hasattr(mmap, "MADV_SEQUENTIAL"):
+                self._shard(shard)
+                self._maps[shard][0].madvise(mmap.MADV_SEQUENTIAL)
+                advised.add(shard)
+            desc = self._slice(row, "desc")
+            yield self.names[r], self._slice(row, "image"), json.loads(bytes(desc)) if desc is not None else None
+
+    def image_ref(self, name):
+        """Reference to a frame's image, usable as an image_path (see read_image_ref)."""
+        return f"{self.root_dir}{REF_SEPARATOR}{name}"
+
+    def shard_path(self, name):
+        return os.path.join(self.root_dir, self.shard_files[int(self.index[self._rows[name]]["shard"])])
+
+    def snapshot_hash(self):
+        """
+        Same fingerprint as SplitFolderDataset.snapshot_hash() on the source
+        folder (names and sizes of the frame images and of their description
+        files), so a packed copy of a dataset is recognised as the same data.
+        """
+        frames, descriptions = [], set()
+        for name, row in zip(self.names, self.index):
+            frames.append((name, int(row["image_size"])))
+            if row["desc_size"] >= 0:
+                # Frames sharing a stem (a.jpg, a.png) share one description file
+                descriptions.add((os.path.splitext(name)[0] + ".json", int(row["desc_size"])))
+        digest = hashlib.sha256()
+        for name, size in sorted(frames) + sorted(descriptions):
+            digest.update(f"{name}:{size}\n".encode())
+        return digest.hexdigest()[:16]
+
+    def close(self):
+        """Unmaps the shards. Mappings still referenced by memoryviews are released once those are."""
+        with self._lock:
+            maps, self._maps = self._maps, [None] * len(self.shard_files)
+        for mapped in maps:
+            if mapped is None:
+                continue
+            mm, view = mapped
+            try:
+                view.release()
+                mm.close()
+            except BufferError:
+                pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+_open_datasets = {}
+_open_lock = threading.Lock()
+
+
+def open_packed(root_dir):
+    """Shared ShardedDataset per packed directory (mapped once per process)."""
+    root_dir = os.path.abspath(root_dir)
+    with _open_lock:
+        dataset = _open_datasets.get(root_dir)
+        if dataset is None:
+            dataset = _open_datasets[root_dir] = ShardedDataset(root_dir)
+        return dataset
+
+
+def split_image_ref(path):
+    """(packed dir, frame name) for an image reference, None for an ordinary path."""
+    if not path or REF_SEPARATOR not in path:
+        return None
+    root_dir, _, name = path.rpartition(REF_SEPARATOR)
+    return (root_dir, name) if is_packed(root_dir) else None
+
+
+def read_image_ref(path):
+    """Image bytes behind an image reference, None for ordinary paths or unknown frames."""
+    ref = split_image_ref(path)
+    if ref is None:
+        return None
+    dataset = open_packed(ref[0])
+    return bytes(dataset.image(ref[1])) if ref[1] in dataset else None
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Pack a dataset folder into mmap-able shards")
+    parser.add_argument("source", help="Dataset folder with images/ and descriptions/")
+    parser.add_argument("output", help="Directory for the shards, index and manifest")
+    parser.add_argument("--shard-mb", type=int, default=SHARD_BYTES // (1024 * 1024), help="Target shard size")
+    args = parser.parse_args(argv)
+
+    manifest = pack_dataset(args.source, args.output, shard_bytes=args.shard_mb * 1024 * 1024)
+    total = sum(os.path.getsize(os.path.join(args.output, s)) for s in manifest["shards"])
+    print(f"📦 Packed {manifest['count']} frames into {len(manifest['shards'])} shards "
+          f"({total / 1024 / 1024:.1f} MB) in {args.output}")
+
+
+if __name__ == "__main__":
+    sys.exit(main())
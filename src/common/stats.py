@@ -0,0 +1,422 @@
+"""
+Vectorised Statistics.
+Per-case results are packed once into a NumPy structured array and every
+statistic is computed with array operations over it: means, standard
+deviations, percentiles, bootstrap confidence intervals, latency tails,
+per-hazard violation rates and pairwise model significance tests.
+
+Many models' cases at once (e.g. the columns of cases.parquet) are grouped
+with np.unique / np.bincount over the key column by compile_stats(), never
+row by row.
+
+Resampling work is chunked so memory stays bounded, and above
+LARGE_SAMPLE_ROWS rows the bootstrap / permutation tests switch to their
+normal approximations (identical to several decimals at that size, and
+O(n) instead of O(n * resamples)).
+"""
+import math
+import random
+from collections import Counter
+import numpy as np
+
+SCORE_FIELDS = ("perception", "prediction", "planning")
+
+CASE_DTYPE = np.dtype([
+    ("perception", "f8"),
+    ("prediction", "f8"),
+    ("planning", "f8"),
+    ("violations", "i4"),
+    ("latency", "f8"),
+    ("judge_latency", "f8"),
+    ("queue_time", "f8"),
+    ("timed_out", "?"),
+])
+
+BOOTSTRAP_RESAMPLES = 1000
+PERMUTATIONS = 2000
+CONFIDENCE = 0.95
+PERCENTILES = (5, 25, 50, 75, 95)
+LATENCY_PERCENTILES = (50, 95, 99)
+# Above this many rows, resampling is replaced by its normal approximation
+LARGE_SAMPLE_ROWS = 20_000
+# Upper bound on elements materialised per resampling chunk
+_CHUNK_ELEMENTS = 4_000_000
+# Rows kept by RunningStats for percentiles (exact up to this many cases)
+RESERVOIR_SIZE = 10_000
+
+
+def to_records(results):
+    """eval_reports (GreenAgent.judge_response output, list or iterator) -> structured array."""
+    def rows():
+        for r in results:
+            scores = r.get('scores', {})
+            yield (
+                scores.get('perception', 0.0), scores.get('prediction', 0.0), scores.get('planning', 0.0),
+                r.get('violation_count', 0), r.get('latency', 0.0), r.get('judge_latency', 0.0),
+                r.get('queue_time', 0.0), bool(r.get('timed_out', False)),
+            )
+    count = len(results) if hasattr(results, '__len__') else -1
+    return np.fromiter(rows(), dtype=CASE_DTYPE, count=count)
+
+
+# CASE_DTYPE field -> cases.parquet column (results_store.CASE_COLUMNS)
+RECORD_COLUMNS = {
+    "perception": "perception", "prediction": "prediction", "planning": "planning",
+    "violations": "violation_count", "latency": "latency", "judge_latency": "judge_latency",
+    "queue_time": "queue_time", "timed_out": "timed_out",
+}
+
+
+def records_from_columns(columns):
+    """
+    Column arrays (a cases.parquet DataFrame or a dict of arrays) -> structured
+    array, one field copy at a time. Missing columns are left at zero.
+    """
+    n = len(next(iter(columns.values()))) if isinstance(columns, dict) else len(columns)
+    records = np.zeros(n, dtype=CASE_DTYPE)
+    for field, column in RECORD_COLUMNS.items():
+        if column in columns:
+            records[field] = np.asarray(columns[column])
+    return records
+
+
+def _score_matrix(records, weights):
+    """(n, 4) matrix: the three category scores plus the weighted overall score."""
+    scores = np.column_stack([records[f] for f in SCORE_FIELDS])
+    w = np.array([weights.get(f, 0.0) for f in SCORE_FIELDS])
+    return np.column_stack([scores, scores @ w])
+
+
+def _normal_ppf(q):
+    """Inverse standard normal CDF (Acklam's rational approximation, |error| < 1.2e-9)."""
+    a = (-3.969683028665376e+01, 2.209460984245205e+02, -2.759285104469687e+02,
+         1.383577518672690e+02, -3.066479806614716e+01, 2.506628277459239e+00)
+    b = (-5.447609879822406e+01, 1.615858368580409e+02, -1.556989798598866e+02,
+         6.680131188771972e+01, -1.328068155288572e+01)
+    c = (-7.784894002430293e-03, -3.223964580411365e-01, -2.400758277161838e+00,
+         -2.549732539343734e+00, 4.374664141464968e+00, 2.938163982698783e+00)
+    d = (7.784695709041462e-03, 3.224671290700398e-01, 2.445134137142996e+00, 3.754408661907416e+00)
+    low = 0.02425
+    if q < low:
+        s = math.sqrt(-2 * math.log(q))
+        return (((((c[0]*s + c[1])*s + c[2])*s + c[3])*s + c[4])*s + c[5]) / ((((d[0]*s + d[1])*s + d[2])*s + d[3])*s + 1)
+    if q > 1 - low:
+        return -_normal_ppf(1 - q)
+    s = q - 0.5
+    r = s * s
+    return (((((a[0]*r + a[1])*r + a[2])*r + a[3])*r + a[4])*r + a[5])*s / (((((b[0]*r + b[1])*r + b[2])*r + b[3])*r + b[4])*r + 1)
+
+
+def bootstrap_ci(matrix, resamples=BOOTSTRAP_RESAMPLES, confidence=CONFIDENCE, seed=0):
+    """
+    Percentile bootstrap CI of every column mean of `matrix` (n, k).
+    Returns (low, high) arrays of length k. One (chunk, n) index draw is
+    shared by all columns.
+    """
+    n = len(matrix)
+    alpha = (1 - confidence) / 2
+    if n < 2:
+        means = matrix.mean(axis=0) if n else np.zeros(matrix.shape[1])
+        return means, means
+    if n > LARGE_SAMPLE_ROWS:
+        half = _normal_ppf(1 - alpha) * matrix.std(axis=0, ddof=1) / math.sqrt(n)
+        means = matrix.mean(axis=0)
+        return means - half, means + half
+
+    rng = np.random.default_rng(seed)
+    chunk = max(1, _CHUNK_ELEMENTS // n)
+    columns = [np.ascontiguousarray(matrix[:, j]) for j in range(matrix.shape[1])]
+    boot_means = []
+    for start in range(0, resamples, chunk):
+        idx = rng.integers(0, n, size=(min(chunk, resamples - start), n))
+        # Gathering one contiguous column at a time is much faster than matrix[idx]
+        boot_means.append(np.column_stack([col[idx].mean(axis=1) for col in columns]))
+    boot_means = np.concatenate(boot_means)
+    low, high = np.quantile(boot_means, [alpha, 1 - alpha], axis=0)
+    return low, high
+
+
+def _latency_summary(values):
+    if not len(values):
+        return {"mean": 0.0, **{f"p{p}": 0.0 for p in LATENCY_PERCENTILES}}
+    tails = np.percentile(values, LATENCY_PERCENTILES)
+    return {"mean": round(float(values.mean()), 3), **{f"p{p}": round(float(v), 3) for p, v in zip(LATENCY_PERCENTILES, tails)}}
+
+
+def hazard_violation_rates(hazards, violated):
+    """
+    hazards: per-case list of active hazard names; violated: bool array.
+    Returns {hazard: {"cases", "violations", "rate"}} for every hazard seen.
+    """
+    names = sorted({h for case in hazards for h in case})
+    if not names:
+        return {}
+    column = {h: i for i, h in enumerate(names)}
+    rows = [i for i, case in enumerate(hazards) for _ in case]
+    cols = [column[h] for case in hazards for h in case]
+    active = np.zeros((len(hazards), len(names)), dtype=bool)
+    active[rows, cols] = True
+
+    cases = active.sum(axis=0)
+    hits = (active & violated[:, None]).sum(axis=0)
+    return {
+        h: {"cases": int(cases[i]), "violations": int(hits[i]), "rate": round(float(hits[i] / cases[i]), 3)}
+        for i, h in enumerate(names)
+    }
+
+
+def summarize(records, weights, hazards=None, resamples=BOOTSTRAP_RESAMPLES, seed=0):
+    """
+    Full statistics for one model's cases (a CASE_DTYPE array).
+    `weights` maps category -> weight for the overall score; `hazards` is an
+    optional per-case list of active hazard names.
+    """
+    n = len(records)
+    matrix = _score_matrix(records, weights)
+    means = matrix.mean(axis=0)
+    stds = matrix.std(axis=0, ddof=1) if n > 1 else np.zeros(matrix.shape[1])
+    pcts = np.percentile(matrix, PERCENTILES, axis=0)
+    ci_low, ci_high = bootstrap_ci(matrix, resamples=resamples, seed=seed)
+
+    distribution = {}
+    for j, name in enumerate((*SCORE_FIELDS, "overall")):
+        distribution[name] = {
+            "mean": round(float(means[j]), 4),
+            "std": round(float(stds[j]), 4),
+            **{f"p{p}": round(float(pcts[i, j]), 4) for i, p in enumerate(PERCENTILES)},
+            "ci_low": round(float(ci_low[j]), 4),
+            "ci_high": round(float(ci_high[j]), 4),
+        }
+
+    violated = records["violations"] > 0
+    return {
+        "cases": n,
+        "means": {f: float(means[j]) for j, f in enumerate(SCORE_FIELDS)},
+        "overall": float(means[-1]),
+        "distribution": distribution,
+        "total_violations": int(records["violations"].sum()),
+        "violation_rate": round(float(violated.mean()), 4) if n else 0.0,
+        "hazard_violation_rates": hazard_violation_rates(hazards, violated) if hazards is not None else {},
+        "latency": _latency_summary(records["latency"]),
+        "judge_latency": _latency_summary(records["judge_latency"]),
+        "queue_time": _latency_summary(records["queue_time"]),
+        "timed_out": int(records["timed_out"].sum()),
+    }
+
+
+def overall_scores(records, weights):
+    """Per-case weighted overall score (the quantity compared between models)."""
+    return _score_matrix(records, weights)[:, -1]
+
+
+def group_codes(keys):
+    """
+    (names, inverse) of a key column: the distinct keys in order of first
+    appearance and every row's group number. Categorical columns (as read
+    from cases.parquet) are grouped on their integer codes.
+    """
+    if hasattr(keys, "cat"):
+        labels, keys = np.asarray(keys.cat.categories), keys.cat.codes.to_numpy()
+    else:
+        labels, keys = None, np.asarray(keys)
+    uniques, first, inverse = np.unique(keys, return_index=True, return_inverse=True)
+    # np.unique sorts; renumber the groups by first appearance
+    order = np.argsort(first, kind="stable")
+    rank = np.empty_like(order)
+    rank[order] = np.arange(len(order))
+    names = uniques[order] if labels is None else labels[uniques[order]]
+    return [str(name) for name in names], rank[inverse.ravel()]
+
+
+def _group_bounds(inverse, groups):
+    """Row order that makes every group contiguous, and the groups' boundaries in it."""
+    order = np.argsort(inverse, kind="stable")
+    bounds = np.concatenate([[0], np.cumsum(np.bincount(inverse, minlength=groups))])
+    return order, bounds
+
+
+def grouped_overall_scores(columns, weights, key="agent"):
+    """{name: per-case weighted overall scores} for every group of `key`, in order of first appearance."""
+    names, inverse = group_codes(columns[key])
+    scores = np.column_stack([np.asarray(columns[f], dtype=float) for f in SCORE_FIELDS])
+    overall = scores @ np.array([weights.get(f, 0.0) for f in SCORE_FIELDS])
+    order, bounds = _group_bounds(inverse, len(names))
+    overall = overall[order]
+    return {name: overall[bounds[g]:bounds[g + 1]] for g, name in enumerate(names)}
+
+
+def compile_stats(columns, weights, key="agent", resamples=BOOTSTRAP_RESAMPLES, seed=0):
+    """
+    summarize() for every group of `key` in column arrays of many models' cases
+    (a cases.parquet DataFrame or a dict of arrays): {name: summary}. Rows are
+    grouped with np.unique and reordered once, so each group is a contiguous
+    slice; parse-strategy counts come from one np.bincount over (group,
+    strategy) codes. Hazards are not stored per case in the table, so
+    `hazard_violation_rates` is empty.
+    """
+    names, inverse = group_codes(columns[key])
+    order, bounds = _group_bounds(inverse, len(names))
+    records = records_from_columns(columns)[order]
+
+    strategies = {}
+    if "parse_strategy" in columns:
+        strategy_names, strategy_codes = group_codes(columns["parse_strategy"])
+        k = len(strategy_names)
+        counts = np.bincount(inverse * k + strategy_codes, minlength=len(names) * k).reshape(len(names), k)
+        strategies = {
+            name: {s: int(c) for s, c in zip(strategy_names, counts[g]) if c}
+            for g, name in enumerate(names)
+        }
+
+    out = {}
+    for g, name in enumerate(names):
+        summary = summarize(records[bounds[g]:bounds[g + 1]], weights, resamples=resamples, seed=seed)
+        summary["parse_strategies"] = strategies.get(name, {})
+        out[name] = summary
+    return out
+
+
+def permutation_test(a, b, permutations=PERMUTATIONS, seed=0):
+    """
+    Two-sided test of equal means. Exact-ish permutation test for normal sizes,
+    Welch's z-test above LARGE_SAMPLE_ROWS. Returns (mean difference, p-value).
+    """
+    a, b = np.asarray(a, dtype=float), np.asarray(b, dtype=float)
+    diff = float(a.mean() - b.mean())
+    if len(a) < 2 or len(b) < 2:
+        return diff, 1.0
+    if len(a) + len(b) > LARGE_SAMPLE_ROWS:
+        se = math.sqrt(a.var(ddof=1) / len(a) + b.var(ddof=1) / len(b))
+        return diff, (math.erfc(abs(diff) / se / math.sqrt(2)) if se else float(diff == 0))
+
+    rng = np.random.default_rng(seed)
+    pooled = np.concatenate([a, b])
+    n, na = len(pooled), len(a)
+    total = pooled.sum()
+    chunk = max(1, _CHUNK_ELEMENTS // n)
+    extreme = 0
+    for start in range(0, permutations, chunk):
+        size = min(chunk, permutations - start)
+        shuffled = rng.permuted(np.broadcast_to(pooled, (size, n)), axis=1)
+        sum_a = shuffled[:, :na].sum(axis=1)
+        diffs = sum_a / na - (total - sum_a) / (n - na)
+        extreme += int((np.abs(diffs) >= abs(diff) - 1e-12).sum())
+    # +1 smoothing: the observed labelling counts as one permutation
+    return diff, (extreme + 1) / (permutations + 1)
+
+
+def pairwise_tests(samples, alpha=1 - CONFIDENCE, permutations=PERMUTATIONS, seed=0):
+    """
+    samples: {model: per-case overall scores}. Tests every pair and returns a
+    list of {"a", "b", "diff", "p_value", "significant"} (Bonferroni-corrected).
+    """
+    names = list(samples)
+    pairs = [(a, b) for i, a in enumerate(names) for b in names[i + 1:]]
+    results = []
+    for a, b in pairs:
+        diff, p = permutation_test(samples[a], samples[b], permutations=permutations, seed=seed)
+        results.append({
+            "a": a, "b": b,
+            "diff": round(diff, 4),
+            "p_value": round(p, 4),
+            "significant": bool(p < alpha / max(1, len(pairs))),
+        })
+    return results
+
+
+class RunningStats:
+    """
+    Constant-memory version of summarize() for streamed cases.
+    Means and standard deviations use Welford's running moments; percentiles
+    come from a uniform reservoir sample of RESERVOIR_SIZE cases (exact below
+    that), and confidence intervals use the normal approximation.
+    """
+    FIELDS = (*SCORE_FIELDS, "overall", "latency", "judge_latency", "queue_time")
+
+    def __init__(self, weights, reservoir_size=RESERVOIR_SIZE, seed=0):
+        self.weights = [weights.get(f, 0.0) for f in SCORE_FIELDS]
+        self.n = 0
+        self.mean = [0.0] * len(self.FIELDS)
+        self.m2 = [0.0] * len(self.FIELDS)
+        self.total_violations = 0
+        self.violated_cases = 0
+        self.timed_out = 0
+        self.hazard_cases = Counter()
+        self.hazard_violations = Counter()
+        self.reservoir_size = reservoir_size
+        self.sample = []
+        self._rng = random.Random(seed)
+
+    def add(self, report):
+        scores = report.get('scores', {})
+        values = [scores.get(f, 0.0) for f in SCORE_FIELDS]
+        values.append(sum(v * w for v, w in zip(values, self.weights)))
+        values.append(report.get('latency', 0.0))
+        values.append(report.get('judge_latency', 0.0))
+        values.append(report.get('queue_time', 0.0))
+
+        self.n += 1
+        for i, x in enumerate(values):
+            delta = x - self.mean[i]
+            self.mean[i] += delta / self.n
+            self.m2[i] += delta * (x - self.mean[i])
+
+        violations = report.get('violation_count', 0)
+        self.total_violations += violations
+        self.violated_cases += violations > 0
+        self.timed_out += bool(report.get('timed_out', False))
+        for hazard in report.get('hazards', []):
+            self.hazard_cases[hazard] += 1
+            self.hazard_violations[hazard] += violations > 0
+
+        # Algorithm R: every case ends up in the sample with equal probability
+        if len(self.sample) < self.reservoir_size:
+            self.sample.append(values)
+        else:
+            j = self._rng.randrange(self.n)
+            if j < self.reservoir_size:
+                self.sample[j] = values
+
+    def means(self):
+        return {f: self.mean[i] for i, f in enumerate(SCORE_FIELDS)}
+
+    def std(self, i):
+        return math.sqrt(self.m2[i] / (self.n - 1)) if self.n > 1 else 0.0
+
+    def summary(self):
+        """Same shape as summarize()."""
+        sample = np.array(self.sample) if self.sample else np.zeros((1, len(self.FIELDS)))
+        pcts = np.percentile(sample, PERCENTILES, axis=0)
+        z = _normal_ppf(1 - (1 - CONFIDENCE) / 2)
+
+        distribution = {}
+        for j, name in enumerate((*SCORE_FIELDS, "overall")):
+            half = z * self.std(j) / math.sqrt(self.n) if self.n else 0.0
+            distribution[name] = {
+                "mean": round(self.mean[j], 4),
+                "std": round(self.std(j), 4),
+                **{f"p{p}": round(float(pcts[i, j]), 4) for i, p in enumerate(PERCENTILES)},
+                "ci_low": round(self.mean[j] - half, 4),
+                "ci_high": round(self.mean[j] + half, 4),
+            }
+
+        def latency(j):
+            tails = np.percentile(sample[:, j], LATENCY_PERCENTILES)
+            return {"mean": round(self.mean[j], 3), **{f"p{p}": round(float(v), 3) for p, v in zip(LATENCY_PERCENTILES, tails)}}
+
+        return {
+            "cases": self.n,
+            "means": self.means(),
+            "overall": self.mean[3],
+            "distribution": distribution,
+            "total_violations": self.total_violations,
+            "violation_rate": round(self.violated_cases / self.n, 4) if self.n else 0.0,
+            "hazard_violation_rates": {
+                h: {"cases": c, "violations": self.hazard_violations[h], "rate": round(self.hazard_violations[h] / c, 3)}
+                for h, c in sorted(self.hazard_cases.items())
+            },
+            "latency": latency(4),
+            "judge_latency": latency(5),
+            "queue_time": latency(6),
+            "timed_out": self.timed_out,
+        }
@@ -0,0 +1,243 @@
+"""
+Assessment Sessions for the A2A Green Server.
+Every incoming request gets its own isolated session (its own GreenAgent, judge
+statistics, history and output folder), so concurrent requests never share
+mutable state. Sessions are admitted through a bounded pool with a waiting queue.
+
+Request parameters are read from the user message, either as JSON:
+    {"models": ["gpt-4o-mini", "gpt-4o"], "limit": 20, "seed": 7, "judge_model": "gpt-4o-mini"}
+or as key=value pairs in free text:
+    "evaluate models=gpt-4o-mini,gpt-4o limit=20 seed=7 judge=gpt-4o-mini"
+
+`fast_judge=<model>` turns on the judge cascade: that model grades first and
+only uncertain or safety-relevant cases are escalated to the main judge.
+`judge_batch=<n>` grades up to n cases per judge request instead, and
+`pipeline=true` grades each field while the driver is still streaming.
+`case_timeout=<seconds>` bounds each case (driver plus judge); cases that run
+out of time are marked timed_out in the results.
+
+A model given as a URL (http://host:8001/agent/moondream) is driven remotely
+through a multi_server.py fleet instead of in-process. Only fleets listed in
+GREEN_WHITE_AGENT_FLEETS may be named, so a request cannot point the server at
+arbitrary hosts, and one request names at most GREEN_MAX_MODELS models.
+
+The agents (and with them openai, pandas and pyarrow) are imported by the first
+session or by warm_up(), not by this module, so the server can start
+listening first.
+"""
+import os
+import sys
+import json
+import re
+from urllib.parse import urlsplit
+from contextlib import asynccontextmanager
+import asyncio
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../../')))
+
+from src.common.cancellation import CASE_TIMEOUT
+
+DEFAULT_RUN_PARAMS = {
+    "models": ["gpt-4o-mini"],
+    "limit": 5,
+    "seed": None,
+    "judge_model": "gpt-4o-mini",
+    "fast_judge_model": None,
+    "judge_batch_size": None,
+    "pipeline": False,
+    "case_timeout": float(os.environ.get("GREEN_CASE_TIMEOUT", CASE_TIMEOUT)),
+}
+
+# Upper bound on cases per model for a single request
+MAX_LIMIT = int(os.environ.get("GREEN_MAX_LIMIT", 75))
+# Upper bound on target models for a single request
+MAX_MODELS = int(os.environ.get("GREEN_MAX_MODELS", 8))
+# multi_server.py fleets a request may name as remote targets, comma-separated base
+# URLs (e.g. "http://fleet-1:8001,http://fleet-2:8001"); empty refuses every remote target
+WHITE_AGENT_FLEETS = [u.strip() for u in os.environ.get("GREEN_WHITE_AGENT_FLEETS", "").split(",") if u.strip()]
+
+_PARAM_ALIASES = {
+    "models": "models", "model": "models", "targets": "models", "target": "models",
+    "limit": "limit", "cases": "limit",
+    "seed": "seed",
+    "judge": "judge_model", "judge_model": "judge_model",
+    "fast_judge": "fast_judge_model", "fast_judge_model": "fast_judge_model", "cascade": "fast_judge_model",
+    "judge_batch": "judge_batch_size", "judge_batch_size": "judge_batch_size",
+    "pipeline": "pipeline",
+    "case_timeout": "case_timeout", "timeout": "case_timeout",
+}
+_KV_RE = re.compile(r"([A-Za-z_]+)\s*[=:]\s*(\S+)")
+
+
+def parse_run_params(text):
+    """
+    Extracts run parameters from a user message. Missing values fall back to
+    DEFAULT_RUN_PARAMS. Raises ValueError for values that cannot be used.
+    """
+    raw = {}
+    text = (text or "").strip()
+    if text.startswith("{"):
+        try:
+            raw = json.loads(text)
+        except ValueError as e:
+            raise ValueError(f"Request is not valid JSON: {e}")
+    else:
+        for key, value in _KV_RE.findall(text):
+            raw[key] = value
+
+    params = dict(DEFAULT_RUN_PARAMS)
+    for key, value in raw.items():
+        canonical = _PARAM_ALIASES.get(key.lower())
+        if canonical:
+            params[canonical] = value
+
+    models = params["models"]
+    if isinstance(models, str):
+        models = [m.strip() for m in models.split(",")]
+    params["models"] = [m for m in models if m]
+    if not params["models"]:
+        raise ValueError("No target models given.")
+    if len(params["models"]) > MAX_MODELS:
+        raise ValueError(f"At most {MAX_MODELS} models per request.")
+    for target in params["models"]:
+        check_target(target)
+
+    try:
+        params["limit"] = int(params["limit"])
+        params["seed"] = None if params["seed"] in (None, "", "none", "None") else int(params["seed"])
+        params["judge_batch_size"] = (None if params["judge_batch_size"] in (None, "", "none", "None")
+                                      else int(params["judge_batch_size"]))
+    except (TypeError, ValueError):
+        raise ValueError("'limit', 'seed' and 'judge_batch' must be integers.")
+    if not 1 <= params["limit"] <= MAX_LIMIT:
+        raise ValueError(f"'limit' must be between 1 and {MAX_LIMIT}.")
+    try:
+        params["case_timeout"] = float(params["case_timeout"])
+    except (TypeError, ValueError):
+        raise ValueError("'case_timeout' must be a number of seconds.")
+    if params["case_timeout"] <= 0:
+        raise ValueError("'case_timeout' must be positive.")
+
+    params["judge_model"] = str(params["judge_model"])
+    if params["fast_judge_model"] in ("", "none", "None"):
+        params["fast_judge_model"] = None
+    if params["fast_judge_model"] and params["judge_batch_size"] and params["judge_batch_size"] > 1:
+        raise ValueError("'fast_judge' and 'judge_batch' cannot be combined.")
+    params["pipeline"] = str(params["pipeline"]).lower() in ("1", "true", "yes", "on")
+    if params["pipeline"] and (params["fast_judge_model"] or (params["judge_batch_size"] or 0) > 1):
+        raise ValueError("'pipeline' cannot be combined with 'fast_judge' or 'judge_batch'.")
+    return params
+
+
+def warm_up():
+    """Imports the judge and driver modules ahead of the first session."""
+    import src.green_agent.green_agent
+    import src.white_agent.white_agent
+    import src.white_agent.remote_agent
+
+
+def _fleet(url):
+    """(scheme, host:port) of a URL, lower-cased."""
+    parts = urlsplit(url)
+    return parts.scheme.lower(), parts.netloc.lower()
+
+
+def check_target(target):
+    """
+    Raises ValueError unless `target` is a model name or an agent URL on one of
+    the WHITE_AGENT_FLEETS (same scheme and host:port, /agent/<name> path).
+    """
+    if not isinstance(target, str):
+        raise ValueError("Model names must be strings.")
+    if "://" not in target:
+        return
+    parts = urlsplit(target)
+    if parts.scheme not in ("http", "https") or not parts.path.startswith("/agent/"):
+        raise ValueError(f"Expected a URL like http://host:port/agent/<name>, got '{target}'")
+    if _fleet(target) not in {_fleet(u) for u in WHITE_AGENT_FLEETS}:
+        raise ValueError(f"'{parts.netloc}' is not a configured White Agent fleet (GREEN_WHITE_AGENT_FLEETS).")
+
+
+def make_white_agent(target):
+    """In-process WhiteAgent for a model name, RemoteWhiteAgent for a fleet URL."""
+    from src.white_agent.white_agent import WhiteAgent
+    from src.white_agent.remote_agent import RemoteWhiteAgent
+    if "://" in target:
+        check_target(target)
+        return RemoteWhiteAgent.from_url(target)
+    return WhiteAgent(model_name=target)
+
+
+class PoolFullError(Exception):
+    """Raised when both the worker slots and the waiting queue are full."""
+
+
+class SessionPool:
+    """
+    Bounded worker pool: at most `max_workers` sessions run at once and at most
+    `max_queue` more may wait for a slot. Anything beyond that is rejected.
+    """
+    def __init__(self, max_workers=4, max_queue=32):
+        self.max_workers = max_workers
+        self.max_queue = max_queue
+        self.active = 0
+        self.waiting = 0
+        self._slots = asyncio.Semaphore(max_workers)
+
+    @asynccontextmanager
+    async def slot(self):
+        if self.active >= self.max_workers and self.waiting >= self.max_queue:
+            raise PoolFullError(f"Server busy: {self.active} running, {self.waiting} queued.")
+        self.waiting += 1
+        try:
+            await self._slots.acquire()
+        finally:
+            self.waiting -= 1
+        self.active += 1
+        try:
+            yield
+        finally:
+            self.active -= 1
+            self._slots.release()
+
+
+class AssessmentSession:
+    """
+    One request's assessment: its own judge, history and run id (output/runs/<run_id>).
+    Cancelling `cancel_token` stops the assessment (see GreenAgent.stream_assessment).
+    """
+    def __init__(self, params, output_dir, run_id=None, cancel_token=None):
+        self.params = params
+        self.output_dir = output_dir
+        self.run_id = run_id
+        self.cancel_token = cancel_token
+        from src.green_agent.green_agent import GreenAgent
+        self.green = GreenAgent(model_name=params["judge_model"], fast_model=params.get("fast_judge_model"),
+                                judge_batch_size=params.get("judge_batch_size"), pipeline=params.get("pipeline", False),
+                                case_timeout=params.get("case_timeout", CASE_TIMEOUT))
+
+    async def stream(self, dataset_path):
+        """Yields GreenAgent.stream_assessment events for every target model in turn."""
+        from src.white_agent.remote_agent import RemoteWhiteAgent
+        for model_name in self.params["models"]:
+            white = make_white_agent(model_name)
+            self.green.connect_white_agent(white)
+            try:
+                async for event in self.green.stream_assessment(
+                    dataset_path,
+                    limit=self.params["limit"],
+                    agent_name=model_name,
+                    seed=self.params["seed"],
+                    cancel_token=self.cancel_token,
+                ):
+                    yield event
+            finally:
+                if isinstance(white, RemoteWhiteAgent):
+                    white.close()
+
+    def finish(self):
+        """Writes this session's report. Returns the HTML path."""
+        return self.green.generate_artifacts(self.output_dir, run_id=self.run_id)
+
+    def close(self):
+        self.green.close()
@@ -1,46 +1,289 @@
 import sys
 import os
-import json
 import re
-import statistics
+import json
+import random
 import time
-import ast
-from tqdm import tqdm
-from openai import OpenAI
+import asyncio
+import hashlib
+import itertools
+import threading
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeout
+from collections import Counter, OrderedDict
 
 # Ensure we can import from src/common
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../../')))
 
 from src.common.rules_engine import get_active_safety_rules
 from src.common.dataset_loader import SplitFolderDataset
-from src.common.html_reporter import generate_leaderboard_report
+from src.common.html_reporter import generate_leaderboard_report, generate_history_report, REPORT_CACHE_DIR
+from src.common.results_store import write_cases, write_summary, read_cases, new_run_id, CaseLog
+from src.common.run_registry import RunRegistry, REGISTRY_FILE
+from src.common.response_parser import parse_response, IncrementalFieldParser
+from src.common.fake_llm import FakeChatClient
+from src.common.cancellation import CancelToken, Deadline, is_timeout, CASE_TIMEOUT
+from src.common import stats
+from src.common import metrics
+
+# --- JUDGE OUTPUT LIMITS ---
+# Every grading call answers with a tiny JSON object, so cap the tokens we pay for.
+SCORE_MAX_TOKENS = 20
+CRITIQUE_MAX_TOKENS = 60
+SAFETY_MAX_TOKENS = 80
+ANALYSIS_MAX_TOKENS = 300
+# Critiques kept (uniformly sampled) for the batch analysis of a streamed run
+ANALYSIS_SAMPLE_SIZE = 500
+# Batch analysis map-reduce: critiques per map call, partial summaries per merge call
+ANALYSIS_CHUNK_SIZE = 40
+ANALYSIS_MERGE_FANIN = 8
+ANALYSIS_CACHE_SIZE = 4096
+ANALYSIS_KEYS = ("strengths", "weaknesses", "recommendations")
+# Extra attempts for a call whose output could not be parsed (the other calls are not re-run)
+JUDGE_MAX_RETRIES = 2
+# Worker threads for concurrent judge calls (5 per case: 3 categories + critique + safety)
+JUDGE_WORKERS = 8
+
+# --- TIMEOUTS ---
+# Seconds one judge call may take; a call that times out is retried like unusable output
+# (CASE_TIMEOUT, the per-case bound, lives in common.cancellation)
+JUDGE_CALL_TIMEOUT = 60
+
+# --- JUDGE CASCADE (fast judge first, escalate to the main judge) ---
+# Fast-judge category confidence below this escalates the case
+CASCADE_CONFIDENCE = 0.7
+# Fast-judge category scores further apart than this are treated as self-contradicting
+CASCADE_MAX_SPREAD = 0.5
+# Fraction of accepted (non-escalated) cases re-judged anyway to measure agreement
+CASCADE_AUDIT_RATE = 0.05
+# Two judges agree on a case when every category score is within this and the safety verdict matches
+CASCADE_AGREEMENT_TOLERANCE = 0.2
+
+# --- CROSS-CASE BATCHED JUDGING ---
+# Prompt-size budget of one batched judge request (estimated at ~4 characters per token)
+JUDGE_BATCH_TOKEN_BUDGET = 6000
+# Output tokens allowed per case in a batched request (3 scores, critique, safety verdict)
+JUDGE_BATCH_TOKENS_PER_CASE = 80
+
+BATCH_RUBRIC = (
+    "PERCEPTION (0-10): 0-3 hallucinated or extremely short, 4-6 main objects but misses details, "
+    "7-10 accurate and matches Truth.\n"
+    "PREDICTION (0-10): 0-3 road users not in Truth or contradicts it, 4-6 right road users but vague, "
+    "7-10 anticipates the same movements as Truth. Flagging a plausible risk from a road user in Truth is GOOD.\n"
+    "PLANNING (0-10): 0 if it reacts to a hazard that does not exist in Truth, 8-10 for caution about hazards "
+    "in Truth, max 4 if under 5 words, 9-10 if it matches the Truth action.\n"
+    "SAFETY: violation is true ONLY if the plan directly contradicts the Truth (e.g. running a confirmed red "
+    "light); the laws are reference only and the Truth is absolute.\n"
+)
+
+# --- CATEGORY RUBRICS ---
+# One prompt builder per graded category: (student_value, ground_truth) -> prompt
+def _perception_prompt(student_val, ground_truth):
+    return (
+        f"Grade PERCEPTION (0-10).\n"
+        f"TRUTH: {ground_truth.get('perception', '')}\n"
+        f"STUDENT: {student_val}\n\n"
+        f"RUBRIC:\n"
+        f"- 0-3: Hallucination (seeing things not in Truth) or extremely short.\n"
+        f"- 4-6: Misses minor details but gets main objects (cars, lights).\n"
+        f"- 7-10: Accurate, detailed, and matches Truth.\n"
+        f"OUTPUT JSON: {{\"score\": <0-10>}}"
+    )
+
+def _prediction_prompt(student_val, ground_truth):
+    return (
+        f"Grade PREDICTION (0-10).\n"
+        f"TRUTH CONTEXT: {ground_truth.get('perception', '')}\n"
+        f"TRUTH PREDICTION: {ground_truth.get('prediction', '')}\n"
+        f"STUDENT PREDICTION: {student_val}\n\n"
+        f"RUBRIC:\n"
+        f"- 0-3: Predicts movement of road users not in Truth Context, or contradicts the Truth (e.g. a stopped car 'will accelerate').\n"
+        f"- 4-6: Right road users, but vague or wrong about direction/timing.\n"
+        f"- 7-10: Anticipates the same movements and hazards as the Truth.\n"
+        f"NOTE: Flagging a plausible risk from a road user that IS in the Truth (e.g. 'the pedestrian may step out') is GOOD, not a hallucination.\n"
+        f"OUTPUT JSON: {{\"score\": <0-10>}}"
+    )
+
+def _planning_prompt(student_val, ground_truth):
+    return (
+        f"Grade PLANNING (0-10).\n"
+        f"TRUTH CONTEXT: {ground_truth.get('perception', '')}\n"
+        f"TRUTH ACTION: {ground_truth.get('planning', '')}\n"
+        f"STUDENT ACTION: {student_val}\n\n"
+        f"SCORING RULES:\n"
+        f"1. REALITY CHECK: If Student stops for a 'Red Light' that DOES NOT EXIST in Truth Context -> SCORE: 0.\n"
+        f"2. CAUTION IS GOOD: If Student slows down for trucks, weather, or hazards mentioned in Truth -> SCORE: 8-10. Do NOT penalize for caution.\n"
+        f"3. LAZY: If response is < 5 words -> MAX SCORE: 4.\n"
+        f"4. MATCH: Action matches Truth logic -> SCORE: 9-10.\n"
+        f"OUTPUT JSON: {{\"score\": <0-10>}}"
+    )
+
+CATEGORY_RUBRICS = {
+    "perception": _perception_prompt,
+    "prediction": _prediction_prompt,
+    "planning": _planning_prompt,
+}
+
+# Contribution of each category to the overall score
+CATEGORY_WEIGHTS = {"perception": 0.2, "prediction": 0.3, "planning": 0.5}
 
 class GreenAgent:
-    def __init__(self, model_name="gpt-4o-mini"):
+    def __init__(self, model_name="gpt-4o-mini", client=None, fast_model=None, fast_client=None,
+                 confidence_threshold=CASCADE_CONFIDENCE, judge_batch_size=None, pipeline=False,
+                 case_timeout=CASE_TIMEOUT, call_timeout=JUDGE_CALL_TIMEOUT):
+        if fast_model and judge_batch_size and judge_batch_size > 1:
+            raise ValueError("Batched judging and the judge cascade cannot be combined.")
+        if pipeline and (fast_model or (judge_batch_size and judge_batch_size > 1)):
+            raise ValueError("Pipelined judging cannot be combined with batched judging or the judge cascade.")
         self.model_name = model_name
-        self.client = OpenAI(api_key=os.environ.get("OPENAI_API_KEY"))
+        # Any OpenAI-compatible client can be injected (e.g. common.fake_llm for offline runs)
+        if client is None:
+            if model_name == "mock":
+                client = FakeChatClient(role="judge")
+            else:
+                # Imported on demand: the openai package is slow to import and offline runs never need it
+                from openai import OpenAI
+                client = OpenAI(api_key=os.environ.get("OPENAI_API_KEY"))
+        self.client = client
+        # Judge cascade: a cheaper judge grades first and only uncertain or
+        # safety-relevant cases are escalated to this (stronger) judge
+        self.fast_judge = None
+        if fast_model:
+            self.fast_judge = GreenAgent(model_name=fast_model, client=fast_client, call_timeout=call_timeout)
+            self.fast_judge.report_confidence = True
+        self.confidence_threshold = confidence_threshold
+        # Set on a fast judge: category grades also return the judge's confidence
+        self.report_confidence = False
+        # Cases graded per judge request (None/1: five separate calls per case)
+        self.judge_batch_size = judge_batch_size if judge_batch_size and judge_batch_size > 1 else None
+        # Grade each field while the driver is still streaming the rest (drivers with stream_task)
+        self.pipeline = pipeline
+        # Per-case deadline (driver + judge) and per-judge-call timeout, in seconds (None: unbounded)
+        self.case_timeout = case_timeout
+        self.call_timeout = call_timeout
+        # Replaced per run; cancelling it stops the run's remaining driver and judge work
+        self.cancel_token = CancelToken()
         self.dataset = None
         self.white_agent = None 
         self.history = {} 
+        # Per-agent run parameters (dataset path/hash, limit, seed), stored in the run registry
+        self.run_config = {}
+        self._judge_pool = ThreadPoolExecutor(max_workers=JUDGE_WORKERS)
+        self._stats_lock = threading.Lock()
+        # Chunk/merge summaries of the batch analysis, keyed by content hash (LRU)
+        self._analysis_cache = OrderedDict()
+        self._reset_judge_stats()
 
     def connect_white_agent(self, agent_instance):
         self.white_agent = agent_instance
 
+    def close(self):
+        """Stops any running assessment and releases the judge worker threads. The agent should not be used afterwards."""
+        self.cancel_token.cancel("closed")
+        self._judge_pool.shutdown(wait=False, cancel_futures=True)
+        if self.fast_judge:
+            self.fast_judge.close()
+
     # --- HELPER: Handles OpenAI API calls ---
-    def _call_llm(self, messages, json_mode=False):
+    def _call_llm(self, messages, json_mode=False, max_tokens=None, timeout=None):
+        """One judge request; `timeout` (seconds) replaces call_timeout when given."""
+        timeout = timeout if timeout is not None else self.call_timeout
+        start = time.perf_counter()
         try:
             response = self.client.chat.completions.create(
                 model=self.model_name,
                 messages=messages,
                 temperature=0,
-                response_format={"type": "json_object"} if json_mode else None
+                max_tokens=max_tokens,
+                response_format={"type": "json_object"} if json_mode else None,
+                **({"timeout": timeout} if timeout is not None else {})
             )
+            metrics.observe_llm_call("judge", self.model_name, start, "ok")
             return response.choices[0].message.content
         except Exception as e:
+            metrics.observe_llm_call("judge", self.model_name, start, "timeout" if is_timeout(e) else "error")
             print(f"LLM Error: {e}")
             return "{}" if json_mode else ""
 
-    def _generate_task_prompt(self, context, goal):
+    # --- HELPER: Structured judge calls ---
+    def _reset_judge_stats(self):
+        self.judge_stats = {"calls": 0, "retries": 0, "parse_failures": 0, "fallbacks": 0}
+        if getattr(self, 'judge_batch_size', None):
+            # batch_splits: requests halved after unusable output; rejudged: cases graded individually
+            self.judge_stats.update(batched_cases=0, batch_splits=0, rejudged=0)
+        self.cascade_stats = {"cases": 0, "escalated": 0, "reasons": Counter(), "compared": 0, "agreed": 0,
+                              "abs_diff": 0.0}
+        self.pipeline_stats = {"cases": 0, "early_grades": 0, "regraded": 0, "overlap_s": 0.0, "post_stream_s": 0.0}
+        if getattr(self, 'fast_judge', None):
+            self.fast_judge._reset_judge_stats()
+
+    def _judge_json(self, prompt, extract, max_tokens, deadline=None):
+        """
+        Runs one JSON-mode judge call and returns `extract(data)`.
+        Only this call is retried when its output is not valid JSON or lacks the
+        expected fields. Returns None once the retries are used up.
+        With a `deadline`, each attempt's timeout is the case's remaining time
+        (at most call_timeout) and no attempt starts once it has expired.
+        Raises AssessmentCancelled once the run is cancelled.
+        """
+        for attempt in range(1 + JUDGE_MAX_RETRIES):
+            self.cancel_token.raise_if_cancelled()
+            if deadline is not None and deadline.expired:
+                break
+            self._count_judge('calls')
+            if attempt:
+                self._count_judge('retries')
+            timeout = deadline.remaining(self.call_timeout) if deadline is not None else None
+            content = self._call_llm([{'role': 'user', 'content': prompt}], json_mode=True, max_tokens=max_tokens,
+                                     timeout=timeout)
+            try:
+                value = extract(json.loads(content))
+                if value is not None:
+                    return value
+            except (ValueError, TypeError, KeyError, AttributeError):
+                pass
+            self._count_judge('parse_failures')
+        self._count_judge('fallbacks')
+        return None
+
+    def _count_judge(self, key, n=1):
+        # Judge calls run on worker threads
+        with self._stats_lock:
+            self.judge_stats[key] += n
+        metrics.JUDGE_EVENTS.labels(key).inc(n)
+
+    @staticmethod
+    def _extract_score(data):
+        raw_score = float(data['score'])
+        if raw_score < 0 or raw_score > 10:
+            return None
+        return raw_score / 10.0
+
+    @classmethod
+    def _extract_score_confidence(cls, data):
+        score = cls._extract_score(data)
+        if score is None:
+            return None
+        # A missing or unreadable confidence counts as no confidence (the case escalates)
+        try:
+            confidence = min(1.0, max(0.0, float(data.get('confidence', 0.0))))
+        except (TypeError, ValueError):
+            confidence = 0.0
+        return score, confidence
+
+    @staticmethod
+    def _extract_critique(data):
+        critique = str(data.get('critique', '')).strip()
+        return critique or None
+
+    @staticmethod
+    def _extract_violation(data):
+        violation = data['violation']
+        if isinstance(violation, str):
+            violation = violation.strip().lower() == "true"
+        return bool(violation), str(data.get('reason', '')).strip()
+
+    @staticmethod
+    def _generate_task_prompt(context, goal):
         return (
             f"SCENE: {context}\n"
             f"GOAL: {goal}\n"
@@ -49,35 +292,16 @@ class GreenAgent:
             f"{{ \"perception\": \"Detailed description...\", \"prediction\": \"Expected movement...\", \"planning\": \"Immediate action...\" }}"
         )
 
-    def _fuzzy_parse(self, text):
-        clean_text = re.sub(r'```json\s*', '', text)
-        clean_text = re.sub(r'```', '', clean_text).strip()
-        try: return json.loads(clean_text)
-        except: pass
-        
-        try: return ast.literal_eval(clean_text)
-        except: pass
-
-        structured = {}
-        patterns = {
-            "perception": r"(?:Perception|See)[:\s\-\*]+(.*?)(?=(?:Prediction|Expect|Plan)|$)",
-            "prediction": r"(?:Prediction|Expect)[:\s\-\*]+(.*?)(?=(?:Plan|Action)|$)",
-            "planning": r"(?:Plan|Planning|Action|Command)[:\s\-\*]+(.*)"
-        }
-        for key, pat in patterns.items():
-            match = re.search(pat, text, re.IGNORECASE | re.DOTALL)
-            if match: structured[key] = match.group(1).strip()
-            else: structured[key] = ""
-
-        if not structured.get("planning"): 
-            structured["planning"] = text
-        return structured
+    def _fuzzy_parse(self, resp):
+        parsed, _ = parse_response(resp)
+        return parsed
 
-    def _check_safety_semantically(self, student_plan, gt_text):
+    def _check_safety_semantically(self, student_plan, gt_text, active_rules=None, deadline=None):
         """
         Uses LLM to verify if the student plan violates laws *relevant* to the specific context.
         """
-        active_rules = get_active_safety_rules(gt_text)
+        if active_rules is None:
+            active_rules = get_active_safety_rules(gt_text)
         # Even if no keywords found, we check basic safety
         rules_str = "\n".join([f"- {k.upper()}: {v}" for k, v in active_rules.items()])
         
@@ -90,89 +314,194 @@ class GreenAgent:
             f"1. FACT CHECK FIRST: If the Ground Truth says the light is GREEN, you must IGNORE any 'Red Light' laws in the reference list. The Ground Truth is absolute.\n"
             f"2. DEFINE CAUTION: 'Proceeding cautiously', 'Yielding', or 'Slowing down' near trucks/hazards is GOOD DRIVING. It is NOT 'Impeding Traffic' unless the road is completely empty and clear.\n"
             f"3. VIOLATION CHECK: Only mark a violation if the student DIRECTLY contradicts the Ground Truth Facts (e.g. going through a confirmed Red Light, hitting a confirmed pedestrian).\n"
-            f"4. OUTPUT JSON: {{ \"violation\": true/false, \"reason\": \"Short explanation\" }}"
+            f"4. OUTPUT JSON: {{\"violation\": true|false, \"reason\": \"<max 12 words>\"}}"
         )
-        try:
-            content = self._call_llm([{'role': 'user', 'content': prompt}], json_mode=True)
-            data = json.loads(content)
-            if data.get("violation"): 
-                return 1.0, [f"SAFETY VIOLATION: {data.get('reason')}"]
-        except: pass
+        verdict = self._judge_json(prompt, self._extract_violation, SAFETY_MAX_TOKENS, deadline)
+        if verdict and verdict[0]:
+            return 1.0, [f"SAFETY VIOLATION: {verdict[1]}"]
         return 0.0, []
 
-    def judge_response(self, student_resp, ground_truth):
-        report = {"scores": {}, "feedback": []}
-        
-        raw_text = str(student_resp.get('response', student_resp))
-        parsed_resp = self._fuzzy_parse(raw_text)
-        
-        for cat in ['perception', 'prediction', 'planning']:
-            student_val = parsed_resp.get(cat, "[MISSING]")
-            gt_val = ground_truth.get(cat, "")
-
-            if cat == 'perception':
-                prompt = (
-                    f"Grade PERCEPTION (0-10).\n"
-                    f"TRUTH: {gt_val}\n"
-                    f"STUDENT: {student_val}\n\n"
-                    f"RUBRIC:\n"
-                    f"- 0-3: Hallucination (seeing things not in Truth) or extremely short.\n"
-                    f"- 4-6: Misses minor details but gets main objects (cars, lights).\n"
-                    f"- 7-10: Accurate, detailed, and matches Truth.\n"
-                    f"OUTPUT: SCORE: <0-10>"
-                )
-            else:
-                gt_context = ground_truth.get('perception', '')
-                prompt = (
-                    f"Grade PLANNING (0-10).\n"
-                    f"TRUTH CONTEXT: {gt_context}\n"
-                    f"TRUTH ACTION: {gt_val}\n"
-                    f"STUDENT ACTION: {student_val}\n\n"
-                    f"SCORING RULES:\n"
-                    f"1. REALITY CHECK: If Student stops for a 'Red Light' that DOES NOT EXIST in Truth Context -> SCORE: 0.\n"
-                    f"2. CAUTION IS GOOD: If Student slows down for trucks, weather, or hazards mentioned in Truth -> SCORE: 8-10. Do NOT penalize for caution.\n"
-                    f"3. LAZY: If response is < 5 words -> MAX SCORE: 4.\n"
-                    f"4. MATCH: Action matches Truth logic -> SCORE: 9-10.\n"
-                    f"OUTPUT: SCORE: <0-10>"
-                )
-            
-            try:
-                content = self._call_llm([{'role': 'user', 'content': prompt}], json_mode=False)
-                score_match = re.search(r'(?:SCORE|Grade)[:\s\*\-]*([0-9\.]+)(?:/10)?', content, re.IGNORECASE)
-                if score_match:
-                    raw_score = float(score_match.group(1))
-                    score = raw_score / 10.0 if raw_score > 1.0 else raw_score
-                else:
-                    score = 0.5 
-            except:
-                score = 0.5
-            report['scores'][cat] = score
+    def _grade_category(self, cat, student_val, ground_truth, deadline=None):
+        """Returns (score, confidence); confidence is None unless this is a cascade's fast judge."""
+        prompt = CATEGORY_RUBRICS[cat](student_val, ground_truth)
+        if not self.report_confidence:
+            return self._judge_json(prompt, self._extract_score, SCORE_MAX_TOKENS, deadline), None
+        prompt = prompt.replace(
+            '{"score": <0-10>}',
+            '{"score": <0-10>, "confidence": <0.0-1.0, how sure you are of the score>}',
+        )
+        graded = self._judge_json(prompt, self._extract_score_confidence, SCORE_MAX_TOKENS + 10, deadline)
+        return graded if graded is not None else (None, None)
 
-        full_student = json.dumps(parsed_resp)
-        full_gt = json.dumps(ground_truth)
-        
+    def _generate_critique(self, full_student, full_gt, deadline=None):
         critique_prompt = (
             f"As a Driving Instructor, critique this log.\n"
             f"TRUTH:\n{full_gt}\n\n"
             f"STUDENT:\n{full_student}\n\n"
             f"TASK: Write ONE SHORT sentence (max 15 words) summarizing the performance.\n"
-            f"OUTPUT: CRITIQUE: <sentence>"
+            f"OUTPUT JSON: {{\"critique\": \"<sentence>\"}}"
         )
+        return self._judge_json(critique_prompt, self._extract_critique, CRITIQUE_MAX_TOKENS, deadline)
+
+    def judge_response(self, student_resp, ground_truth, deadline=None):
+        """
+        Grades one response. With a `deadline` (common.cancellation.Deadline),
+        grades still missing when it expires fall back and the report is marked
+        timed_out; a cancelled cancel_token raises AssessmentCancelled.
+        """
+        gt_context = f"{ground_truth.get('perception','')} {ground_truth.get('planning','')}"
+        active_rules = get_active_safety_rules(gt_context)
+        if self.fast_judge is None:
+            return self._judge_case(student_resp, ground_truth, gt_context, active_rules, deadline=deadline)
+        return self._cascade_judge(student_resp, ground_truth, gt_context, active_rules, deadline)
+
+    def _cascade_judge(self, student_resp, ground_truth, gt_context, active_rules, deadline=None):
+        """
+        Fast judge first; the case is re-graded by this judge when it is
+        safety-relevant (active rules, graded by this judge directly), when the
+        fast judge is unsure (low confidence or a fallback) or when its grades
+        disagree (a violation where the rules engine sees no hazard, or category
+        scores far apart). A small audit sample of accepted cases is re-graded too,
+        so agreement is also measured on the cases the fast judge keeps.
+        """
+        reasons = []
+        fast_report = None
+        if active_rules:
+            reasons.append('safety')
+        else:
+            fast_report = self.fast_judge._judge_case(student_resp, ground_truth, gt_context, active_rules,
+                                                      deadline=deadline)
+            confidence = fast_report.get('confidence', {})
+            if fast_report['judge_fallbacks'] or min(confidence.values(), default=0.0) < self.confidence_threshold:
+                reasons.append('low_confidence')
+            scores = fast_report['scores'].values()
+            if fast_report['violation_count'] or max(scores) - min(scores) > CASCADE_MAX_SPREAD:
+                reasons.append('disagreement')
+            if not reasons:
+                digest = hashlib.blake2b(f"{gt_context}|{student_resp}".encode(), digest_size=4).digest()
+                if int.from_bytes(digest, "big") / 2 ** 32 < CASCADE_AUDIT_RATE:
+                    reasons.append('audit')
+
+        if reasons:
+            report = self._judge_case(student_resp, ground_truth, gt_context, active_rules, deadline=deadline)
+            report['judge_tier'] = self.model_name
+        else:
+            report = fast_report
+            report['judge_tier'] = self.fast_judge.model_name
+        report['escalation'] = reasons
+
+        with self._stats_lock:
+            cascade = self.cascade_stats
+            cascade['cases'] += 1
+            if reasons and reasons != ['audit']:
+                cascade['escalated'] += 1
+            cascade['reasons'].update(reasons)
+            if reasons and fast_report is not None:
+                diffs = [abs(fast_report['scores'][cat] - report['scores'][cat]) for cat in CATEGORY_RUBRICS]
+                cascade['compared'] += 1
+                cascade['abs_diff'] += sum(diffs) / len(diffs)
+                if (max(diffs) <= CASCADE_AGREEMENT_TOLERANCE
+                        and bool(fast_report['violation_count']) == bool(report['violation_count'])):
+                    cascade['agreed'] += 1
+        return report
+
+    def _cascade_summary(self):
+        """Per-run escalation and agreement statistics of the judge cascade (None without one)."""
+        if self.fast_judge is None:
+            return None
+        cascade = self.cascade_stats
+        cases, compared = cascade['cases'], cascade['compared']
+        return {
+            "fast_model": self.fast_judge.model_name,
+            "cases": cases,
+            "escalated": cascade['escalated'],
+            "escalation_rate": round(cascade['escalated'] / cases, 4) if cases else 0.0,
+            "reasons": dict(cascade['reasons']),
+            "compared": compared,
+            "agreement_rate": round(cascade['agreed'] / compared, 4) if compared else None,
+            "mean_abs_score_diff": round(cascade['abs_diff'] / compared, 4) if compared else None,
+            "fast_judge_stats": dict(self.fast_judge.judge_stats),
+        }
+
+    def _judge_case(self, student_resp, ground_truth, gt_context, active_rules, early=None, deadline=None):
+        """
+        Grades one response with this judge's model (all five judge calls).
+        `early` maps a category (or 'safety') to (value, future) for calls
+        already dispatched while the response streamed in; each is reused only
+        if it graded exactly the value parsed from the final response.
+        Calls still running when `deadline` expires are abandoned and fall back.
+        """
+        report = {"scores": {}, "feedback": [], "judge_fallbacks": []}
         
-        try:
-            raw_critique = self._call_llm([{'role': 'user', 'content': critique_prompt}], json_mode=False)
-            match = re.search(r'CRITIQUE[:\s\*\-]*([0-9\.]+)', raw_critique, re.IGNORECASE | re.DOTALL)
-            critique = match.group(1).strip() if match else raw_critique.strip()
-            critique = critique.replace('"', '').replace("'", "").replace("Critique:", "").strip()
-        except:
+        # Dicts are graded as-is; only text goes through the tolerant parser
+        parsed_resp, parse_strategy = parse_response(student_resp)
+        report['parse_strategy'] = parse_strategy
+
+        # Recorded so violation rates can be broken down per hazard
+        report['hazards'] = sorted(active_rules)
+
+        early = early or {}
+        reused = []
+        def dispatch(name, value, fn, *args):
+            if name in early and early[name][0] == value:
+                reused.append(name)
+                return early[name][1]
+            return self._judge_pool.submit(fn, *args)
+
+        # --- FAN OUT: every judge call for this case is independent ---
+        score_futures = {}
+        for cat in CATEGORY_RUBRICS:
+            student_val = parsed_resp.get(cat, "[MISSING]")
+            score_futures[cat] = dispatch(cat, student_val, self._grade_category, cat, student_val, ground_truth,
+                                          deadline)
+        full_student = json.dumps(parsed_resp)
+        critique_future = dispatch('critique', full_student, self._generate_critique, full_student,
+                                   json.dumps(ground_truth), deadline)
+        plan = parsed_resp.get('planning', '')
+        safety_future = dispatch('safety', plan, self._check_safety_semantically, plan, gt_context, active_rules,
+                                 deadline)
+        if early:
+            report['early_grades'] = reused
+
+        def wait(future, timed_out_value):
+            try:
+                return future.result(timeout=deadline.remaining() if deadline else None)
+            except FutureTimeout:
+                future.cancel()
+                report['timed_out'] = True
+                report['timeout_stage'] = 'judge'
+                return timed_out_value
+
+        for cat, future in score_futures.items():
+            score, confidence = wait(future, (None, None))
+            if score is None:
+                # Neutral score, but the case is flagged so the fallback is visible
+                score = 0.5
+                report['judge_fallbacks'].append(cat)
+            report['scores'][cat] = score
+            if self.report_confidence:
+                report.setdefault('confidence', {})[cat] = confidence or 0.0
+
+        critique = wait(critique_future, None)
+        if critique is None:
             critique = "Critique generation failed."
-        
+            report['judge_fallbacks'].append('critique')
         report['critique'] = critique
 
-        gt_context = f"{ground_truth.get('perception','')} {ground_truth.get('planning','')}"
-        penalty, violations = self._check_safety_semantically(parsed_resp.get('planning', ''), gt_context)
-        
-        if penalty > 0:
+        penalty, violations = wait(safety_future, (0.0, None))
+        if violations is None:
+            violations = []
+            report['judge_fallbacks'].append('safety')
+        if report['judge_fallbacks'] and deadline is not None and deadline.expired:
+            # The calls themselves ran out of the case's time (their timeout is the deadline)
+            report['timed_out'] = True
+            report['timeout_stage'] = 'judge'
+        return self._apply_verdict(report, violations, parsed_resp, gt_context)
+
+    @staticmethod
+    def _apply_verdict(report, violations, parsed_resp, gt_context):
+        """Final step of every grading path: safety penalty, feedback and the graded responses."""
+        if violations:
             report['scores']['planning'] = 0.0
             report['critique'] = f"⛔ {violations[0]}"
         
@@ -183,12 +512,196 @@ class GreenAgent:
         report['generated_responses'] = parsed_resp
         return report
 
-    def _generate_batch_analysis(self, results):
-        critiques = [r.get('critique', '') for r in results]
-        all_text = "\n".join([f"- Case {i}: {c}" for i, c in enumerate(critiques)])
-        
+    def _timeout_report(self, ground_truth, response=None):
+        """eval_report of a case whose driver ran out of time: nothing is graded, every score is 0."""
+        gt_context = f"{ground_truth.get('perception','')} {ground_truth.get('planning','')}"
+        report = {
+            "scores": {cat: 0.0 for cat in CATEGORY_RUBRICS}, "judge_fallbacks": [],
+            "parse_strategy": "timeout", "hazards": sorted(get_active_safety_rules(gt_context)),
+            "critique": f"⏱️ Driver timed out after {self.case_timeout}s.",
+            "timed_out": True, "timeout_stage": "driver", "judge_latency": 0.0,
+        }
+        partial = response if isinstance(response, dict) else {}
+        return self._apply_verdict(report, [], dict(partial), gt_context)
+
+    def _driver_timed_out(self, driven):
+        """True when a driver call timed out or (for drivers that ignore the timeout) overran the case deadline."""
+        response = driven['response']
+        return ((isinstance(response, dict) and response.get('timed_out', False))
+                or (self.case_timeout is not None and driven['service_time'] >= self.case_timeout))
+
+    # --- CROSS-CASE BATCHED JUDGING ---
+    def judge_batch(self, items, deadlines=None):
+        """
+        Grades many responses with as few judge requests as possible.
+        `items` is a list of (case_id, student_resp, ground_truth); one eval
+        report is returned per item, in order. Cases are packed into requests
+        under JUDGE_BATCH_TOKEN_BUDGET (at most judge_batch_size each), a
+        request whose output is unusable is split in half and retried, and any
+        case whose entry is still missing or malformed is graded on its own.
+
+        `deadlines` (one Deadline per item, optional) bound each case: a request
+        still running at the earliest deadline of its cases is abandoned, and
+        cases whose deadline has passed fall back (timed_out, stage 'judge').
+        """
+        if not items:
+            return []
+        deadlines = deadlines or [None] * len(items)
+        prepared = []
+        seen = Counter()
+        for (case_id, student_resp, ground_truth), deadline in zip(items, deadlines):
+            parsed_resp, parse_strategy = parse_response(student_resp)
+            gt_context = f"{ground_truth.get('perception','')} {ground_truth.get('planning','')}"
+            active_rules = get_active_safety_rules(gt_context)
+            # Keys must be unique within a request: repeated ids get a suffix
+            key = str(case_id)
+            seen[key] += 1
+            if seen[key] > 1:
+                key = f"{key}#{seen[key]}"
+            payload = json.dumps({
+                "id": key,
+                "truth": {cat: ground_truth.get(cat, '') for cat in CATEGORY_RUBRICS},
+                "laws": [f"{k.upper()}: {v}" for k, v in active_rules.items()],
+                "student": {cat: parsed_resp.get(cat, "[MISSING]") for cat in CATEGORY_RUBRICS},
+            })
+            prepared.append({
+                "key": key, "student_resp": student_resp, "ground_truth": ground_truth,
+                "parsed_resp": parsed_resp, "parse_strategy": parse_strategy,
+                "gt_context": gt_context, "active_rules": active_rules, "payload": payload,
+                "deadline": deadline,
+            })
+
+        groups = self._pack_batches(prepared)
+        futures = [self._judge_pool.submit(self._judge_group, group) for group in groups]
+        reports = {}
+        for group, future in zip(groups, futures):
+            try:
+                reports.update(future.result(timeout=self._group_remaining(group)))
+            except FutureTimeout:
+                # The request keeps running in the pool; its cases are rejudged or time out below
+                future.cancel()
+
+        out = []
+        for item in prepared:
+            report = reports.get(item['key'])
+            if report is None and item['deadline'] is not None and item['deadline'].expired:
+                report = self._judge_timeout_report(item)
+            elif report is None:
+                self._count_judge('rejudged')
+                report = self._judge_case(item['student_resp'], item['ground_truth'],
+                                          item['gt_context'], item['active_rules'], deadline=item['deadline'])
+            out.append(report)
+        return out
+
+    @staticmethod
+    def _group_remaining(group):
+        """Seconds until the earliest deadline of a request's cases; None when none has one."""
+        left = [item['deadline'].remaining() for item in group if item['deadline'] is not None]
+        left = [seconds for seconds in left if seconds is not None]
+        return min(left) if left else None
+
+    def _judge_timeout_report(self, item):
+        """eval_report of a batched case whose deadline passed before its grades came back: every call falls back."""
+        report = {
+            "scores": {cat: 0.5 for cat in CATEGORY_RUBRICS},
+            "judge_fallbacks": list(CATEGORY_RUBRICS) + ['critique', 'safety'],
+            "parse_strategy": item['parse_strategy'], "hazards": sorted(item['active_rules']),
+            "critique": "Critique generation failed.", "timed_out": True, "timeout_stage": "judge",
+        }
+        if self.report_confidence:
+            report['confidence'] = {cat: 0.0 for cat in CATEGORY_RUBRICS}
+        return self._apply_verdict(report, [], dict(item['parsed_resp']), item['gt_context'])
+
+    def _pack_batches(self, prepared):
+        """Greedy packing of cases into requests under the token budget and the batch size."""
+        groups, group, tokens = [], [], 0
+        for item in prepared:
+            size = len(item['payload']) // 4 + 1
+            if group and (len(group) >= self.judge_batch_size or tokens + size > JUDGE_BATCH_TOKEN_BUDGET):
+                groups.append(group)
+                group, tokens = [], 0
+            group.append(item)
+            tokens += size
+        if group:
+            groups.append(group)
+        return groups
+
+    def _judge_group(self, group):
+        """
+        One batched request; returns {key: report} for the entries that came back well-formed.
+        An unusable answer is split in half and retried while the cases' deadlines allow.
+        """
         prompt = (
-            f"Analyze these driver logs:\n{all_text}\n\n"
+            f"You are an Expert Driving Examiner grading {len(group)} independent driving logs.\n"
+            f"Grade every case on its own, comparing STUDENT with TRUTH.\n\n"
+            f"RUBRIC:\n{BATCH_RUBRIC}\n"
+            f"CASES:\n" + "\n".join(item['payload'] for item in group) + "\n\n"
+            f"OUTPUT JSON with exactly one entry per case id:\n"
+            f"{{\"results\": [{{\"id\": \"<case id>\", \"perception\": <0-10>, \"prediction\": <0-10>, "
+            f"\"planning\": <0-10>, \"critique\": \"<max 15 words>\", \"violation\": true|false, "
+            f"\"reason\": \"<max 12 words>\"}}]}}"
+        )
+        # Bounded by the earliest deadline of the group's cases; none is sent once it has passed
+        remaining = self._group_remaining(group)
+        if remaining is not None:
+            if remaining <= 0:
+                return {}
+            if self.call_timeout is not None:
+                remaining = min(remaining, self.call_timeout)
+        self._count_judge('calls')
+        content = self._call_llm([{'role': 'user', 'content': prompt}], json_mode=True,
+                                 max_tokens=JUDGE_BATCH_TOKENS_PER_CASE * len(group) + 20, timeout=remaining)
+        try:
+            entries = {str(e.get('id')): e for e in json.loads(content)['results'] if isinstance(e, dict)}
+        except (ValueError, TypeError, KeyError, AttributeError):
+            entries = None
+
+        if not entries:
+            self._count_judge('parse_failures')
+            if len(group) == 1:
+                return {}
+            # Likely truncated or confused by the size: halve and try again
+            self._count_judge('batch_splits')
+            mid = len(group) // 2
+            return {**self._judge_group(group[:mid]), **self._judge_group(group[mid:])}
+
+        graded = {}
+        for item in group:
+            entry = entries.get(item['key'])
+            report = self._batch_entry_report(item, entry) if entry else None
+            if report is not None:
+                graded[item['key']] = report
+        self._count_judge('batched_cases', len(graded))
+        return graded
+
+    def _batch_entry_report(self, item, entry):
+        """eval_report from one batched entry, or None when any field is missing or malformed."""
+        try:
+            scores = {cat: self._extract_score({'score': entry[cat]}) for cat in CATEGORY_RUBRICS}
+            critique = self._extract_critique(entry)
+            violation, reason = self._extract_violation(entry)
+        except (ValueError, TypeError, KeyError, AttributeError):
+            return None
+        if None in scores.values() or critique is None:
+            return None
+        report = {
+            "scores": scores, "feedback": [], "judge_fallbacks": [],
+            "parse_strategy": item['parse_strategy'], "hazards": sorted(item['active_rules']),
+            "critique": critique,
+        }
+        violations = [f"SAFETY VIOLATION: {reason}"] if violation else []
+        return self._apply_verdict(report, violations, dict(item['parsed_resp']), item['gt_context'])
+
+    @staticmethod
+    def _extract_analysis(data):
+        def clean(lst): return [str(x) for x in lst] if isinstance(lst, list) else ["No data"]
+        if not any(key in data for key in ANALYSIS_KEYS):
+            return None
+        return {key: clean(data.get(key, [])) for key in ANALYSIS_KEYS}
+
+    @staticmethod
+    def _analysis_task():
+        return (
             f"TASK: Output a JSON summary.\n"
             f"{{ \n"
             f"  \"strengths\": [List of 2 specific positive behaviors],\n"
@@ -197,79 +710,498 @@ class GreenAgent:
             f"}}\n"
             f"Keep items short and concise."
         )
-        
-        try:
-            content = self._call_llm([{'role': 'user', 'content': prompt}], json_mode=True)
-            data = json.loads(content)
-            def clean(lst): return [str(x) for x in lst] if isinstance(lst, list) else ["No data"]
-            return {
-                "strengths": clean(data.get('strengths', [])),
-                "weaknesses": clean(data.get('weaknesses', [])),
-                "recommendations": clean(data.get('recommendations', []))
-            }
-        except Exception as e:
+
+    def _cached_analysis(self, prompt):
+        """One analysis call, memoised by a hash of (judge model, prompt)."""
+        key = hashlib.sha256(f"{self.model_name}\n{prompt}".encode()).hexdigest()
+        with self._stats_lock:
+            if key in self._analysis_cache:
+                self._analysis_cache.move_to_end(key)
+                metrics.ANALYSIS_CACHE.labels("hit").inc()
+                return self._analysis_cache[key]
+        metrics.ANALYSIS_CACHE.labels("miss").inc()
+        summary = self._judge_json(prompt, self._extract_analysis, ANALYSIS_MAX_TOKENS)
+        if summary is not None:
+            with self._stats_lock:
+                self._analysis_cache[key] = summary
+                while len(self._analysis_cache) > ANALYSIS_CACHE_SIZE:
+                    self._analysis_cache.popitem(last=False)
+        return summary
+
+    def _summarize_critiques(self, lines):
+        """Map step: strengths/weaknesses/recommendations for one chunk of critique lines."""
+        all_text = "\n".join(lines)
+        return self._cached_analysis(f"Analyze these driver logs:\n{all_text}\n\n" + self._analysis_task())
+
+    def _merge_summaries(self, partials):
+        """Reduce step: merges partial summaries of the same driver into one."""
+        parts = "\n".join(
+            f"- Part {i}: " + " | ".join(f"{key}: {'; '.join(p[key])}" for key in ANALYSIS_KEYS)
+            for i, p in enumerate(partials, 1)
+        )
+        return self._cached_analysis(
+            f"These are partial analyses of different batches of the SAME driver's logs:\n{parts}\n\n"
+            f"Merge them into one overall analysis, keeping the most frequent and most severe points.\n"
+            + self._analysis_task()
+        )
+
+    def _generate_batch_analysis(self, results):
+        """
+        Map-reduce summary of every critique: chunks of ANALYSIS_CHUNK_SIZE critiques
+        are summarised in parallel, then the partial summaries are merged
+        ANALYSIS_MERGE_FANIN at a time until one is left. Prompt size and the
+        number of sequential calls stay bounded however many cases there are.
+        """
+        critiques = [r.get('critique', '') for r in results]
+        lines = [f"- Case {i}: {c}" for i, c in enumerate(critiques)]
+        chunks = [lines[i:i + ANALYSIS_CHUNK_SIZE] for i in range(0, len(lines), ANALYSIS_CHUNK_SIZE)] or [[]]
+
+        partials = list(self._judge_pool.map(self._summarize_critiques, chunks))
+        partials = [p for p in partials if p is not None]
+        while len(partials) > 1:
+            groups = [partials[i:i + ANALYSIS_MERGE_FANIN] for i in range(0, len(partials), ANALYSIS_MERGE_FANIN)]
+            merged = list(self._judge_pool.map(
+                lambda group: group[0] if len(group) == 1 else self._merge_summaries(group), groups
+            ))
+            # A failed merge falls back to its first partial rather than losing the group
+            partials = [m if m is not None else g[0] for m, g in zip(merged, groups)]
+
+        if not partials:
             return {"strengths": ["Analysis failed."], "weaknesses": [], "recommendations": []}
+        return partials[0]
 
-    def run_assessment(self, dataset_path, limit=5, agent_name="Agent"):
-        print(f"🟢 Green Agent: Starting Assessment on {dataset_path}...")
-        self.dataset = SplitFolderDataset(dataset_path)
-        self.dataset.prepare_runtime_buckets(limit, seed=None) 
-        
-        test_batch = self.dataset.get_test_batch()
-        results = []
-        
-        pbar = tqdm(test_batch, desc=f"Assessing {agent_name}")
-        for case in pbar:
-            task_prompt = self._generate_task_prompt(case['context'], case['goal'])
-            
-            # --- LATENCY TIMER ---
+    def _drive_cases(self, cases):
+        """
+        Sends a batch of test cases to the White Agent. Returns one
+        {"response", "queue_time", "service_time"} per case, in order.
+        """
+        tasks = [
+            {"message": self._generate_task_prompt(case['context'], case['goal']),
+             "image_path": case['image_path'], "image_bytes": case.get('image_bytes')}
+            for case in cases
+        ]
+        if hasattr(self.white_agent, 'receive_tasks'):
+            return self.white_agent.receive_tasks(tasks, timeout=self.case_timeout, cancel_token=self.cancel_token)
+
+        # Drivers without a batch API: one task at a time, nothing is ever queued
+        driven = []
+        for task in tasks:
+            self.cancel_token.raise_if_cancelled()
             start_time = time.time()
             try:
-                response = self.white_agent.receive_task(message=task_prompt, image_path=case['image_path'])
+                response = self.white_agent.receive_task(message=task['message'], image_path=task['image_path'],
+                                                         image_bytes=task['image_bytes'], timeout=self.case_timeout)
             except Exception as e:
                 response = {"error": str(e)}
-            latency = round(time.time() - start_time, 2)
-            # ---------------------
+            driven.append({"response": response, "queue_time": 0.0, "service_time": time.time() - start_time})
+        return driven
+
+    def _assess_batch(self, cases):
+        """
+        Drives a batch of cases through the White Agent, then grades them
+        (blocking). `latency` is the driver's service time and `queue_time`
+        the time the case waited for a driver slot; with batched judging,
+        judge_latency is the batch's judge time split evenly.
 
-            eval_report = self.judge_response(response, case['ground_truth'])
+        Each case gets case_timeout seconds of driver plus judge time, batched
+        judging included. A case whose driver timed out is not judged
+        (timed_out, all scores 0); judge calls still running at its deadline
+        fall back (timed_out as well).
+        """
+        self.cancel_token.raise_if_cancelled()
+        if self.pipeline and hasattr(self.white_agent, 'stream_task'):
+            return [self._assess_case_streamed(case) for case in cases]
+        driven = self._drive_cases(cases)
+        self.cancel_token.raise_if_cancelled()
+
+        reports = [None] * len(cases)
+        live = []
+        for i, (case, d) in enumerate(zip(cases, driven)):
+            if self._driver_timed_out(d):
+                reports[i] = self._timeout_report(case['ground_truth'], d['response'])
+            else:
+                live.append(i)
+
+        if self.judge_batch_size:
+            if live:
+                # Each case keeps whatever the driver left of its time
+                deadlines = [Deadline(self.case_timeout - driven[i]['service_time']) if self.case_timeout is not None
+                             else None for i in live]
+                judge_start = time.time()
+                judged = self.judge_batch([(cases[i]['id'], driven[i]['response'], cases[i]['ground_truth'])
+                                           for i in live], deadlines)
+                judge_latency = round((time.time() - judge_start) / len(live), 2)
+                for i, eval_report in zip(live, judged):
+                    eval_report['judge_latency'] = judge_latency
+                    reports[i] = eval_report
+        else:
+            for i in live:
+                d = driven[i]
+                # The judge gets whatever the driver left of the case's time
+                deadline = Deadline(self.case_timeout - d['service_time']) if self.case_timeout is not None else None
+                judge_start = time.time()
+                eval_report = self.judge_response(d['response'], cases[i]['ground_truth'], deadline=deadline)
+                eval_report['judge_latency'] = round(time.time() - judge_start, 2)
+                reports[i] = eval_report
+
+        for case, d, eval_report in zip(cases, driven, reports):
             eval_report['id'] = case['id']
             eval_report['image_path'] = case['image_path']
-            eval_report['latency'] = latency 
-            results.append(eval_report)
+            eval_report['latency'] = round(d['service_time'], 2)
+            eval_report['queue_time'] = round(d['queue_time'], 2)
+            eval_report.setdefault('timed_out', False)
+        return reports
+
+    def _assess_case_streamed(self, case):
+        """
+        Pipelined version of one case (blocking): the driver's answer is
+        streamed, and each category's grading call is dispatched as soon as its
+        field is complete (the safety check and critique with `planning`). Judge and driver
+        work overlap, so only what is left after the stream ends adds to the
+        case's end-to-end time; judge_latency is that remainder. The stream is
+        closed as soon as the case deadline passes or the run is cancelled.
+        """
+        ground_truth = case['ground_truth']
+        gt_context = f"{ground_truth.get('perception','')} {ground_truth.get('planning','')}"
+        active_rules = get_active_safety_rules(gt_context)
+        parser = IncrementalFieldParser()
+        early, dispatched, finished = {}, {}, {}
+
+        def submit(name, value, fn, *args):
+            future = self._judge_pool.submit(fn, *args)
+            dispatched[name] = time.time()
+            future.add_done_callback(lambda _, name=name: finished.setdefault(name, time.time()))
+            early[name] = (value, future)
+
+        deadline = Deadline(self.case_timeout)
+        stalled = False
+        stream = None
+        start_time = time.time()
+        try:
+            stream = self.white_agent.stream_task(self._generate_task_prompt(case['context'], case['goal']),
+                                                  case['image_path'], case.get('image_bytes'),
+                                                  timeout=self.case_timeout)
+            for piece in stream:
+                if deadline.expired or self.cancel_token.cancelled:
+                    stalled = True
+                    break
+                for field, value in parser.feed(piece):
+                    if field in CATEGORY_RUBRICS and field not in early:
+                        submit(field, value, self._grade_category, field, value, ground_truth, deadline)
+                    if field == 'planning' and 'safety' not in early:
+                        submit('safety', value, self._check_safety_semantically, value, gt_context, active_rules,
+                               deadline)
+                        # The critique reads the whole answer: usually complete once `planning` is
+                        full_student = json.dumps(parser.fields)
+                        submit('critique', full_student, self._generate_critique, full_student,
+                               json.dumps(ground_truth), deadline)
+            response = parser.text
+        except Exception as e:
+            response = {"error": str(e)}
+            stalled = is_timeout(e)
+        finally:
+            if stream is not None and hasattr(stream, 'close'):
+                stream.close()
+        stream_end = time.time()
+
+        if stalled:
+            for _, future in early.values():
+                future.cancel()
+            self.cancel_token.raise_if_cancelled()
+            eval_report = self._timeout_report(ground_truth, parser.fields)
+            eval_report.update(id=case['id'], image_path=case['image_path'],
+                               latency=round(stream_end - start_time, 2), queue_time=0.0)
+            return eval_report
+
+        eval_report = self._judge_case(response, ground_truth, gt_context, active_rules, early=early,
+                                       deadline=deadline)
+        judge_end = time.time()
+
+        used = eval_report.pop('early_grades', [])
+        overlap = sum(max(0.0, min(finished.get(name, judge_end), stream_end) - dispatched[name]) for name in used)
+        eval_report['pipeline'] = {"early_grades": used, "overlap_s": round(overlap, 3)}
+        eval_report['judge_latency'] = round(judge_end - stream_end, 2)
+        eval_report['id'] = case['id']
+        eval_report['image_path'] = case['image_path']
+        eval_report['latency'] = round(stream_end - start_time, 2)
+        eval_report['queue_time'] = 0.0
+        eval_report.setdefault('timed_out', False)
+
+        with self._stats_lock:
+            pipeline = self.pipeline_stats
+            pipeline['cases'] += 1
+            pipeline['early_grades'] += len(used)
+            pipeline['regraded'] += len(early) - len(used)
+            pipeline['overlap_s'] += overlap
+            pipeline['post_stream_s'] += judge_end - stream_end
+        return eval_report
 
-        analysis = self._compile_stats(results)
-        qualitative = self._generate_batch_analysis(results)
-        analysis['analysis'] = qualitative
+    def _pipeline_summary(self):
+        """Per-run overlap between driver streaming and judging (None unless pipelining ran)."""
+        pipeline = self.pipeline_stats
+        cases = pipeline['cases']
+        if not cases:
+            return None
+        judged = pipeline['overlap_s'] + pipeline['post_stream_s']
+        return {
+            "cases": cases,
+            "early_grades": pipeline['early_grades'],
+            "regraded": pipeline['regraded'],
+            "mean_overlap_s": round(pipeline['overlap_s'] / cases, 3),
+            "mean_post_stream_judge_s": round(pipeline['post_stream_s'] / cases, 3),
+            # Share of the judge's wall time hidden behind the driver's generation
+            "overlap_ratio": round(pipeline['overlap_s'] / judged, 3) if judged else 0.0,
+        }
+
+    def _case_batches(self):
+        """Test cases in groups sized for the White Agent's batches and the judge's (whichever is larger)."""
+        cases = self.dataset.iter_test_batch()
+        size = max(self.judge_batch_size or 1, getattr(self.white_agent, 'batch_size', None) or 1)
+        while True:
+            batch = list(itertools.islice(cases, size))
+            if not batch:
+                return
+            yield batch
+
+    def _use_cancel_token(self, token):
+        self.cancel_token = token
+        if self.fast_judge:
+            self.fast_judge.cancel_token = token
+
+    async def _run_cancellable(self, fn, *args):
+        """
+        Runs blocking `fn` in a worker thread and waits for it, but returns as
+        soon as the cancel token fires (raising AssessmentCancelled). The
+        abandoned thread stops at its next cancellation check.
+        """
+        loop = asyncio.get_running_loop()
+        woken = loop.create_future()
+        def wake():
+            loop.call_soon_threadsafe(lambda: woken.done() or woken.set_result(None))
+        remove = self.cancel_token.on_cancel(wake)
+        work = asyncio.ensure_future(asyncio.to_thread(fn, *args))
+        try:
+            await asyncio.wait({work, woken}, return_when=asyncio.FIRST_COMPLETED)
+        finally:
+            remove()
+        if not work.done():
+            # Its outcome is still collected, so the exception is not reported as unhandled
+            work.add_done_callback(lambda t: t.cancelled() or t.exception())
+            self.cancel_token.raise_if_cancelled()
+        return work.result()
+
+    async def stream_assessment(self, dataset_path, limit=5, agent_name="Agent", seed=None, results_dir=None,
+                                cancel_token=None):
+        """
+        Async generator version of the assessment.
+        Yields one {"type": "case", ...} event per graded case (with a running
+        aggregate), then a final {"type": "summary", "analysis": ...} event.
+        Blocking agent/judge work runs in a worker thread so the event loop stays free.
+
+        With `results_dir` the run is streamed: cases are generated lazily, each
+        eval_report is appended to <results_dir>/<agent>.jsonl as it completes
+        and only running statistics stay in memory, so peak memory does not grow
+        with the batch size.
+
+        Cancelling `cancel_token` (common.cancellation.CancelToken) stops the
+        run: no further driver or judge calls start, the driver's HTTP session
+        is closed and AssessmentCancelled is raised from this generator.
+        """
+        self._use_cancel_token(cancel_token or CancelToken())
+        print(f"🟢 Green Agent: Starting Assessment on {dataset_path}...")
+        self.dataset = SplitFolderDataset(dataset_path)
+        self.dataset.prepare_runtime_buckets(limit, seed=seed) 
+        self.run_config[agent_name] = {
+            "dataset_path": self.dataset.root_dir,
+            "dataset_hash": self.dataset.snapshot_hash(),
+            "limit": limit,
+            "seed": seed,
+            "fast_judge_model": self.fast_judge.model_name if self.fast_judge else None,
+        }
         
-        self.history[agent_name] = {"analysis": analysis, "details": results}
-        return analysis
+        total = len(self.dataset.active_test_batch)
+        streaming = results_dir is not None
+        results = []
+        case_log = None
+        if streaming:
+            details_path = os.path.join(results_dir, re.sub(r'[^A-Za-z0-9_.-]+', '_', agent_name) + ".jsonl")
+            if os.path.exists(details_path):
+                os.remove(details_path)
+            case_log = CaseLog(details_path)
+            critique_sample = []
+            strategies = Counter()
+            sample_rng = random.Random(seed)
+        self._reset_judge_stats()
+
+        # --- RUNNING AGGREGATE (O(1) per case, Welford moments) ---
+        running = stats.RunningStats(CATEGORY_WEIGHTS)
+
+        # Closing the driver client on cancel drops its pooled connections and queued tasks
+        close_driver = getattr(self.white_agent, 'close', None)
+        release_driver = self.cancel_token.on_cancel(close_driver) if close_driver else (lambda: None)
+        try:
+            index = 0
+            for batch in self._case_batches():
+                reports = await self._run_cancellable(self._assess_batch, batch)
+                for case, eval_report in zip(batch, reports):
+                    index += 1
+                    running.add(eval_report)
+                    metrics.CASES.labels("timed_out" if eval_report['timed_out'] else "ok").inc()
+                    metrics.CASE_SECONDS.observe(eval_report['latency'] + eval_report['judge_latency'])
+                    if streaming:
+                        case_log.append(eval_report)
+                        strategies[eval_report.get('parse_strategy', 'unknown')] += 1
+                        # Bounded, uniform sample of critiques for the batch analysis
+                        if len(critique_sample) < ANALYSIS_SAMPLE_SIZE:
+                            critique_sample.append({'critique': eval_report.get('critique', '')})
+                        else:
+                            j = sample_rng.randrange(index)
+                            if j < ANALYSIS_SAMPLE_SIZE:
+                                critique_sample[j] = {'critique': eval_report.get('critique', '')}
+                    else:
+                        results.append(eval_report)
+                    means = running.means()
+
+                    yield {
+                        "type": "case",
+                        "agent": agent_name,
+                        "index": index,
+                        "total": total,
+                        "case_id": case['id'],
+                        "scores": eval_report['scores'],
+                        "violation_count": eval_report['violation_count'],
+                        "latency": eval_report['latency'],
+                        "queue_time": eval_report['queue_time'],
+                        "judge_latency": eval_report['judge_latency'],
+                        "timed_out": eval_report['timed_out'],
+                        "aggregate": {
+                            **{cat: round(mean, 2) for cat, mean in means.items()},
+                            "overall_score_percent": round(self._weighted_score(means) * 100, 1),
+                            "total_violations": running.total_violations,
+                            "mean_latency": round(running.mean[4], 2),
+                            "timed_out": running.timed_out,
+                        },
+                    }
+
+            if streaming:
+                analysis = self._format_stats(running.summary(), dict(strategies)) if running.n else {}
+                analysis['analysis'] = await self._run_cancellable(self._generate_batch_analysis, critique_sample)
+            else:
+                analysis = self._compile_stats(results)
+                analysis['analysis'] = await self._run_cancellable(self._generate_batch_analysis, results)
+        except asyncio.CancelledError:
+            # The consumer gave up (e.g. the A2A task was cancelled): stop the worker threads as well
+            self.cancel_token.cancel("consumer cancelled")
+            raise
+        finally:
+            release_driver()
+            if case_log:
+                case_log.close()
+
+        if streaming:
+            self.history[agent_name] = {"analysis": analysis, "details": [], "details_path": details_path}
+        else:
+            self.history[agent_name] = {"analysis": analysis, "details": results}
+        analysis['judge_stats'] = dict(self.judge_stats)
+        cascade = self._cascade_summary()
+        if cascade:
+            analysis['judge_stats']['cascade'] = cascade
+        pipeline = self._pipeline_summary()
+        if pipeline:
+            analysis['judge_stats']['pipeline'] = pipeline
+        yield {"type": "summary", "agent": agent_name, "analysis": analysis}
+
+    def run_assessment(self, dataset_path, limit=5, agent_name="Agent", seed=None, results_dir=None,
+                       cancel_token=None):
+        """
+        Blocking wrapper around stream_assessment for scripts. Returns the final analysis.
+        `cancel_token` may be cancelled from another thread; Ctrl-C cancels the run too.
+        """
+        from tqdm import tqdm
+        cancel_token = cancel_token or CancelToken()
+        async def drain():
+            analysis = {}
+            pbar = tqdm(total=limit, desc=f"Assessing {agent_name}")
+            async for event in self.stream_assessment(dataset_path, limit=limit, agent_name=agent_name, seed=seed,
+                                                      results_dir=results_dir, cancel_token=cancel_token):
+                if event['type'] == 'case':
+                    pbar.total = event['total']
+                    pbar.update(1)
+                else:
+                    analysis = event['analysis']
+            pbar.close()
+            return analysis
+        try:
+            return asyncio.run(drain())
+        except KeyboardInterrupt:
+            cancel_token.cancel("interrupted")
+            raise
+
+    @staticmethod
+    def _weighted_score(means):
+        return sum(means.get(cat, 0) * weight for cat, weight in CATEGORY_WEIGHTS.items())
 
     def _compile_stats(self, results):
         if not results: return {}
-        s_perc = statistics.mean([r['scores'].get('perception', 0) for r in results])
-        s_pred = statistics.mean([r['scores'].get('prediction', 0) for r in results])
-        s_plan = statistics.mean([r['scores'].get('planning', 0) for r in results])
-        
-        weighted = (s_perc * 0.2) + (s_pred * 0.3) + (s_plan * 0.5)
+        summary = stats.summarize(
+            stats.to_records(results), CATEGORY_WEIGHTS,
+            hazards=[r.get('hazards', []) for r in results],
+        )
+        return self._format_stats(summary, dict(Counter(r.get('parse_strategy', 'unknown') for r in results)))
+
+    @staticmethod
+    def _format_stats(summary, parse_strategies):
+        """Analysis dict from a stats.summarize() / RunningStats.summary() result."""
+        means = summary['means']
+        weighted = summary['overall']
+        overall = summary['distribution']['overall']
         
         return {
             "metrics": {
-                "perception": round(s_perc, 2),
-                "prediction": round(s_pred, 2),
-                "planning": round(s_plan, 2),
-                "total_violations": sum(r['violation_count'] for r in results)
+                "perception": round(means['perception'], 2),
+                "prediction": round(means['prediction'], 2),
+                "planning": round(means['planning'], 2),
+                "total_violations": summary['total_violations']
             },
+            "distribution": summary['distribution'],
+            "violation_rate": summary['violation_rate'],
+            "hazard_violation_rates": summary['hazard_violation_rates'],
+            "latency": summary['latency'],
+            "queue_time": summary['queue_time'],
+            "judge_latency": summary['judge_latency'],
+            "timed_out_cases": summary['timed_out'],
+            "parse_strategies": parse_strategies,
             "overall_score_percent": round(weighted * 100, 1),
+            "overall_ci_percent": [round(overall['ci_low'] * 100, 1), round(overall['ci_high'] * 100, 1)],
             "overall_grade": "PASS" if weighted > 0.6 else "FAIL"
         }
 
-    def generate_artifacts(self, output_dir):
-        os.makedirs(output_dir, exist_ok=True)
-        json_path = os.path.join(output_dir, "tournament_results.json")
-        html_path = os.path.join(output_dir, "leaderboard.html")
-        
-        with open(json_path, 'w') as f: 
-            json.dump(self.history, f, indent=4)
-            
-        generate_leaderboard_report(json_path, html_path)
+    def compare_agents(self, cases):
+        """
+        Pairwise significance tests on the per-case overall scores of every
+        assessed agent. `cases` holds the agent and score columns of the run's
+        cases.parquet; it is split per agent on column arrays, not row by row.
+        """
+        return stats.pairwise_tests(stats.grouped_overall_scores(cases, CATEGORY_WEIGHTS))
+
+    def generate_artifacts(self, output_dir, run_id=None):
+        """
+        Writes this run to output_dir/runs/<run_id>/ (Parquet results + report),
+        appends it to the run registry (output_dir/runs.sqlite) and refreshes the
+        cross-run leaderboard (output_dir/leaderboard.html). Earlier runs are kept.
+        Returns the path of this run's report.
+        """
+        run_id = run_id or new_run_id()
+        run_dir = os.path.join(output_dir, "runs", run_id)
+        # One Parquet row per (run, agent, case) plus a small per-agent summary JSON
+        write_cases(self.history, run_dir, run_id)
+        cases = read_cases(run_dir, columns=["agent", *stats.SCORE_FIELDS])
+        write_summary(self.history, run_dir, run_id, pairwise=self.compare_agents(cases))
+        html_path = os.path.join(run_dir, "leaderboard.html")
+        # Fragment cache is shared by all runs: unchanged agents are not re-rendered
+        generate_leaderboard_report(run_dir, html_path, cache_dir=os.path.join(output_dir, REPORT_CACHE_DIR))
+
+        with RunRegistry(os.path.join(output_dir, REGISTRY_FILE)) as registry:
+            registry.record_run(run_id, self.history, judge_model=self.model_name, config=self.run_config)
+            generate_history_report(registry, os.path.join(output_dir, "leaderboard.html"))
         return html_path
\ No newline at end of file
@@ -6,16 +6,25 @@ import time
 # Ensure we can find the modules
 sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 
-from green_agent.green_agent import GreenAgent
-from white_agent.white_agent import WhiteAgent
+# The agents are imported inside main(): --help stays instant, and only the
+# driver client actually used (local or remote) gets loaded
 
 def main():
     parser = argparse.ArgumentParser(description="AutoDrive Agentified Tournament")
     parser.add_argument("--models", nargs='+', default=["moondream", "llava"], 
                         help="List of Ollama models to test")
     parser.add_argument("--limit", type=int, default=5, help="Number of test cases per model")
+    parser.add_argument("--server", default=None,
+                        help="Base URL of a multi_server.py fleet (e.g. http://127.0.0.1:8001). "
+                             "Models are then driven remotely by agent name.")
     args = parser.parse_args()
 
+    from green_agent.green_agent import GreenAgent
+    if args.server:
+        from white_agent.remote_agent import RemoteWhiteAgent
+    else:
+        from white_agent.white_agent import WhiteAgent
+
     print("\n" + "="*60)
     print(f"🚦 STARTING AGENTIFIED ASSESSMENT")
     print(f"MODELS: {args.models}")
@@ -32,7 +41,10 @@ def main():
         print(f"\n🤖 Round Starting: {model_name}")
         
         try:
-            white = WhiteAgent(model_name=model_name)
+            if args.server:
+                white = RemoteWhiteAgent(args.server, model_name)
+            else:
+                white = WhiteAgent(model_name=model_name)
             green.connect_white_agent(white)
             
             # Pass limit to run_assessment, which now handles splitting
@@ -53,6 +65,11 @@ def main():
             
             print(f"   Verdict: {grade} | Score: {score}% | Violations: {violations}")
 
+            judge = result.get('judge_stats', {})
+            if judge.get('parse_failures'):
+                print(f"   ⚠️ Judge parse failures: {judge['parse_failures']}/{judge['calls']} calls "
+                      f"({judge['retries']} retried, {judge['fallbacks']} fell back)")
+
         except Exception as e:
             print(f"   ❌ Skipped {model_name} due to error: {e}")
             continue
@@ -64,6 +81,7 @@ def main():
     try:
         html_file = green.generate_artifacts(output_dir)
         print(f"📊 LEADERBOARD GENERATED: {html_file}")
+        print(f"📈 CROSS-RUN HISTORY: {os.path.join(output_dir, 'leaderboard.html')}")
     except Exception as e:
         print(f"❌ Failed to generate report: {e}")
         
@@ -1,9 +1,12 @@
 from green_agent.green_agent import GreenAgent
 import sys
+import argparse
 
-def run_batch_tests():
-    print("\n--- 🧪 50-CASE GREEN AGENT VALIDATION SUITE ---")
-    green_agent = GreenAgent(model_name="llama3.2")
+def run_batch_tests(judge_model="llama3.2", fast_model=None):
+    """Runs the suite against one judge (or a cascade) and returns the number of passed cases."""
+    label = f"{fast_model} -> {judge_model} cascade" if fast_model else judge_model
+    print(f"\n--- 🧪 50-CASE GREEN AGENT VALIDATION SUITE ({label}) ---")
+    green_agent = GreenAgent(model_name=judge_model, fast_model=fast_model)
     
     # FORMAT: (Name, Student_Plan, Ground_Truth_Context, Expected_Violation_Count)
     test_cases = [
@@ -94,7 +97,7 @@ def run_batch_tests():
         student_resp = {"perception": "", "prediction": "", "planning": plan}
         gt_data = {"id": "TEST", "perception": gt, "prediction": "", "planning": gt}
         
-        report = green_agent.evaluate(student_resp, gt_data)
+        report = green_agent.judge_response(student_resp, gt_data)
         actual_v = len(report['feedback'])
         
         # Validation Logic: Did we catch violations if expected?
@@ -110,6 +113,25 @@ def run_batch_tests():
 
     print("-" * 55)
     print(f"TOTAL: {passed_count}/{len(test_cases)} Passed Reliability Check")
+    cascade = green_agent._cascade_summary()
+    if cascade:
+        print(f"Escalated {cascade['escalated']}/{cascade['cases']} cases "
+              f"({cascade['escalation_rate']:.0%}) | reasons: {cascade['reasons']}")
+    green_agent.close()
+    return passed_count
 
 if __name__ == "__main__":
-    run_batch_tests()
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="50-case Green Agent validation suite")
+    parser.add_argument("--judge", default="llama3.2")
+    parser.add_argument("--cascade", metavar="FAST_MODEL", default=None,
+                        help="Also run with FAST_MODEL as the cascade's first judge and check no accuracy is lost")
+    args = parser.parse_args()
+
+    baseline = run_batch_tests(args.judge)
+    if args.cascade:
+        cascaded = run_batch_tests(args.judge, fast_model=args.cascade)
+        print(f"\nSingle judge: {baseline} passed | Cascade: {cascaded} passed")
+        if cascaded < baseline:
+            print("❌ The cascade lost accuracy against the single judge.")
+            sys.exit(1)
+        print("✅ The cascade matches the single judge.")
\ No newline at end of file
@@ -0,0 +1,71 @@
+"""
+Offline tests of the content-addressed image cache: digest validation (client
+digests name files in the disk cache), size bounds and the disk copy.
+
+    python -m pytest src
+"""
+import os
+import sys
+import pytest
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.common.image_cache import ImageCache, image_digest
+
+BAD_DIGESTS = ["../../../etc/passwd", "/etc/passwd", "0" * 63, "0" * 65, "g" * 64, "", None, 42]
+
+
+@pytest.mark.parametrize("digest", BAD_DIGESTS)
+def test_malformed_digests_are_rejected(tmp_path, digest):
+    cache = ImageCache(disk_dir=str(tmp_path / "images"))
+    with pytest.raises(ValueError):
+        cache.get(digest)
+    with pytest.raises(ValueError):
+        digest in cache
+    if digest is not None:
+        with pytest.raises(ValueError):
+            cache.put(b"image", digest=digest)
+
+
+def test_traversal_never_reads_outside_the_disk_cache(tmp_path):
+    secret = tmp_path / "secret"
+    secret.write_bytes(b"not an image")
+    cache = ImageCache(disk_dir=str(tmp_path / "images"))
+    with pytest.raises(ValueError):
+        cache.get("../secret")
+    assert cache.hits == 0
+
+
+def test_hash_mismatch_is_rejected():
+    with pytest.raises(ValueError):
+        ImageCache().put(b"image", digest=image_digest(b"other"))
+
+
+def test_digests_are_case_insensitive(tmp_path):
+    cache = ImageCache(disk_dir=str(tmp_path / "images"))
+    digest = cache.put(b"image", digest=image_digest(b"image").upper())
+    assert cache.get(digest.upper()) == b"image"
+    assert digest.upper() in cache
+
+
+def test_lru_eviction_and_oversized_entries():
+    cache = ImageCache(max_bytes=100)
+    first, second = cache.put(b"a" * 40), cache.put(b"b" * 30)
+    cache.get(first)
+    third = cache.put(b"c" * 40)
+    # `second` was the least recently used
+    assert first in cache and third in cache and second not in cache
+    assert cache.size == 80
+
+    big = cache.put(b"d" * 150)
+    assert big not in cache
+    assert cache.size <= 100
+
+
+def test_disk_copy_survives_a_restart(tmp_path):
+    disk_dir = str(tmp_path / "images")
+    digest = ImageCache(disk_dir=disk_dir).put(b"image")
+    restarted = ImageCache(disk_dir=disk_dir)
+    assert digest in restarted
+    assert restarted.get(digest) == b"image"
+    assert os.listdir(disk_dir) == [digest]
@@ -0,0 +1,107 @@
+"""
+Offline tests of the Green Agent's judge paths (FakeChatClient, no model needed):
+per-call retries, fallbacks, deadlines and batched judging.
+
+    python -m pytest src
+"""
+import os
+import sys
+import json
+from collections import Counter
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.common.fake_llm import FakeChatClient
+from src.common.cancellation import Deadline
+from src.green_agent.green_agent import GreenAgent, JUDGE_MAX_RETRIES
+
+STUDENT = json.dumps({
+    "perception": "Red light ahead with a stopped car in my lane.",
+    "prediction": "The stopped car stays stationary.",
+    "planning": "Slow down and stop behind the limit line.",
+})
+TRUTH = {"perception": "Red light, stopped car ahead.", "prediction": "Car stays stopped.", "planning": "Stop."}
+
+
+class FlakyJudge(FakeChatClient):
+    """Answers every prompt with unusable text the first time it is sent, normally afterwards."""
+    def __init__(self, **kwargs):
+        super().__init__(role="judge", **kwargs)
+        self.seen = Counter()
+
+    def _canned(self, prompt, rng):
+        self.seen[prompt] += 1
+        return "I think the score is about seven" if self.seen[prompt] == 1 else None
+
+
+def make_judge(client, **kwargs):
+    judge = GreenAgent(model_name="mock", client=client, **kwargs)
+    judge._reset_judge_stats()
+    return judge
+
+
+def test_unparseable_output_is_retried():
+    judge = make_judge(FlakyJudge())
+    report = judge.judge_response(STUDENT, TRUTH)
+
+    assert report['judge_fallbacks'] == []
+    # 3 categories + critique + safety: each retried exactly once
+    assert judge.judge_stats['retries'] == 5
+    assert judge.judge_stats['parse_failures'] == 5
+    assert judge.judge_stats['fallbacks'] == 0
+
+
+def test_fallback_once_retries_are_used_up():
+    client = FakeChatClient(role="judge", responses={"Grade PERCEPTION": "no json here"})
+    judge = make_judge(client)
+    report = judge.judge_response(STUDENT, TRUTH)
+
+    assert report['judge_fallbacks'] == ['perception']
+    assert report['scores']['perception'] == 0.5
+    assert judge.judge_stats['fallbacks'] == 1
+    assert judge.judge_stats['retries'] == JUDGE_MAX_RETRIES
+    assert not report.get('timed_out')
+
+
+def test_out_of_range_score_falls_back():
+    client = FakeChatClient(role="judge", responses={"Grade PLANNING": {"score": 42}})
+    report = make_judge(client).judge_response(STUDENT, TRUTH)
+
+    assert report['judge_fallbacks'] == ['planning']
+
+
+def test_calls_past_the_deadline_time_out_without_retries():
+    judge = make_judge(FakeChatClient(role="judge", latency="fixed:1"))
+    report = judge.judge_response(STUDENT, TRUTH, deadline=Deadline(0.2))
+
+    assert report['timed_out'] and report['timeout_stage'] == 'judge'
+    assert judge.judge_stats['retries'] == 0
+
+
+def test_batched_judging_grades_every_case():
+    judge = make_judge(FakeChatClient(role="judge"), judge_batch_size=4)
+    items = [(i, STUDENT, TRUTH) for i in range(6)]
+    reports = judge.judge_batch(items)
+
+    assert len(reports) == 6
+    assert all(set(r['scores']) == {'perception', 'prediction', 'planning'} for r in reports)
+    assert judge.judge_stats['batched_cases'] == 6
+    assert judge.judge_stats['rejudged'] == 0
+
+
+def test_unusable_batch_is_split_then_rejudged():
+    client = FakeChatClient(role="judge", responses={'"results"': "not json"})
+    judge = make_judge(client, judge_batch_size=4)
+    reports = judge.judge_batch([(i, STUDENT, TRUTH) for i in range(4)])
+
+    assert len(reports) == 4
+    assert judge.judge_stats['batch_splits'] == 3
+    assert judge.judge_stats['rejudged'] == 4
+    assert all(r['judge_fallbacks'] == [] for r in reports)
+
+
+def test_batched_cases_past_their_deadline_time_out():
+    judge = make_judge(FakeChatClient(role="judge", latency="fixed:1"), judge_batch_size=4)
+    reports = judge.judge_batch([(i, STUDENT, TRUTH) for i in range(3)], [Deadline(0.2)] * 3)
+
+    assert [r['timeout_stage'] for r in reports] == ['judge'] * 3
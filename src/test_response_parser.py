@@ -0,0 +1,94 @@
+"""
+Offline tests of the driver response parser: every parse strategy, and the
+incremental parser used by pipelined judging on partial and split JSON.
+
+    python -m pytest src
+"""
+import os
+import sys
+import json
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.common.response_parser import parse_response, IncrementalFieldParser
+
+ANSWER = {"perception": "Red light, a car stopped ahead.", "prediction": "It stays put.", "planning": "Stop."}
+
+
+def test_dict_is_copied():
+    parsed, strategy = parse_response(ANSWER)
+    assert (parsed, strategy) == (ANSWER, "dict")
+    assert parsed is not ANSWER
+
+
+def test_wrapped_response_is_unwrapped():
+    assert parse_response({"response": json.dumps(ANSWER)}) == (ANSWER, "json")
+
+
+def test_json_text():
+    assert parse_response(json.dumps(ANSWER)) == (ANSWER, "json")
+
+
+def test_json_inside_fences_and_prose():
+    text = f"Sure, here is my answer:\n```json\n{json.dumps(ANSWER)}\n```\nDrive safe!"
+    assert parse_response(text) == (ANSWER, "json_extracted")
+
+
+def test_python_repr_is_repaired():
+    text = "{'perception': 'A \"big\" truck', 'prediction': None, 'planning': 'Yield', 'safe': True,}"
+    parsed, strategy = parse_response(text)
+    assert strategy == "json_repaired"
+    assert parsed == {"perception": 'A "big" truck', "prediction": None, "planning": "Yield", "safe": True}
+
+
+def test_labelled_sections():
+    text = "**Perception:** Wet road.\nPrediction - Cars brake early.\nPlan: Slow down."
+    parsed, strategy = parse_response(text)
+    assert strategy == "sections"
+    assert parsed == {"perception": "Wet road.", "prediction": "Cars brake early.", "planning": "Slow down."}
+
+
+def test_unrecognised_text_becomes_the_plan():
+    assert parse_response("just keep going") == (
+        {"perception": "", "prediction": "", "planning": "just keep going"}, "raw")
+
+
+def feed_all(parser, chunks):
+    completed = []
+    for chunk in chunks:
+        completed.extend(parser.feed(chunk))
+    return completed
+
+
+def test_incremental_fields_complete_in_order_one_character_at_a_time():
+    text = json.dumps(ANSWER)
+    parser = IncrementalFieldParser()
+    seen_at = {}
+    for i, c in enumerate(text):
+        for key, value in parser.feed(c):
+            seen_at[key] = i
+            assert value == ANSWER[key]
+    assert list(seen_at) == list(ANSWER)
+    # Each field is reported as soon as its closing quote arrives, not at the end
+    assert seen_at["perception"] == text.index('"', text.index(ANSWER["perception"]) + 1)
+    assert parser.fields == ANSWER
+
+
+def test_incremental_split_inside_strings_escapes_and_nested_values():
+    text = ('```json\n{"perception": "A \\"quoted\\" sign, a { brace", '
+            '"hazards": {"signal": [1, 2]}, "speed": 12.5, "safe": true, "planning": "Stop."}\n```')
+    expected = json.loads(text[text.index("{"):text.rindex("}") + 1])
+    for size in (1, 2, 3, 7, len(text)):
+        parser = IncrementalFieldParser()
+        completed = feed_all(parser, [text[i:i + size] for i in range(0, len(text), size)])
+        assert dict(completed) == expected, size
+        assert [k for k, _ in completed] == list(expected)
+
+
+def test_incremental_partial_object_reports_only_complete_fields():
+    parser = IncrementalFieldParser()
+    completed = parser.feed('{"perception": "Clear road", "prediction": "Nothing ch')
+    assert completed == [("perception", "Clear road")]
+    assert parser.feed('anges", "planning": 3') == [("prediction", "Nothing changes")]
+    # A bare value is only complete at the next comma or the closing brace
+    assert parser.feed("}") == [("planning", 3)]
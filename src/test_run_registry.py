@@ -0,0 +1,113 @@
+"""
+Offline tests of the SQLite run registry: per-model summary upserts, the
+per-case rows of a run and the upgrade of a version 1 registry.
+
+    python -m pytest src
+"""
+import os
+import sys
+import sqlite3
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.common.run_registry import RunRegistry
+
+
+def history(score, cases=2, ids=None):
+    ids = ids or [f"case-{i}" for i in range(cases)]
+    details = [{"id": case_id, "scores": {"perception": 0.5, "prediction": 0.5, "planning": 0.5},
+                "latency": 1.0 + i, "queue_time": 0.25, "timed_out": i == 0, "violation_count": 0}
+               for i, case_id in enumerate(ids)]
+    analysis = {"overall_score_percent": score, "overall_grade": None if score is None else "PASS",
+                "metrics": {"perception": 0.5, "prediction": 0.5, "planning": 0.5, "total_violations": 0}}
+    return {"model-a": {"analysis": analysis, "details": details}}
+
+
+def test_best_score_survives_a_run_without_a_score(tmp_path):
+    with RunRegistry(str(tmp_path / "runs.sqlite")) as registry:
+        registry.record_run("run-1", history(72.5))
+        registry.record_run("run-2", history(None))
+        [row] = registry.leaderboard()
+        assert row["best_score"] == 72.5
+        assert row["latest_score"] is None
+        assert row["previous_score"] == 72.5
+        assert row["runs"] == 2
+
+        registry.record_run("run-3", history(80.0))
+        [row] = registry.leaderboard()
+        assert (row["best_score"], row["latest_score"], row["runs"]) == (80.0, 80.0, 3)
+
+
+def test_first_run_without_a_score(tmp_path):
+    with RunRegistry(str(tmp_path / "runs.sqlite")) as registry:
+        registry.record_run("run-1", history(None))
+        registry.record_run("run-2", history(61.0))
+        [row] = registry.leaderboard()
+        assert row["best_score"] == 61.0
+
+
+def test_run_cases_and_aggregates(tmp_path):
+    with RunRegistry(str(tmp_path / "runs.sqlite")) as registry:
+        registry.record_run("run-1", history(50.0, cases=3), judge_model="judge-x")
+        cases = registry.run_cases("run-1", "model-a")
+        assert sorted(c["case_id"] for c in cases) == ["case-0", "case-1", "case-2"]
+        [trend] = registry.model_trend("model-a")
+        assert (trend["cases"], trend["mean_latency"], trend["judge_model"]) == (3, 2.0, "judge-x")
+
+
+def test_cases_keep_queue_time_and_timeout(tmp_path):
+    with RunRegistry(str(tmp_path / "runs.sqlite")) as registry:
+        registry.record_run("run-1", history(50.0))
+        cases = {c["case_id"]: c for c in registry.run_cases("run-1")}
+        assert cases["case-0"]["queue_time"] == 0.25
+        assert (cases["case-0"]["timed_out"], cases["case-1"]["timed_out"]) == (1, 0)
+
+
+def test_duplicate_case_ids_are_counted(tmp_path):
+    with RunRegistry(str(tmp_path / "runs.sqlite")) as registry:
+        registry.record_run("run-1", history(50.0, ids=["a", "b", "a"]))
+        assert len(registry.run_cases("run-1")) == 2
+        [trend] = registry.model_trend("model-a")
+        assert trend["cases"] == 3
+        duplicates = registry.conn.execute("SELECT duplicate_cases FROM agent_runs").fetchone()[0]
+        assert duplicates == 1
+
+
+def test_summaries_are_kept_per_judge_and_dataset(tmp_path):
+    with RunRegistry(str(tmp_path / "runs.sqlite")) as registry:
+        registry.record_run("run-1", history(90.0), judge_model="judge-x", dataset_hash="d1")
+        registry.record_run("run-2", history(40.0), judge_model="judge-y", dataset_hash="d1")
+        registry.record_run("run-3", history(60.0), judge_model="judge-x", dataset_hash="d2")
+        registry.record_run("run-4", history(70.0), judge_model="judge-x", dataset_hash="d1")
+
+        assert len(registry.leaderboard()) == 3
+        [row] = registry.leaderboard(judge_model="judge-x", dataset_hash="d1")
+        assert (row["runs"], row["best_score"], row["latest_score"], row["previous_score"]) == (2, 90.0, 70.0, 90.0)
+        assert registry.trends()[("model-a", "judge-x", "d1")] == [90.0, 70.0]
+        assert registry.trends()[("model-a", "judge-y", "d1")] == [40.0]
+
+
+def test_version_1_registry_is_upgraded(tmp_path):
+    path = str(tmp_path / "runs.sqlite")
+    with RunRegistry(path) as registry:
+        registry.record_run("run-1", history(90.0), judge_model="judge-x")
+        registry.record_run("run-2", history(40.0), judge_model="judge-y")
+    # Roll the file back to the version 1 layout: models keyed by agent, no new columns
+    conn = sqlite3.connect(path)
+    conn.executescript("""
+        DROP TABLE models;
+        CREATE TABLE models (agent TEXT PRIMARY KEY, runs INTEGER NOT NULL, best_score REAL, latest_run_id TEXT,
+                             latest_at TEXT, latest_score REAL, latest_grade TEXT, previous_score REAL);
+        ALTER TABLE cases DROP COLUMN queue_time;
+        ALTER TABLE cases DROP COLUMN timed_out;
+        ALTER TABLE agent_runs DROP COLUMN duplicate_cases;
+        PRAGMA user_version = 0;
+    """)
+    conn.close()
+
+    with RunRegistry(path) as registry:
+        rows = {row["judge_model"]: row for row in registry.leaderboard()}
+        assert (rows["judge-x"]["runs"], rows["judge-x"]["latest_score"]) == (1, 90.0)
+        assert (rows["judge-y"]["runs"], rows["judge-y"]["latest_score"]) == (1, 40.0)
+        registry.record_run("run-3", history(50.0), judge_model="judge-x")
+        assert registry.leaderboard(judge_model="judge-x")[0]["runs"] == 2
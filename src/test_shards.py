@@ -0,0 +1,81 @@
+"""
+Offline tests of the packed dataset format: pack -> read round trip and the
+snapshot hash of a folder against its packed copy.
+
+    python -m pytest src
+"""
+import os
+import sys
+import json
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.common.shards import pack_dataset, open_packed, is_packed, read_image_ref
+from src.common.dataset_loader import SplitFolderDataset, INDEX_CACHE_FILE
+
+
+def make_folder(root, frames=12):
+    """A dataset folder; every third frame has no description, plus a few stray files."""
+    images, descriptions = os.path.join(root, "images"), os.path.join(root, "descriptions")
+    os.makedirs(images)
+    os.makedirs(descriptions)
+    expected = {}
+    for i in range(frames):
+        name = f"{i:06d}." + ("png" if i % 4 == 0 else "jpg")
+        data = os.urandom(100 + 37 * i)
+        with open(os.path.join(images, name), "wb") as f:
+            f.write(data)
+        description = None
+        if i % 3:
+            description = {"perception": f"frame {i}", "prediction": "", "planning": "Stop."}
+            with open(os.path.join(descriptions, f"{i:06d}.json"), "w") as f:
+                json.dump(description, f)
+        expected[name] = (data, description)
+    for stray in (os.path.join(images, "notes.txt"), os.path.join(descriptions, "orphan.json")):
+        with open(stray, "w") as f:
+            f.write("{}")
+    return expected
+
+
+def test_pack_and_read_round_trip(tmp_path):
+    source, packed = str(tmp_path / "folder"), str(tmp_path / "packed")
+    expected = make_folder(source)
+    # Small shards, so frames are spread over several files
+    pack_dataset(source, packed, shard_bytes=600)
+
+    assert is_packed(packed) and not is_packed(source)
+    dataset = open_packed(packed)
+    try:
+        assert list(dataset.names) == sorted(expected)
+        assert len(dataset.shard_files) > 1
+        for name, (data, description) in expected.items():
+            assert bytes(dataset.image(name)) == data
+            assert dataset.description(name) == description
+            assert read_image_ref(dataset.image_ref(name)) == data
+        streamed = [(name, bytes(image)) for name, image, _ in dataset.records()]
+        assert streamed == [(name, expected[name][0]) for name in sorted(expected)]
+    finally:
+        dataset.close()
+
+
+def test_packed_copy_has_the_folder_snapshot_hash(tmp_path):
+    source, packed = str(tmp_path / "folder"), str(tmp_path / "packed")
+    make_folder(source)
+    pack_dataset(source, packed)
+
+    folder_dataset, packed_dataset = SplitFolderDataset(source), SplitFolderDataset(packed)
+    assert folder_dataset.snapshot_hash() == packed_dataset.snapshot_hash()
+    assert folder_dataset.all_files == packed_dataset.all_files
+
+    # The hash is cached next to the listing; a new frame invalidates it
+    with open(os.path.join(source, INDEX_CACHE_FILE)) as f:
+        assert json.load(f)["snapshot"]["hash"] == folder_dataset.snapshot_hash()
+    with open(os.path.join(source, "images", "000100.jpg"), "wb") as f:
+        f.write(b"x")
+    assert SplitFolderDataset(source).snapshot_hash() != packed_dataset.snapshot_hash()
+    # So does a new description of an existing frame
+    os.remove(os.path.join(source, "images", "000100.jpg"))
+    assert SplitFolderDataset(source).snapshot_hash() == packed_dataset.snapshot_hash()
+    with open(os.path.join(source, "descriptions", "000000.json"), "w") as f:
+        json.dump({"perception": "", "prediction": "", "planning": ""}, f)
+    assert SplitFolderDataset(source).snapshot_hash() != packed_dataset.snapshot_hash()
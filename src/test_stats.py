@@ -0,0 +1,125 @@
+"""
+Offline tests of the statistics module against plain NumPy: Welford running
+moments, the bootstrap CI and its large-sample normal approximation, and
+per-model grouping over cases.parquet columns.
+
+    python -m pytest src
+"""
+import os
+import sys
+import math
+import numpy as np
+import pandas as pd
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.common import stats
+from src.common.results_store import write_results, read_cases
+
+WEIGHTS = {"perception": 0.2, "prediction": 0.3, "planning": 0.5}
+
+
+def make_reports(n, seed=1):
+    rng = np.random.default_rng(seed)
+    scores = rng.uniform(0, 1, size=(n, 3)).round(2)
+    latency = rng.lognormal(-1, 0.5, size=n)
+    return [
+        {"scores": dict(zip(stats.SCORE_FIELDS, row)), "latency": float(lat), "judge_latency": 0.1,
+         "violation_count": int(i % 7 == 0), "hazards": ["red_light"] if i % 3 == 0 else []}
+        for i, (row, lat) in enumerate(zip(scores, latency))
+    ]
+
+
+def test_running_stats_match_numpy():
+    reports = make_reports(2500)
+    running = stats.RunningStats(WEIGHTS)
+    for report in reports:
+        running.add(report)
+
+    matrix = stats._score_matrix(stats.to_records(reports), WEIGHTS)
+    latency = np.array([r["latency"] for r in reports])
+    for j in range(4):
+        assert math.isclose(running.mean[j], matrix[:, j].mean(), rel_tol=1e-12)
+        assert math.isclose(running.std(j), matrix[:, j].std(ddof=1), rel_tol=1e-9)
+    assert math.isclose(running.mean[4], latency.mean(), rel_tol=1e-12)
+    assert math.isclose(running.std(4), latency.std(ddof=1), rel_tol=1e-9)
+
+    summary = running.summary()
+    assert summary["cases"] == 2500
+    assert summary["total_violations"] == sum(r["violation_count"] for r in reports)
+    # Below the reservoir size the percentiles are exact
+    assert summary["latency"]["p95"] == round(float(np.percentile(latency, 95)), 3)
+
+
+def test_running_stats_agree_with_summarize():
+    reports = make_reports(800)
+    running = stats.RunningStats(WEIGHTS)
+    for report in reports:
+        running.add(report)
+    batch = stats.summarize(stats.to_records(reports), WEIGHTS)
+    streamed = running.summary()
+
+    for field in stats.SCORE_FIELDS:
+        assert math.isclose(streamed["means"][field], batch["means"][field], rel_tol=1e-12)
+    for name in (*stats.SCORE_FIELDS, "overall"):
+        assert streamed["distribution"][name]["std"] == batch["distribution"][name]["std"]
+
+
+def test_bootstrap_ci_matches_numpy_resampling():
+    matrix = stats._score_matrix(stats.to_records(make_reports(300)), WEIGHTS)
+    low, high = stats.bootstrap_ci(matrix, resamples=500, seed=7)
+
+    rng = np.random.default_rng(7)
+    idx = rng.integers(0, len(matrix), size=(500, len(matrix)))
+    expected = np.quantile(matrix[idx].mean(axis=1), [0.025, 0.975], axis=0)
+    np.testing.assert_allclose(low, expected[0], rtol=1e-12)
+    np.testing.assert_allclose(high, expected[1], rtol=1e-12)
+    assert np.all(low <= matrix.mean(axis=0)) and np.all(matrix.mean(axis=0) <= high)
+
+
+def test_large_samples_use_the_normal_approximation():
+    rng = np.random.default_rng(3)
+    matrix = rng.uniform(0, 1, size=(stats.LARGE_SAMPLE_ROWS + 1, 4))
+    low, high = stats.bootstrap_ci(matrix)
+
+    half = 1.959963984540054 * matrix.std(axis=0, ddof=1) / math.sqrt(len(matrix))
+    np.testing.assert_allclose(low, matrix.mean(axis=0) - half, rtol=1e-8)
+    np.testing.assert_allclose(high, matrix.mean(axis=0) + half, rtol=1e-8)
+
+
+def test_normal_ppf():
+    assert math.isclose(stats._normal_ppf(0.975), 1.959963984540054, rel_tol=1e-8)
+    assert math.isclose(stats._normal_ppf(0.5), 0.0, abs_tol=1e-12)
+    assert math.isclose(stats._normal_ppf(0.01), -stats._normal_ppf(0.99), rel_tol=1e-12)
+
+
+def test_compile_stats_groups_match_per_model_summaries(tmp_path):
+    reports = {"model-b": make_reports(300, seed=2), "model-a": make_reports(150, seed=3), "model-c": make_reports(1, seed=4)}
+    for i, report in enumerate(reports["model-a"]):
+        report["parse_strategy"] = "json" if i % 2 else "regex"
+    write_results({agent: {"details": cases} for agent, cases in reports.items()}, str(tmp_path), run_id="run")
+    grouped = stats.compile_stats(read_cases(str(tmp_path)), WEIGHTS)
+
+    # Groups keep the order the agents were written in
+    assert list(grouped) == ["model-b", "model-a", "model-c"]
+    for agent, cases in reports.items():
+        expected = stats.summarize(stats.to_records(cases), WEIGHTS)
+        summary = grouped[agent]
+        assert summary["cases"] == expected["cases"]
+        assert summary["total_violations"] == expected["total_violations"]
+        assert summary["distribution"] == expected["distribution"]
+        assert summary["latency"] == expected["latency"]
+    assert grouped["model-a"]["parse_strategies"] == {"json": 75, "regex": 75}
+    assert grouped["model-b"]["parse_strategies"] == {"": 300}
+
+
+def test_grouped_overall_scores_on_plain_columns():
+    columns = {"agent": np.array(["y", "x", "y", "x", "z"]), "perception": np.arange(5.0),
+               "prediction": np.zeros(5), "planning": np.ones(5)}
+    grouped = stats.grouped_overall_scores(columns, WEIGHTS)
+    assert list(grouped) == ["y", "x", "z"]
+    np.testing.assert_allclose(grouped["y"], [0.5, 0.9])
+    np.testing.assert_allclose(grouped["x"], [0.7, 1.1])
+    frame = pd.DataFrame(columns).astype({"agent": "category"})
+    assert {k: list(v) for k, v in stats.grouped_overall_scores(frame, WEIGHTS).items()} == \
+        {k: list(v) for k, v in grouped.items()}
@@ -0,0 +1,84 @@
+import os
+import sys
+import json
+import uuid
+import base64
+import threading
+import requests
+from requests.adapters import HTTPAdapter
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../../')))
+
+from src.common.cancellation import is_timeout
+
+
+class A2AWhiteAgent:
+    """
+    Client for the A2A White Agent (main.py with ROLE=white).
+    Exposes the same receive_task() interface as WhiteAgent: each task is one
+    JSON-RPC `message/send` carrying the prompt as a TextPart and the image
+    inline as a FilePart, and the agent's JSON reply is decoded from its text.
+    """
+    def __init__(self, url, connect_timeout=5, read_timeout=120, max_concurrency=8):
+        self.url = url.rstrip("/") + "/"
+        self.model_name = f"a2a:{url}"
+        self.timeout = (connect_timeout, read_timeout)
+        self._slots = threading.BoundedSemaphore(max_concurrency)
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=max_concurrency)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+
+    def _message(self, message, image_path=None, image_bytes=None):
+        parts = [{"kind": "text", "text": message}]
+        if image_bytes is None and image_path and os.path.exists(image_path):
+            with open(image_path, "rb") as f:
+                image_bytes = f.read()
+        if image_bytes:
+            parts.append({"kind": "file", "file": {
+                "bytes": base64.b64encode(image_bytes).decode("ascii"),
+                "mimeType": "image/jpeg",
+                "name": os.path.basename(image_path) if image_path else "frame.jpg",
+            }})
+        return {"role": "user", "parts": parts, "messageId": uuid.uuid4().hex}
+
+    @staticmethod
+    def _reply_text(result):
+        """Text of the agent's reply: a Message, or the latest message/artifacts of a Task."""
+        if result.get("kind") == "task":
+            parts = [p for a in result.get("artifacts") or [] for p in a.get("parts", [])]
+            if not parts:
+                parts = ((result.get("status") or {}).get("message") or {}).get("parts", [])
+        else:
+            parts = result.get("parts", [])
+        return "".join(p.get("text", "") for p in parts if p.get("kind") == "text")
+
+    def receive_task(self, message, image_path=None, image_bytes=None, timeout=None):
+        body = {
+            "jsonrpc": "2.0",
+            "id": uuid.uuid4().hex,
+            "method": "message/send",
+            "params": {"message": self._message(message, image_path, image_bytes)},
+        }
+        # A per-call timeout caps the read timeout
+        timeouts = self.timeout if timeout is None else (self.timeout[0], min(self.timeout[1], timeout))
+        with self._slots:
+            try:
+                response = self.session.post(self.url, json=body, timeout=timeouts)
+                response.raise_for_status()
+                data = response.json()
+                if "error" in data:
+                    return {"error": f"A2A agent error: {data['error'].get('message', data['error'])}"}
+                text = self._reply_text(data.get("result") or {})
+                try:
+                    return json.loads(text)
+                except ValueError:
+                    return {"raw_output": text}
+            except (requests.RequestException, ValueError, OSError) as e:
+                failure = {"error": f"A2A agent at {self.url} failed: {e}"}
+                if is_timeout(e):
+                    failure["timed_out"] = True
+                return failure
+
+    def close(self):
+        self.session.close()
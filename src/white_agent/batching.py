@@ -0,0 +1,34 @@
+"""
+Batch helpers shared by the White Agent clients.
+A batch is a list of task dicts {"message", "image_path", "image_bytes"}; the
+result is one {"response", "queue_time", "service_time"} per task, in input
+order. queue_time is how long a task waited for a free worker after the batch
+was submitted, service_time how long its model call took.
+"""
+import time
+
+
+def run_concurrently(pool, receive_task, batch, timeout=None, cancel_token=None):
+    """
+    Runs receive_task for every task of the batch on `pool` and times each call.
+    `timeout` is passed on to every call; once `cancel_token` is cancelled the
+    tasks that have not started yet are skipped.
+    """
+    submitted = time.perf_counter()
+
+    def timed(task):
+        start = time.perf_counter()
+        if cancel_token is not None and cancel_token.cancelled:
+            return {"response": {"error": "cancelled", "cancelled": True}, "queue_time": 0.0, "service_time": 0.0}
+        kwargs = {"timeout": timeout} if timeout is not None else {}
+        try:
+            response = receive_task(task.get("message", ""), task.get("image_path"), task.get("image_bytes"), **kwargs)
+        except Exception as e:
+            response = {"error": str(e)}
+        return {
+            "response": response,
+            "queue_time": round(start - submitted, 3),
+            "service_time": round(time.perf_counter() - start, 3),
+        }
+
+    return list(pool.map(timed, batch))
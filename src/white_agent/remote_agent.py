@@ -0,0 +1,245 @@
+import os
+import sys
+import time
+import threading
+from concurrent.futures import ThreadPoolExecutor
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../../')))
+
+from src.common.image_cache import image_digest
+from src.common.cancellation import is_timeout
+from src.white_agent.batching import run_concurrently
+
+
+def _error_message(response):
+    """The "error" field of a JSON response body, None when there is none."""
+    try:
+        data = response.json()
+    except ValueError:
+        return None
+    return data.get("error") if isinstance(data, dict) else None
+
+
+class RemoteWhiteAgent:
+    """
+    Client for a White Agent served by multi_server.py (POST /agent/{name}/tasks).
+    Exposes the same receive_task() interface as WhiteAgent, so the Green Agent
+    can drive a remote fleet exactly like an in-process driver.
+
+    One keep-alive session is shared by every call; `max_concurrency` caps how
+    many requests this client has in flight against the server at once.
+
+    Images are sent as raw bytes keyed by SHA-256 (see common/image_cache.py):
+    each image is uploaded at most once per server, later tasks only carry the
+    hash. With `send_images=False` the legacy `image_path` is sent instead,
+    which only works when both hosts share a filesystem.
+
+    receive_tasks() sends a whole batch in one request to the server's batch
+    endpoint, which runs it on the agent's own worker pool.
+
+    A per-call `timeout` caps the read timeout and is forwarded to the server,
+    which applies it to the model call itself.
+    """
+    def __init__(self, base_url, agent_name, connect_timeout=5, read_timeout=120, max_concurrency=8,
+                 send_images=True, batch_size=8):
+        self.base_url = base_url.rstrip("/")
+        self.agent_name = agent_name
+        self.model_name = agent_name
+        self.batch_size = batch_size
+        self.max_concurrency = max_concurrency
+        # Cleared when the server has no batch endpoint (older multi_server.py)
+        self._batch_endpoint = True
+        self._pool = None
+        self.timeout = (connect_timeout, read_timeout)
+        self._slots = threading.BoundedSemaphore(max_concurrency)
+        self.send_images = send_images
+        # Hashes this server is known to hold, and path -> (mtime, hash) so files are hashed once
+        self._uploaded = set()
+        self._digests = {}
+        self._lock = threading.Lock()
+
+        self.session = requests.Session()
+        # Only connection failures are retried: a POST that reached the server may already be running
+        retries = Retry(total=2, connect=2, read=0, status=0, backoff_factor=0.3)
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=max_concurrency, max_retries=retries)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+
+    @classmethod
+    def from_url(cls, url, **kwargs):
+        """Builds a client from a full task URL, e.g. http://host:8001/agent/moondream"""
+        base, sep, name = url.rstrip("/").removesuffix("/tasks").rpartition("/agent/")
+        if not sep or not name:
+            raise ValueError(f"Expected a URL like http://host:port/agent/<name>, got '{url}'")
+        return cls(base, name, **kwargs)
+
+    @property
+    def task_url(self):
+        return f"{self.base_url}/agent/{self.agent_name}/tasks"
+
+    def _path_digest(self, image_path):
+        """SHA-256 of a local image, hashed once per (path, mtime)."""
+        mtime = os.path.getmtime(image_path)
+        with self._lock:
+            cached = self._digests.get(image_path)
+        if cached and cached[0] == mtime:
+            return cached[1]
+        with open(image_path, "rb") as f:
+            digest = image_digest(f.read())
+        with self._lock:
+            self._digests[image_path] = (mtime, digest)
+        return digest
+
+    def _upload_image(self, digest, image_path, image_bytes):
+        if image_bytes is None:
+            with open(image_path, "rb") as f:
+                image_bytes = f.read()
+        response = self.session.put(
+            f"{self.base_url}/images/{digest}",
+            # bytes() also copies a memoryview from a dataset shard, which requests would iterate
+            data=bytes(image_bytes),
+            headers={"Content-Type": "application/octet-stream"},
+            timeout=self.timeout,
+        )
+        response.raise_for_status()
+        with self._lock:
+            self._uploaded.add(digest)
+
+    def _timeouts(self, timeout=None):
+        """(connect, read) timeouts for requests; `timeout` caps the read timeout."""
+        if timeout is None:
+            return self.timeout
+        return (self.timeout[0], min(self.timeout[1], timeout))
+
+    def _failure(self, error):
+        failure = {"error": f"Remote agent '{self.agent_name}' failed: {error}"}
+        if is_timeout(error):
+            failure["timed_out"] = True
+        return failure
+
+    def _task_payload(self, message, image_path=None, image_bytes=None):
+        """Request body for one task; returns (payload, image digest or None)."""
+        payload = {"message": message}
+        digest = None
+        if self.send_images:
+            if image_bytes is not None:
+                digest = image_digest(image_bytes)
+            elif image_path and os.path.exists(image_path):
+                digest = self._path_digest(image_path)
+        if digest:
+            payload["image_sha256"] = digest
+        else:
+            payload["image_path"] = image_path
+        return payload, digest
+
+    def receive_task(self, message, image_path=None, image_bytes=None, timeout=None):
+        payload, digest = self._task_payload(message, image_path, image_bytes)
+        if timeout is not None:
+            payload["timeout"] = timeout
+
+        with self._slots:
+            try:
+                if digest and digest not in self._uploaded:
+                    self._upload_image(digest, image_path, image_bytes)
+                response = self.session.post(self.task_url, json=payload, timeout=self._timeouts(timeout))
+                if response.status_code == 409 and digest:
+                    # Server lost the image (restart/eviction): upload once more and retry
+                    self._upload_image(digest, image_path, image_bytes)
+                    response = self.session.post(self.task_url, json=payload, timeout=self._timeouts(timeout))
+                response.raise_for_status()
+                return response.json()
+            except (requests.RequestException, ValueError, OSError) as e:
+                return self._failure(e)
+
+    def receive_tasks(self, batch, timeout=None, cancel_token=None):
+        """
+        Runs a batch of tasks ({"message", "image_path", "image_bytes"} dicts)
+        with one POST /agent/{name}/tasks/batch. Returns
+        [{"response", "queue_time", "service_time"}] in input order; time spent
+        on the network and in the server's queue counts as queue_time.
+        Falls back to concurrent single-task requests on servers without the
+        batch endpoint. `timeout` bounds each task on the server.
+        """
+        if not self._batch_endpoint:
+            return self._receive_concurrently(batch, timeout, cancel_token)
+        if cancel_token is not None and cancel_token.cancelled:
+            return [{"response": {"error": "cancelled", "cancelled": True}, "queue_time": 0.0, "service_time": 0.0}
+                    for _ in batch]
+
+        payloads, images = [], {}
+        for task in batch:
+            payload, digest = self._task_payload(task.get("message", ""), task.get("image_path"), task.get("image_bytes"))
+            payloads.append(payload)
+            if digest:
+                images[digest] = (task.get("image_path"), task.get("image_bytes"))
+
+        body = {"tasks": payloads}
+        if timeout is not None:
+            body["timeout"] = timeout
+        start = time.perf_counter()
+        with self._slots:
+            try:
+                for digest, (image_path, image_bytes) in images.items():
+                    if digest not in self._uploaded:
+                        self._upload_image(digest, image_path, image_bytes)
+                response = self.session.post(f"{self.task_url}/batch", json=body, timeout=self.timeout)
+                if response.status_code == 409:
+                    # Server lost some images (restart/eviction): upload them once more and retry
+                    for digest in response.json().get("missing", []):
+                        self._upload_image(digest, *images[digest])
+                    response = self.session.post(f"{self.task_url}/batch", json=body, timeout=self.timeout)
+                if response.status_code in (404, 405) and _error_message(response) is None:
+                    # A server without the batch endpoint (an unknown agent is a 404 with an "error")
+                    self._batch_endpoint = False
+                    response = None
+                else:
+                    data = self._batch_results(response, len(batch))
+            except (requests.RequestException, ValueError, OSError, KeyError) as e:
+                error = self._failure(e)
+                elapsed = round(time.perf_counter() - start, 3)
+                return [{"response": error, "queue_time": 0.0, "service_time": elapsed} for _ in batch]
+        if response is None:
+            return self._receive_concurrently(batch, timeout, cancel_token)
+
+        overhead = max(0.0, time.perf_counter() - start - data.get("elapsed", 0.0))
+        return [
+            {**item, "queue_time": round(item.get("queue_time", 0.0) + overhead, 3)}
+            for item in data["results"]
+        ]
+
+    def _batch_results(self, response, expected):
+        """Body of a batch response. Raises ValueError unless it holds one result per task."""
+        error = _error_message(response)
+        if error is not None:
+            raise ValueError(error)
+        response.raise_for_status()
+        data = response.json()
+        results = data.get("results") if isinstance(data, dict) else None
+        if not isinstance(results, list) or len(results) != expected:
+            got = len(results) if isinstance(results, list) else "no"
+            raise ValueError(f"expected {expected} results, got {got}")
+        return data
+
+    def _receive_concurrently(self, batch, timeout=None, cancel_token=None):
+        with self._lock:
+            if self._pool is None:
+                self._pool = ThreadPoolExecutor(max_workers=self.max_concurrency)
+            pool = self._pool
+        return run_concurrently(pool, self.receive_task, batch, timeout=timeout, cancel_token=cancel_token)
+
+    def close(self):
+        """Closes the pooled connections and worker threads (both are recreated if the client is used again)."""
+        self.session.close()
+        with self._lock:
+            pool, self._pool = self._pool, None
+        if pool:
+            pool.shutdown(wait=False, cancel_futures=True)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
@@ -1,22 +1,57 @@
 import os
 import json
 import re
+import sys
+import time
 import base64
-from openai import OpenAI
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../../')))
+
+from src.common.fake_llm import FakeChatClient
+from src.common.cancellation import is_timeout
+from src.common import metrics
+from src.white_agent.batching import run_concurrently
+
+# Tasks per receive_tasks() call the Green Agent sends, and how many of them run at once
+DEFAULT_BATCH_SIZE = 8
+DEFAULT_CONCURRENCY = 4
+# Seconds one model call may take before it is abandoned (a hung model must not stall the run)
+DEFAULT_TIMEOUT = 120
 
 class WhiteAgent:
     """
     AutoDrive Agent (OpenAI Version).
     """
-    def __init__(self, model_name="gpt-4o-mini"):
+    def __init__(self, model_name="gpt-4o-mini", client=None, batch_size=DEFAULT_BATCH_SIZE,
+                 max_concurrency=DEFAULT_CONCURRENCY, timeout=DEFAULT_TIMEOUT):
         self.model_name = model_name
-        # Ensure OPENAI_API_KEY is set in environment variables
-        self.client = OpenAI(api_key=os.environ.get("OPENAI_API_KEY"))
+        self.batch_size = batch_size
+        self.max_concurrency = max_concurrency
+        self.timeout = timeout
+        # Worker threads for receive_tasks, created on first use
+        self._pool = None
+        self._pool_lock = threading.Lock()
+        if client is None:
+            if model_name == "mock":
+                # Offline driver with canned answers (common.fake_llm)
+                client = FakeChatClient(role="driver")
+            else:
+                # Imported on demand (slow to import); ensure OPENAI_API_KEY is set in environment variables
+                from openai import OpenAI
+                client = OpenAI(api_key=os.environ.get("OPENAI_API_KEY"))
+        self.client = client
 
     def _encode_image(self, image_path):
-        """Encodes local image to base64 for OpenAI."""
-        if not image_path or not os.path.exists(image_path):
+        """Encodes local image (or packed dataset frame) to base64 for OpenAI."""
+        if not image_path:
             return None
+        if not os.path.exists(image_path):
+            # Packed dataset frame; shards (and numpy) are only loaded when one shows up
+            from src.common.shards import read_image_ref
+            data = read_image_ref(image_path)
+            return base64.b64encode(data).decode('utf-8') if data is not None else None
         with open(image_path, "rb") as img_file:
             return base64.b64encode(img_file.read()).decode('utf-8')
 
@@ -30,7 +65,7 @@ class WhiteAgent:
             try: return json.loads(text.strip())
             except: return {"raw_output": text}
 
-    def receive_task(self, message, image_path=None):
+    def _build_messages(self, message, image_path=None, image_bytes=None):
         # Narrative Prompt to force detailed driving logic
         system_prompt = (
             "ROLE: Autonomous Vehicle AI.\n"
@@ -46,22 +81,95 @@ class WhiteAgent:
 
         content_payload = [{"type": "text", "text": system_prompt}]
         
-        # Attach image if provided
-        if image_path:
+        # Attach image if provided (raw bytes win over a local path)
+        b64_img = None
+        if image_bytes:
+            b64_img = base64.b64encode(image_bytes).decode('utf-8')
+        elif image_path:
             b64_img = self._encode_image(image_path)
-            if b64_img:
-                content_payload.append({
-                    "type": "image_url",
-                    "image_url": {"url": f"data:image/jpeg;base64,{b64_img}"}
-                })
+        if b64_img:
+            content_payload.append({
+                "type": "image_url",
+                "image_url": {"url": f"data:image/jpeg;base64,{b64_img}"}
+            })
+        return [{"role": "user", "content": content_payload}]
 
+    def _timeout_kwargs(self, timeout):
+        # Per-request timeout (the OpenAI client's own default is 10 minutes)
+        timeout = timeout if timeout is not None else self.timeout
+        return {"timeout": timeout} if timeout is not None else {}
+
+    def receive_task(self, message, image_path=None, image_bytes=None, timeout=None):
+        start = time.perf_counter()
         try:
             response = self.client.chat.completions.create(
                 model=self.model_name,
-                messages=[{"role": "user", "content": content_payload}],
+                messages=self._build_messages(message, image_path, image_bytes),
                 temperature=0,
-                response_format={"type": "json_object"} # Force valid JSON
+                response_format={"type": "json_object"}, # Force valid JSON
+                **self._timeout_kwargs(timeout),
             )
+            metrics.observe_llm_call("driver", self.model_name, start, "ok")
             return self._clean_json(response.choices[0].message.content)
         except Exception as e:
-            return {"error": str(e)}
\ No newline at end of file
+            metrics.observe_llm_call("driver", self.model_name, start, "timeout" if is_timeout(e) else "error")
+            if is_timeout(e):
+                return {"error": str(e), "timed_out": True}
+            return {"error": str(e)}
+
+    def stream_task(self, message, image_path=None, image_bytes=None, timeout=None):
+        """
+        Same request as receive_task, streamed: yields the raw text deltas as
+        the model produces them (backend errors are raised to the caller).
+        Closing the generator closes the HTTP response, so a consumer that
+        gives up early also stops the generation.
+        """
+        start = time.perf_counter()
+        outcome = "ok"
+        try:
+            stream = self.client.chat.completions.create(
+                model=self.model_name,
+                messages=self._build_messages(message, image_path, image_bytes),
+                temperature=0,
+                response_format={"type": "json_object"},
+                stream=True,
+                **self._timeout_kwargs(timeout),
+            )
+            try:
+                for chunk in stream:
+                    if chunk.choices and chunk.choices[0].delta.content:
+                        yield chunk.choices[0].delta.content
+            finally:
+                if hasattr(stream, "close"):
+                    stream.close()
+        except GeneratorExit:
+            outcome = "abandoned"
+            raise
+        except Exception as e:
+            outcome = "timeout" if is_timeout(e) else "error"
+            raise
+        finally:
+            metrics.observe_llm_call("driver", self.model_name, start, outcome)
+
+    def receive_tasks(self, batch, timeout=None, cancel_token=None):
+        """
+        Runs a batch of tasks ({"message", "image_path", "image_bytes"} dicts)
+        with up to max_concurrency requests in flight. OpenAI-compatible
+        chat endpoints take one conversation per request, so concurrent
+        requests are how the backend gets to batch them.
+        Returns [{"response", "queue_time", "service_time"}] in input order.
+        `timeout` bounds each task's model call; tasks not started when
+        `cancel_token` is cancelled are skipped.
+        """
+        with self._pool_lock:
+            if self._pool is None:
+                self._pool = ThreadPoolExecutor(max_workers=self.max_concurrency)
+            pool = self._pool
+        return run_concurrently(pool, self.receive_task, batch, timeout=timeout, cancel_token=cancel_token)
+
+    def close(self):
+        """Releases the worker threads; a later receive_tasks() starts new ones."""
+        with self._pool_lock:
+            pool, self._pool = self._pool, None
+        if pool:
+            pool.shutdown(wait=False, cancel_futures=True)